@@ -0,0 +1,79 @@
+"""
+Prompt blocklist benchmark.
+Builds omega_bot.security.blocklist.Blocklist from a large synthetic term
+list and compares the per-prompt scan time with the substring loop the
+validator used before, for prompts that do and do not contain a term.
+
+Usage: python benchmarks/bench_blocklist.py [--terms 100000] [--prompts 2000]
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from omega_bot.security.blocklist import Blocklist  # noqa: E402
+
+WORDS = (
+    "a castle at dawn with dragons flying over misty mountains oil painting "
+    "portrait of an astronaut in a sunflower field cinematic lighting 8k"
+).split()
+
+
+def synthetic_terms(rng, count):
+    terms = set()
+    while len(terms) < count:
+        terms.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))))
+    return sorted(terms)
+
+
+def naive_find(terms, prompt):
+    lowered = prompt.lower()
+    for term in terms:
+        if term in lowered:
+            return term
+    return None
+
+
+def time_per_prompt(find, prompts):
+    start = time.perf_counter()
+    for prompt in prompts:
+        find(prompt)
+    return (time.perf_counter() - start) * 1e6 / len(prompts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--terms", type=int, default=100_000)
+    parser.add_argument("--prompts", type=int, default=2_000)
+    parser.add_argument("--naive-prompts", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    terms = synthetic_terms(rng, args.terms)
+    clean = [" ".join(rng.choices(WORDS, k=rng.randint(8, 40))) for _ in range(args.prompts)]
+    dirty = [f"{prompt} {rng.choice(terms)}" for prompt in clean]
+
+    start = time.perf_counter()
+    blocklist = Blocklist(terms)
+    build = time.perf_counter() - start
+    print(f"build: {len(blocklist)} terms, {len(blocklist._goto)} states in {build:.2f}s")
+
+    clean_us = time_per_prompt(blocklist.find, clean)
+    dirty_us = time_per_prompt(blocklist.find, dirty)
+    print(f"automaton: {clean_us:.1f} us/prompt clean, {dirty_us:.1f} us/prompt blocked")
+
+    sample = clean[:args.naive_prompts]
+    naive_us = time_per_prompt(lambda prompt: naive_find(terms, prompt), sample)
+    print(f"substring loop: {naive_us:.1f} us/prompt clean ({naive_us / clean_us:.0f}x slower)")
+
+    misses = sum(blocklist.find(prompt) is None for prompt in dirty)
+    print(f"missed blocked prompts: {misses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cache micro-benchmarks.
+Measures per-operation cost of omega_bot.core.cache.LRUCache at 1M entries
+for each eviction policy.
+
+Usage: python benchmarks/bench_cache.py [--entries 1000000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from omega_bot.core.cache import CacheConfig, LRUCache  # noqa: E402
+
+
+def _timed(label: str, count: int, func) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed * 1e9 / count:8.0f} ns/op  ({count:,} ops in {elapsed:.2f}s)")
+
+
+def run(policy: str, entries: int) -> None:
+    # 100-byte values with a budget for exactly ``entries`` of them
+    value = b"x" * 100
+    cache = LRUCache(CacheConfig(max_bytes=100 * entries, policy=policy))
+    keys = [f"prompt-{i}" for i in range(entries)]
+    hot = random.Random(0).choices(keys, k=entries)
+    overflow = [f"overflow-{i}" for i in range(entries)]
+    print(f"{policy.upper()} with {entries:,} entries")
+
+    def fill():
+        for key in keys:
+            cache.set_nowait(key, value)
+
+    def hits():
+        for key in hot:
+            cache.get_nowait(key)
+
+    def misses():
+        for key in overflow:
+            cache.get_nowait(key)
+
+    def evicting_sets():
+        for key in overflow:
+            cache.set_nowait(key, value)
+
+    _timed("set (filling)", entries, fill)
+    _timed("get (hit)", entries, hits)
+    _timed("get (miss)", entries, misses)
+    _timed("set (evicting)", entries, evicting_sets)
+    assert len(cache) == entries
+    print(f"  evictions: {cache.stats['evictions']:,}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--policy", choices=["lru", "lfu", "slru"], action="append")
+    args = parser.parse_args()
+    for policy in args.policy or ["lru", "lfu", "slru"]:
+        run(policy, args.entries)
+
+
+if __name__ == "__main__":
+    main()
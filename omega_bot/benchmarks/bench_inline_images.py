@@ -0,0 +1,116 @@
+"""
+Inline (b64_json) versus URL image delivery benchmark.
+Runs the batch pipeline against a local fake images API in both response
+formats and reports per-image latency and bytes transferred. The fake CDN
+adds a round trip before each image download, as a real one would.
+
+Usage: python benchmarks/bench_inline_images.py [--images 200] [--image-kb 1500] [--fetch-rtt 0.08]
+Run from the repository root (the CLI reads config/config.yaml from there).
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiohttp import web  # noqa: E402
+
+from src.async_generator import AsyncImageGenerator  # noqa: E402
+from src.batch import run_batch  # noqa: E402
+
+OUTPUT_DIR = Path("outputs") / "bench-inline"
+
+
+class FakeAPI:
+    def __init__(self, image: bytes, generate_delay: float, fetch_rtt: float):
+        self.image = image
+        self.encoded = base64.b64encode(image).decode()
+        self.generate_delay = generate_delay
+        self.fetch_rtt = fetch_rtt
+        self.bytes_sent = 0
+
+    async def generate(self, request):
+        params = await request.json()
+        await asyncio.sleep(self.generate_delay)
+        if params.get("response_format") == "b64_json":
+            body = f'{{"created": 1, "data": [{{"b64_json": "{self.encoded}"}}]}}'
+        else:
+            body = f'{{"created": 1, "data": [{{"url": "{request.url.with_path("/image.png")}"}}]}}'
+        self.bytes_sent += len(body)
+        return web.Response(text=body, content_type="application/json")
+
+    async def download(self, request):
+        await asyncio.sleep(self.fetch_rtt)
+        self.bytes_sent += len(self.image)
+        return web.Response(body=self.image, content_type="image/png")
+
+
+async def run_mode(api, url, mode, images, concurrency):
+    """Return (wall seconds, bytes sent by the server) for one batch."""
+    api.bytes_sent = 0
+    shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
+    generator = AsyncImageGenerator("bench-key", base_url=url)
+    generator.config.update({
+        "response_format": mode, "concurrency": concurrency, "max_concurrency": concurrency,
+        "latency_tolerance": None,
+    })
+    stats = await run_batch(generator, [f"prompt {i}" for i in range(images)], OUTPUT_DIR)
+    assert stats.saved == images, f"{stats.failed} images failed"
+    return stats.elapsed, api.bytes_sent
+
+
+async def main_async(args) -> None:
+    image = os.urandom(args.image_kb * 1024)
+    api = FakeAPI(image, args.generate_delay, args.fetch_rtt)
+    app = web.Application(client_max_size=0)
+    app.router.add_post("/v1/images/generations", api.generate)
+    app.router.add_get("/image.png", api.download)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/v1/images/generations"
+
+    try:
+        results = {}
+        for mode in ("url", "b64_json"):
+            # Single-image batches give the end-to-end latency, the full batch the throughput
+            latency = 0.0
+            for _ in range(args.latency_images):
+                elapsed, _ = await run_mode(api, url, mode, 1, 1)
+                latency += elapsed / args.latency_images
+            elapsed, sent = await run_mode(api, url, mode, args.images, args.concurrency)
+            results[mode] = (latency, elapsed, sent / args.images)
+    finally:
+        await runner.cleanup()
+        shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
+
+    for mode, (latency, elapsed, sent) in results.items():
+        print(
+            f"{mode:>8}: {latency * 1000:6.1f} ms/image latency, "
+            f"{args.images / elapsed:6.1f} images/s, {sent / 1024:6.0f} KiB/image transferred"
+        )
+    url_latency, _, url_bytes = results["url"]
+    b64_latency, _, b64_bytes = results["b64_json"]
+    print(f"b64_json vs url: {b64_latency / url_latency - 1:+.0%} latency, {b64_bytes / url_bytes - 1:+.0%} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--image-kb", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-images", type=int, default=20)
+    parser.add_argument("--generate-delay", type=float, default=0.05)
+    parser.add_argument("--fetch-rtt", type=float, default=0.08)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Near-duplicate prompt index benchmark.
+Builds omega_bot.core.prompt_index.PromptIndex over a synthetic prompt
+corpus, then reports lookup latency and precision/recall on paraphrased
+(should hit) and rewritten (should miss) queries.
+
+Usage: python benchmarks/bench_prompt_index.py [--entries 1000000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from omega_bot.core.prompt_index import PromptIndex, PromptIndexConfig, jaccard, canonicalize  # noqa: E402
+
+FILLERS = ["a", "the", "with", "of"]
+
+
+def make_corpus(rng: random.Random, entries: int, vocab_size: int = 20000):
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    return [rng.sample(vocab, rng.randint(6, 14)) for _ in range(entries)], vocab
+
+
+def paraphrase(rng: random.Random, words):
+    """Same meaning: reorder, change case, add punctuation and filler words,
+    and for longer prompts drop one word."""
+    words = list(words)
+    if len(words) >= 10:
+        words.pop(rng.randrange(len(words)))
+    rng.shuffle(words)
+    words = [w.upper() if rng.random() < 0.3 else w for w in words]
+    words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+    return ", ".join(words) + rng.choice(["", "!", "."])
+
+
+def rewrite(rng: random.Random, words, vocab):
+    """Different request: replace a third of the words."""
+    words = list(words)
+    for i in rng.sample(range(len(words)), max(2, len(words) // 3)):
+        words[i] = rng.choice(vocab)
+    return " ".join(words)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    corpus, vocab = make_corpus(rng, args.entries)
+    index = PromptIndex(PromptIndexConfig(threshold=args.threshold))
+
+    start = time.perf_counter()
+    for i, words in enumerate(corpus):
+        index.add(" ".join(words), "sd", None, str(i))
+    build = time.perf_counter() - start
+    print(f"indexed {args.entries:,} prompts in {build:.1f}s ({build * 1e6 / args.entries:.0f} us/prompt)")
+
+    queries = []
+    for _ in range(args.queries):
+        i = rng.randrange(args.entries)
+        queries.append((paraphrase(rng, corpus[i]), str(i)))
+        queries.append((rewrite(rng, corpus[i], vocab), None))
+
+    true_positive = false_positive = false_negative = 0
+    start = time.perf_counter()
+    results = [index.lookup(prompt, "sd") for prompt, _ in queries]
+    elapsed = time.perf_counter() - start
+    for (prompt, expected), match in zip(queries, results):
+        if match is None:
+            false_negative += expected is not None
+        elif expected is not None and match[0] == expected:
+            true_positive += 1
+        elif jaccard(canonicalize(prompt), canonicalize(" ".join(corpus[int(match[0])]))) < args.threshold:
+            false_positive += 1
+
+    positives = sum(1 for _, expected in queries if expected is not None)
+    precision = true_positive / max(1, true_positive + false_positive)
+    recall = true_positive / positives
+    print(f"lookup: {elapsed * 1e6 / len(queries):.0f} us/query over {len(queries):,} queries")
+    print(f"precision: {precision:.4f}  recall: {recall:.4f}  (threshold {args.threshold})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Streaming latency quantile benchmark.
+Feeds omega_bot.utils.sketches.QuantileSketch with synthetic generation
+latencies and reports the per-sample cost, the relative error of p50/p95/p99
+against exact percentiles, and the error after merging per-worker sketches.
+
+Usage: python benchmarks/bench_quantiles.py [--samples 1000000] [--workers 4]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from omega_bot.utils.sketches import QuantileSketch  # noqa: E402
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def exact_quantiles(values):
+    ordered = sorted(values)
+    return {f"p{round(q * 100):d}": ordered[int(q * (len(ordered) - 1))] for q in QUANTILES}
+
+
+def report(label, estimated, exact):
+    errors = "  ".join(
+        f"{name}={estimated[name]:.3f}s (err {abs(estimated[name] - exact[name]) / exact[name]:.2%})"
+        for name in exact
+    )
+    print(f"{label}: {errors}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--accuracy", type=float, default=0.01)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    # Mostly fast generations with a heavy slow tail (cold model loads)
+    values = [
+        rng.lognormvariate(1.5, 0.4) if rng.random() < 0.97 else rng.uniform(30, 300)
+        for _ in range(args.samples)
+    ]
+
+    sketch = QuantileSketch(relative_accuracy=args.accuracy)
+    add = sketch.add
+    start = time.perf_counter()
+    for value in values:
+        add(value)
+    elapsed = time.perf_counter() - start
+    print(f"add: {elapsed * 1e9 / args.samples:.0f} ns/sample, {len(sketch.buckets)} buckets")
+
+    exact = exact_quantiles(values)
+    start = time.perf_counter()
+    estimated = sketch.quantiles(QUANTILES)
+    print(f"query: {(time.perf_counter() - start) * 1e6:.0f} us for {len(QUANTILES)} quantiles")
+    report("single", estimated, exact)
+
+    shards = [QuantileSketch(relative_accuracy=args.accuracy) for _ in range(args.workers)]
+    for i, value in enumerate(values):
+        shards[i % args.workers].add(value)
+    merged = QuantileSketch(relative_accuracy=args.accuracy)
+    for shard in shards:
+        merged.merge(QuantileSketch.from_dict(shard.to_dict()))
+    report(f"merged x{args.workers}", merged.quantiles(QUANTILES), exact)
+
+
+if __name__ == "__main__":
+    main()
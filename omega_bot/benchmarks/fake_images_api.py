@@ -0,0 +1,205 @@
+"""
+Local stand-in for the OpenAI images generations endpoint.
+Answers POST /v1/images/generations like the real API (url or b64_json)
+with configurable latency, errors, 429 bursts, capacity and image size,
+and serves the images it hands out. GET /stats returns its counters.
+
+Latency specs: "0.5" (fixed), "uniform:LOW:HIGH", "exp:MEAN",
+"lognormal:MEDIAN:SIGMA", "pareto:SCALE:ALPHA" (seconds).
+
+Usage: python benchmarks/fake_images_api.py [--port 8000] [--latency lognormal:0.8:0.5]
+       [--error-rate 0.02] [--burst-every 30 --burst-length 3] [--capacity 32] [--image-kb 1500]
+Point the CLI at it with OPENAI_BASE_URL=http://127.0.0.1:8000/v1 (sync client) or
+the generator's base_url http://127.0.0.1:8000/v1/images/generations (async client).
+"""
+
+import argparse
+import asyncio
+import base64
+import math
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Tuple
+
+from aiohttp import web
+
+GENERATIONS_PATH = "/v1/images/generations"
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec into a sampler of seconds."""
+    name, _, args = spec.partition(":")
+    try:
+        if not args:
+            value = float(name)
+            return lambda rng: value
+        params = [float(arg) for arg in args.split(":")]
+        if name == "fixed":
+            return lambda rng: params[0]
+        if name == "uniform":
+            return lambda rng: rng.uniform(params[0], params[1])
+        if name == "exp":
+            return lambda rng: rng.expovariate(1 / params[0])
+        if name == "lognormal":
+            return lambda rng: rng.lognormvariate(math.log(params[0]), params[1])
+        if name == "pareto":
+            return lambda rng: params[0] * rng.paretovariate(params[1])
+    except (ValueError, IndexError):
+        pass
+    raise ValueError(f"Bad latency spec: {spec}")
+
+
+@dataclass
+class FakeAPIConfig:
+    latency: str = "lognormal:0.5:0.4"  # generation time
+    fetch_latency: str = "0.02"  # image download round trip
+    error_rate: float = 0.0  # share of requests answered 500
+    burst_every: float = 0.0  # seconds between 429 bursts; 0 disables them
+    burst_length: float = 0.0  # seconds every burst lasts
+    retry_after: Optional[float] = 1.0  # Retry-After on 429s; None omits the header
+    capacity: int = 0  # requests generating at once before 429s; 0 is unlimited
+    image_kb: int = 256
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeAPIStats:
+    requests: int = 0
+    downloads: int = 0
+    bytes_sent: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "downloads": self.downloads,
+            "bytes_sent": self.bytes_sent,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+class FakeImagesAPI:
+    def __init__(self, config: Optional[FakeAPIConfig] = None):
+        self.config = config or FakeAPIConfig()
+        self.rng = random.Random(self.config.seed)
+        self.latency = parse_latency(self.config.latency)
+        self.fetch_latency = parse_latency(self.config.fetch_latency)
+        self.image = os.urandom(self.config.image_kb * 1024)
+        self.encoded = base64.b64encode(self.image).decode()
+        self.started = time.monotonic()
+        self.stats = FakeAPIStats()
+
+    def reset(self) -> None:
+        self.started = time.monotonic()
+        self.stats = FakeAPIStats()
+
+    def _in_burst(self) -> bool:
+        if self.config.burst_every <= 0:
+            return False
+        return (time.monotonic() - self.started) % self.config.burst_every < self.config.burst_length
+
+    def _reply(self, status: int, body: str, headers: Optional[dict] = None) -> web.Response:
+        self.stats.statuses[status] += 1
+        self.stats.bytes_sent += len(body)
+        return web.Response(status=status, text=body, content_type="application/json", headers=headers)
+
+    async def generate(self, request: web.Request) -> web.Response:
+        self.stats.requests += 1
+        params = await request.json()
+        if not str(params.get("prompt", "")).strip():
+            return self._reply(400, '{"error": {"message": "Prompt is required"}}')
+        capacity = self.config.capacity
+        if self._in_burst() or (capacity and self.stats.in_flight >= capacity):
+            headers = {} if self.config.retry_after is None else {"Retry-After": f"{self.config.retry_after:g}"}
+            return self._reply(429, '{"error": {"message": "Rate limit reached"}}', headers)
+
+        self.stats.in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+        try:
+            await asyncio.sleep(self.latency(self.rng))
+        finally:
+            self.stats.in_flight -= 1
+        if self.rng.random() < self.config.error_rate:
+            return self._reply(500, '{"error": {"message": "Internal server error"}}')
+        if params.get("response_format") == "b64_json":
+            image = f'"b64_json": "{self.encoded}"'
+        else:
+            image = f'"url": "{request.url.with_path(f"/images/{self.stats.requests}.png").with_query(None)}"'
+        return self._reply(200, f'{{"created": {int(time.time())}, "data": [{{{image}}}]}}')
+
+    async def download(self, request: web.Request) -> web.Response:
+        self.stats.downloads += 1
+        await asyncio.sleep(self.fetch_latency(self.rng))
+        self.stats.bytes_sent += len(self.image)
+        return web.Response(body=self.image, content_type="image/png")
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats.to_dict())
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=0)
+        app.router.add_post(GENERATIONS_PATH, self.generate)
+        app.router.add_get("/images/{name}", self.download)
+        app.router.add_get("/stats", self.stats_handler)
+        return app
+
+
+async def serve(api: FakeImagesAPI, host: str = "127.0.0.1", port: int = 0) -> Tuple[web.AppRunner, str]:
+    """Start ``api`` in the running loop; returns the runner and its generations URL."""
+    runner = web.AppRunner(api.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}{GENERATIONS_PATH}"
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeAPIConfig()
+    parser.add_argument("--latency", default=defaults.latency)
+    parser.add_argument("--fetch-latency", default=defaults.fetch_latency)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--burst-every", type=float, default=defaults.burst_every)
+    parser.add_argument("--burst-length", type=float, default=defaults.burst_length)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--capacity", type=int, default=defaults.capacity)
+    parser.add_argument("--image-kb", type=int, default=defaults.image_kb)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeAPIConfig:
+    return FakeAPIConfig(
+        latency=args.latency, fetch_latency=args.fetch_latency, error_rate=args.error_rate,
+        burst_every=args.burst_every, burst_length=args.burst_length, retry_after=args.retry_after,
+        capacity=args.capacity, image_kb=args.image_kb, seed=args.seed,
+    )
+
+
+async def main_async(args) -> None:
+    runner, url = await serve(FakeImagesAPI(config_from_args(args)), args.host, args.port)
+    print(f"Fake images API listening on {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_config_arguments(parser)
+    try:
+        asyncio.run(main_async(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
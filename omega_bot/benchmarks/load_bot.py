@@ -0,0 +1,341 @@
+"""
+End-to-end load test for the Telegram bot.
+Replays a synthetic stream of updates into OmegaBot's real Application and
+handlers, with a local fake Bot API in place of Telegram and a fake
+diffusion pipeline in place of the model, and reports throughput, reply
+latency percentiles and time spent queueing for the pipeline.
+
+Each update arrives in its own chat so every reply can be matched to the
+update that caused it; users (and so rate limits) are drawn separately.
+
+Usage: python benchmarks/load_bot.py [--updates 300] [--rate 5] [--arrival poisson|uniform|bursty]
+       [--users 50] [--mix generate=0.8,start=0.1,help=0.1] [--step-time 0.02]
+       [--save results.json] [--baseline previous.json]
+Run from the repository root (the bot reads config/ from there). Needs the
+bot's own dependencies (python-telegram-bot, torch, diffusers); no model
+is downloaded or run.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiohttp import web  # noqa: E402
+
+# (metric, True when higher is better) compared against a baseline
+COMPARED = [
+    ("throughput", True),
+    ("reply.p50", False),
+    ("reply.p99", False),
+    ("ack.p99", False),
+    ("queue.p99", False),
+]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {"p50": percentile(values, 0.5), "p90": percentile(values, 0.9), "p99": percentile(values, 0.99)}
+
+
+class FakeImage:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def save(self, path) -> None:
+        Path(path).write_bytes(self.data)
+
+
+class FakePipeline:
+    """Stands in for StableDiffusionPipeline; blocks its thread like a GPU call would."""
+
+    device = "cpu"
+
+    def __init__(self, encode_time: float, step_time: float, image: bytes):
+        self.encode_time = encode_time
+        self.step_time = step_time
+        self.image = image
+
+    def encode_prompt(self, prompt, device, num_images, do_guidance, negative_prompt=""):
+        time.sleep(self.encode_time)
+        return None, None
+
+    def __call__(self, num_inference_steps: int = 50, **kwargs):
+        time.sleep(self.step_time * num_inference_steps)
+        return SimpleNamespace(images=[FakeImage(self.image)])
+
+
+class Pending:
+    """One update on its way through the bot."""
+
+    def __init__(self, command: str, sent: float):
+        self.command = command
+        self.sent = sent
+        self.ack: Optional[float] = None  # first reply of any kind
+        self.done: Optional[float] = None  # final reply
+        self.outcome: Optional[str] = None
+        self.finished = asyncio.Event()
+
+
+class FakeTelegramAPI:
+    """Answers the Bot API methods the bot uses and times every reply."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.pending: Dict[int, Pending] = {}
+        self.calls: Dict[str, int] = {}
+        self._message_id = 0
+
+    def _message(self, chat_id: int, **fields) -> dict:
+        self._message_id += 1
+        return {"message_id": self._message_id, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "group", "title": "load"}, **fields}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        await asyncio.sleep(self.latency)
+        now = time.perf_counter()
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Omega", "username": "omega_load_bot"}
+        elif method in ("sendMessage", "sendPhoto", "sendDocument"):
+            chat_id = int(params["chat_id"])
+            text = params.get("text", "")
+            self._record(chat_id, method, text, now)
+            result = self._message(chat_id, text=text) if method == "sendMessage" else self._message(
+                chat_id, photo=[{"file_id": "p", "file_unique_id": "p", "width": 1, "height": 1}]
+            )
+        else:  # deleteMessage and anything else
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def _record(self, chat_id: int, method: str, text: str, now: float) -> None:
+        pending = self.pending.get(chat_id)
+        if pending is None or pending.done is not None:
+            return
+        if pending.ack is None:
+            pending.ack = now
+        if pending.command == "generate" and method == "sendMessage" and "Generating your image" in text:
+            return  # progress message; the photo or an error comes later
+        if method == "sendPhoto":
+            pending.outcome = "image"
+        elif "Rate limit" in text:
+            pending.outcome = "rate_limited"
+        elif pending.command == "generate" and ("Error" in text or "error occurred" in text):
+            pending.outcome = "error"
+        else:
+            pending.outcome = "text"
+        pending.done = now
+        pending.finished.set()
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        command, _, weight = part.partition("=")
+        mix[command.strip()] = float(weight or 1)
+    return mix
+
+
+def arrivals(args, rng: random.Random):
+    """Yield seconds to wait before each update."""
+    for i in range(args.updates):
+        if args.arrival == "poisson":
+            yield rng.expovariate(args.rate)
+        elif args.arrival == "uniform":
+            yield 1 / args.rate
+        else:  # bursty: burst_size updates at once, same average rate
+            yield args.burst_size / args.rate if i % args.burst_size == 0 else 0.0
+
+
+def make_update(update_id: int, chat_id: int, user_id: int, text: str) -> dict:
+    command = text.split()[0]
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "group", "title": "load"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+
+
+async def run(args) -> dict:
+    from telegram import Update
+
+    from omega_bot.core.bot import OmegaBot
+    from omega_bot.core.image_cache import TieredCacheConfig, TieredImageCache
+    from omega_bot.utils.tracing import tracer
+
+    api = FakeTelegramAPI(args.api_latency)
+    app = web.Application(client_max_size=0)
+    app.router.add_route("*", "/bot{token}/{method}", api.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    workdir = Path(tempfile.mkdtemp(prefix="omega-load-"))
+    os.environ["BOT_TOKEN"] = "123456:load-test"
+    bot = OmegaBot()
+    bot.generator._pipeline = FakePipeline(args.encode_time, args.step_time, os.urandom(args.image_kb * 1024))
+    bot.generator.output_dir = workdir
+    bot.image_cache = TieredImageCache(TieredCacheConfig(cache_dir=str(workdir / "cache")))
+    if args.no_rate_limit:
+        bot.rate_limiter.max_requests_per_minute = bot.rate_limiter.max_requests_per_day = 10 ** 9
+    queue_times: List[float] = []
+    inference_times: List[float] = []
+    tracer.add_listener(lambda span: (
+        queue_times.append(span.duration) if span.name == "queue_wait"
+        else inference_times.append(span.duration) if span.name == "inference" else None
+    ))
+
+    application = bot.build_application(f"http://127.0.0.1:{port}/bot", args.concurrent_updates)
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    user_weights = [1 / (i + 1) ** args.user_skew for i in range(args.users)]
+    prompts: List[str] = []
+    started = time.perf_counter()
+    await application.initialize()
+    await application.start()
+    try:
+        for update_id, delay in enumerate(arrivals(args, rng), 1):
+            await asyncio.sleep(delay)
+            command = rng.choices(list(mix), list(mix.values()))[0]
+            text = f"/{command}"
+            if command == "generate":
+                if prompts and rng.random() < args.repeat:
+                    prompt = rng.choice(prompts)
+                else:
+                    prompt = f"a {rng.choice(['red', 'blue', 'golden'])} landscape number {update_id}"
+                    prompts.append(prompt)
+                text += " " + prompt
+            user_id = rng.choices(range(1, args.users + 1), user_weights)[0]
+            chat_id = -update_id  # a chat per update, see the module docstring
+            api.pending[chat_id] = Pending(command, time.perf_counter())
+            await application.update_queue.put(Update.de_json(make_update(update_id, chat_id, user_id, text), application.bot))
+        waits = [asyncio.wait_for(p.finished.wait(), args.drain_timeout) for p in api.pending.values()]
+        await asyncio.gather(*waits, return_exceptions=True)
+    finally:
+        elapsed = time.perf_counter() - started
+        await application.stop()
+        await application.shutdown()
+        await runner.cleanup()
+        bot.image_cache.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    done = [p for p in api.pending.values() if p.done is not None]
+    outcomes: Dict[str, int] = {}
+    for p in done:
+        outcomes[p.outcome] = outcomes.get(p.outcome, 0) + 1
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("save", "baseline")},
+        "updates": args.updates,
+        "answered": len(done),
+        "unanswered": args.updates - len(done),
+        "outcomes": outcomes,
+        "elapsed": elapsed,
+        "throughput": len(done) / elapsed,
+        "reply": summarize([p.done - p.sent for p in done]),
+        "image_reply": summarize([p.done - p.sent for p in done if p.outcome == "image"]),
+        "ack": summarize([p.ack - p.sent for p in api.pending.values() if p.ack is not None]),
+        "queue": summarize(queue_times),
+        "inference": summarize(inference_times),
+        "api_calls": api.calls,
+        "cache": dict(bot.image_cache.stats),
+    }
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.0f} ms"
+
+
+def report(result: dict) -> None:
+    print(f"{result['answered']}/{result['updates']} updates answered in {result['elapsed']:.1f}s "
+          f"({result['throughput']:.2f}/s), outcomes {result['outcomes']}")
+    for name in ("reply", "image_reply", "ack", "queue", "inference"):
+        stats = result[name]
+        print(f"  {name:<12} p50 {_ms(stats['p50']):>9}  p90 {_ms(stats['p90']):>9}  p99 {_ms(stats['p99']):>9}")
+
+
+def _lookup(result: dict, path: str) -> Optional[float]:
+    value = result
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> bool:
+    """Print changes against ``baseline``; return whether any metric regressed past ``tolerance``."""
+    regressed = False
+    print(f"Against baseline (tolerance {tolerance:.0%}):")
+    for path, higher_is_better in COMPARED:
+        old, new = _lookup(baseline, path), _lookup(result, path)
+        if not old or new is None:
+            continue
+        change = new / old - 1
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > tolerance else ""
+        regressed = regressed or bool(flag)
+        print(f"  {path:<12} {old:10.3f} -> {new:10.3f} ({change:+.1%}) {flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=5.0, help="average updates per second")
+    parser.add_argument("--arrival", choices=("poisson", "uniform", "bursty"), default="poisson")
+    parser.add_argument("--burst-size", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--user-skew", type=float, default=1.0, help="Zipf exponent of per-user activity")
+    parser.add_argument("--mix", default="generate=0.8,start=0.1,help=0.1")
+    parser.add_argument("--repeat", type=float, default=0.1, help="chance a prompt repeats an earlier one")
+    parser.add_argument("--no-rate-limit", action="store_true", help="lift the per-user limits")
+    parser.add_argument("--concurrent-updates", type=int, default=0, help="0 handles updates one at a time, as deployed")
+    parser.add_argument("--encode-time", type=float, default=0.01)
+    parser.add_argument("--step-time", type=float, default=0.02, help="seconds per inference step")
+    parser.add_argument("--image-kb", type=int, default=600)
+    parser.add_argument("--api-latency", type=float, default=0.03, help="Bot API round trip")
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    report(result)
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, indent=2))
+    if args.baseline and compare(result, json.loads(Path(args.baseline).read_text()), args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Load generator for the CLI clients against the local fake images API.
+Drives either the async batch pipeline (src.batch.run_batch) or the sync
+client (src.image_generator.ImageGenerator) and reports throughput,
+latency percentiles and retry amplification: requests the server saw per
+prompt, counting every client retry and 429.
+
+Usage: python benchmarks/load_cli.py [--client async|sync] [--prompts 500]
+       [--response-format url|b64_json] [--replicas 1] [--json results.json]
+       plus any fake server option, e.g. --latency pareto:0.2:2.5 --burst-every 5 --burst-length 1
+Run from the repository root (the CLI reads config/config.yaml from there).
+The sync client needs the openai package; it is pointed at the fake server
+through OPENAI_BASE_URL.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_images_api import FakeImagesAPI, add_config_arguments, config_from_args, serve  # noqa: E402
+
+OUTPUT_DIR = Path("outputs") / "bench-load"
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_async(args, urls: List[str]) -> Dict:
+    from src.async_generator import AsyncImageGenerator
+    from src.batch import run_batch
+
+    generator = AsyncImageGenerator("bench-key", base_url=urls[0], endpoints=urls[1:])
+    generator.config["response_format"] = args.response_format
+    if args.retry_delay is not None:
+        generator.config["retry_delay"] = args.retry_delay
+    if args.concurrency:
+        generator.config.update({"concurrency": args.concurrency, "max_concurrency": args.concurrency})
+    latencies, errors = [], []
+
+    def on_result(result, stats):
+        (latencies if result.ok else errors).append(result.latency if result.ok else result.error)
+
+    stats = await run_batch(generator, [f"prompt {i}" for i in range(args.prompts)], OUTPUT_DIR, on_result)
+    return {"ok": stats.saved, "failed": stats.failed, "elapsed": stats.elapsed,
+            "latencies": latencies, "errors": errors}
+
+
+async def run_sync(args, urls: List[str]) -> Dict:
+    # The openai client appends /images/generations to its base URL
+    os.environ["OPENAI_BASE_URL"] = urls[0][: -len("/images/generations")]
+    from src.image_generator import ImageGenerator
+
+    generator = ImageGenerator("bench-key")
+    generator.config["response_format"] = args.response_format
+    if args.retry_delay is not None:
+        generator.config["retry_delay"] = args.retry_delay
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    latencies, errors = [], []
+
+    def one(index: int) -> None:
+        started = time.monotonic()
+        try:
+            generator.generate_to_file(f"prompt {index}", OUTPUT_DIR / f"output_{index}.png")
+            latencies.append(time.monotonic() - started)
+        except Exception as e:
+            errors.append(str(e))
+
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    with ThreadPoolExecutor(args.threads) as pool:
+        await asyncio.gather(*(loop.run_in_executor(pool, one, i) for i in range(args.prompts)))
+    return {"ok": len(latencies), "failed": len(errors), "elapsed": time.monotonic() - started,
+            "latencies": latencies, "errors": errors}
+
+
+def report(args, run: Dict, apis: List[FakeImagesAPI]) -> Dict:
+    statuses: Dict[str, int] = {}
+    for api in apis:
+        for status, count in api.stats.to_dict()["statuses"].items():
+            statuses[status] = statuses.get(status, 0) + count
+    requests = sum(api.stats.requests for api in apis)
+    latencies = run["latencies"]
+    result = {
+        "client": args.client,
+        "response_format": args.response_format,
+        "replicas": args.replicas,
+        "server": vars(apis[0].config),
+        "prompts": args.prompts,
+        "ok": run["ok"],
+        "failed": run["failed"],
+        "elapsed": run["elapsed"],
+        "throughput": run["ok"] / run["elapsed"] if run["elapsed"] else 0.0,
+        "latency": {f"p{int(q * 100)}": percentile(latencies, q) for q in (0.5, 0.9, 0.99)},
+        "server_requests": requests,
+        "statuses": statuses,
+        "retry_amplification": requests / args.prompts,
+        "bytes_sent": sum(api.stats.bytes_sent for api in apis),
+    }
+    latency = result["latency"]
+    print(f"{args.client} client, {args.response_format}, {args.replicas} replica(s), {args.prompts} prompts")
+    print(f"  ok {result['ok']}, failed {result['failed']} in {result['elapsed']:.1f}s "
+          f"({result['throughput']:.1f} images/s)")
+    print(f"  latency p50 {latency['p50'] * 1000:.0f} ms, p90 {latency['p90'] * 1000:.0f} ms, "
+          f"p99 {latency['p99'] * 1000:.0f} ms")
+    print(f"  server requests {requests} ({result['retry_amplification']:.2f} per prompt), "
+          f"statuses {statuses}")
+    if run["errors"]:
+        print(f"  first error: {run['errors'][0]}")
+    return result
+
+
+async def main_async(args) -> None:
+    apis = [FakeImagesAPI(config_from_args(args)) for _ in range(args.replicas)]
+    servers = [await serve(api) for api in apis]
+    shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
+    try:
+        urls = [url for _, url in servers]
+        for api in apis:
+            api.reset()
+        run = await (run_async if args.client == "async" else run_sync)(args, urls)
+    finally:
+        for runner, _ in servers:
+            await runner.cleanup()
+        shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
+    result = report(args, run, apis)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--client", choices=("async", "sync"), default="async")
+    parser.add_argument("--prompts", type=int, default=500)
+    parser.add_argument("--response-format", choices=("url", "b64_json"), default="url")
+    parser.add_argument("--replicas", type=int, default=1, help="fake servers to route across (async client)")
+    parser.add_argument("--concurrency", type=int, default=0, help="fixed in-flight limit; 0 keeps the adaptive one")
+    parser.add_argument("--threads", type=int, default=8, help="sync client worker threads")
+    parser.add_argument("--retry-delay", type=float, default=None, help="override config retry_delay")
+    parser.add_argument("--json", help="also write the results to this file")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    if args.client == "sync" and args.replicas != 1:
+        parser.error("--replicas needs the async client")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
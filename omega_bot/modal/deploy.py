@@ -11,6 +11,7 @@ from .metrics import (
     TOTAL_REQUESTS,
     FAILED_REQUESTS,
     GENERATION_TIME,
+    STAGE_TIME,
     MEMORY_USAGE
 )
 
@@ -57,14 +58,18 @@ async def webhook_handler(raw_body: bytes):
     """Handle webhook requests from Telegram."""
     try:
         TOTAL_REQUESTS.inc()
-        with GENERATION_TIME.time():
+        from omega_bot.utils.tracing import tracer
+        if not tracer.listeners:
+            tracer.add_listener(lambda span: STAGE_TIME.labels(span.name).observe(span.duration))
+        with GENERATION_TIME.time(), tracer.span("webhook"):
             from omega_bot.core.webhook_bot import OmegaWebhookBot
             
             # Parse the update
             update_data = json.loads(raw_body)
             
             # Initialize and run bot
-            bot = OmegaWebhookBot()
+            with tracer.span("bot_init"):
+                bot = OmegaWebhookBot()
             await bot.run_webhook(update_data)
             
             return {"status": "success"}
@@ -75,8 +80,9 @@ async def webhook_handler(raw_body: bytes):
 @stub.function(image=image)
 @asgi_app()
 def metrics():
-    """Expose Prometheus metrics."""
-    return make_asgi_app()
+    """Expose Prometheus metrics, aggregated across workers in multiprocess mode."""
+    from omega_bot.utils.prometheus import exporter_registry
+    return make_asgi_app(registry=exporter_registry())
 
 @stub.function(image=image)
 @web_endpoint(method="GET")
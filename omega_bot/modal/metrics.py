@@ -1,5 +1,10 @@
 """
 Metrics configuration for Modal deployment.
+
+All metrics here are Counters, Histograms and Summaries, which are
+multiprocess-safe: with PROMETHEUS_MULTIPROC_DIR set before the workers
+start, their values are shared through files in that directory and the
+metrics endpoint serves the aggregate.
 """
 
 from prometheus_client import Counter, Histogram, Summary
@@ -19,7 +24,14 @@ FAILED_REQUESTS = Counter(
 GENERATION_TIME = Histogram(
     'omega_bot_image_generation_seconds',
     'Time spent generating images',
-    buckets=[1, 2, 5, 10, 20, 30, 60]
+    buckets=[1, 2, 5, 10, 20, 30, 60, 120, 300, 600]
+)
+
+STAGE_TIME = Histogram(
+    'omega_bot_stage_seconds',
+    'Time spent in each request stage',
+    ['stage'],
+    buckets=[0.005, 0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300]
 )
 
 GENERATION_FAILURES = Counter(
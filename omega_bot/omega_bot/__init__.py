@@ -3,12 +3,18 @@ Omega Text to Image Bot
 A Telegram bot for generating images from text descriptions using AI models.
 """
 
-from omega_bot.core.bot import OmegaBot
-from omega_bot.core.generator import ImageGenerator
-from omega_bot.core.models import ModelDownloader
-from omega_bot.data.settings_manager import SettingsManager
-from omega_bot.security.rate_limiter import RateLimiter
-from omega_bot.utils.error_handler import BotError
+import importlib
+
+# Main classes are imported on first use, so stdlib-only modules such as
+# omega_bot.utils.router can be imported without the bot's dependencies
+_EXPORTS = {
+    "OmegaBot": "omega_bot.core.bot",
+    "ImageGenerator": "omega_bot.core.generator",
+    "ModelDownloader": "omega_bot.core.models",
+    "SettingsManager": "omega_bot.data.settings_manager",
+    "RateLimiter": "omega_bot.security.rate_limiter",
+    "BotError": "omega_bot.utils.error_handler",
+}
 
 __version__ = "1.0.0"
 __author__ = "Omega-Open-AI"
@@ -23,3 +29,9 @@ __all__ = [
     "RateLimiter",
     "BotError"
 ]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,112 @@
+"""
+Generation Backends
+Adapters that let the bot route generations across its local pipeline and
+remote images APIs (other replicas, hosted services).
+
+Author: Omega-Open-AI
+Date: 2025-01-22
+"""
+
+import base64
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from omega_bot.core.generator import ImageGenerator
+from omega_bot.data.settings_manager import SettingsManager
+from omega_bot.utils.error_handler import BotError
+from omega_bot.utils.router import Backend, Router
+
+logger = logging.getLogger(__name__)
+
+
+class LocalPipelineBackend(Backend):
+    """The in-process diffusion pipeline.
+
+    A cancelled hedge stops waiting for the result, but the inference
+    already running in the executor finishes and its image is discarded.
+    """
+
+    def __init__(self, generator: ImageGenerator, name: str = "local"):
+        self.generator = generator
+        self.name = name
+
+    async def generate(self, prompt: str, model: Optional[str] = None, **params: Any) -> str:
+        return await self.generator.generate(prompt, model_name=model, parameters=params or None)
+
+
+class RemoteImagesBackend(Backend):
+    """An OpenAI-compatible images endpoint, e.g. another bot replica.
+
+    Images are requested as ``b64_json`` and written to ``output_dir``, so
+    callers get a file path just as from the local pipeline.
+    """
+
+    def __init__(self, name: str, url: str, output_dir: Path, api_key: Optional[str] = None,
+                 timeout: float = 300, size: Optional[str] = None):
+        self.name = name
+        self.url = url
+        self.output_dir = Path(output_dir)
+        self.api_key = api_key
+        self.timeout = timeout
+        self.size = size
+
+    async def generate(self, prompt: str, model: Optional[str] = None, **params: Any) -> str:
+        import aiohttp
+
+        body: Dict[str, Any] = {"prompt": prompt, "n": 1, "response_format": "b64_json", **params}
+        if model:
+            body["model"] = model
+        if self.size:
+            body.setdefault("size", self.size)
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+            async with session.post(self.url, json=body) as response:
+                if response.status >= 400:
+                    raise BotError(f"{self.name} returned {response.status} {response.reason}")
+                data = await response.json()
+        output_path = self.output_dir / f"generated_{os.urandom(8).hex()}.png"
+        output_path.write_bytes(base64.b64decode(data["data"][0]["b64_json"]))
+        return str(output_path)
+
+
+def build_backend(settings: SettingsManager, generator: ImageGenerator) -> Backend:
+    """The local pipeline, or a router over ``generation.backends`` when configured.
+
+    Each entry has a ``name`` and a ``type``: ``local`` for the in-process
+    pipeline, or ``remote`` with a ``url`` and optionally ``api_key_env``
+    naming the environment variable holding its key.
+    """
+    entries: List[Dict[str, Any]] = settings.get("generation.backends", []) or []
+    if not entries:
+        return LocalPipelineBackend(generator)
+
+    backends: List[Backend] = []
+    for entry in entries:
+        kind = entry.get("type", "remote")
+        name = entry.get("name") or entry.get("url") or kind
+        if kind == "local":
+            backends.append(LocalPipelineBackend(generator, name))
+        elif kind == "remote":
+            if not entry.get("url"):
+                raise BotError(f"Backend {name} has no url")
+            backends.append(RemoteImagesBackend(
+                name, entry["url"], generator.output_dir,
+                api_key=os.getenv(entry["api_key_env"]) if entry.get("api_key_env") else None,
+                timeout=generator.timeout,
+                size=f"{generator.max_size}x{generator.max_size}",
+            ))
+        else:
+            raise BotError(f"Unknown backend type for {name}: {kind}")
+    logger.info(f"Routing generations across backends: {', '.join(b.name for b in backends)}")
+    routing = settings.get("generation.routing", {}) or {}
+    return Router(
+        backends,
+        max_attempts=routing.get("max_attempts", 2),
+        hedge_after=routing.get("hedge_after"),
+        hedge_budget=routing.get("hedge_budget", 0.1),
+        failure_threshold=routing.get("circuit_failures", 5),
+        open_seconds=routing.get("circuit_open_seconds", 30.0),
+    )
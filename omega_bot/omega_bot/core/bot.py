@@ -6,9 +6,12 @@ Author: Omega-Open-AI
 Date: 2025-01-22
 """
 
+import asyncio
 import logging
+import math
 import os
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, Union
 
 from telegram import Update
 from telegram.ext import (
@@ -19,10 +22,18 @@ from telegram.ext import (
     filters,
 )
 
+from omega_bot.core.backends import build_backend
 from omega_bot.core.generator import ImageGenerator
+from omega_bot.core.image_cache import TieredImageCache, cache_key
+from omega_bot.core.prompt_index import PromptIndex, PromptIndexConfig
+from omega_bot.data.model_store import ModelStore
 from omega_bot.data.settings_manager import SettingsManager
 from omega_bot.security.rate_limiter import RateLimiter
 from omega_bot.utils.error_handler import BotError
+from omega_bot.utils.heap import HeapDiagnostics
+from omega_bot.utils.monitoring import MetricsCollector
+from omega_bot.utils.profiler import SamplingProfiler
+from omega_bot.utils.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +43,36 @@ class OmegaBot:
     def __init__(self, config_path: str = "config/settings.yaml"):
         """Initialize the bot with configuration."""
         self.settings = SettingsManager(config_path)
-        self.generator = ImageGenerator()
+        # core.config imports this module, so the downloader is imported here
+        from omega_bot.core.models import ModelDownloader
+
+        self.model_store = ModelStore(ModelDownloader())
+        self.generator = ImageGenerator(model_store=self.model_store)
+        self.backend = build_backend(self.settings, self.generator)
         self.rate_limiter = RateLimiter()
+        self.admin_users = set(self.settings.get("bot.admin_users", []) or [])
+        self.profiler = SamplingProfiler()
+        self.heap = HeapDiagnostics()
+        self.image_cache = TieredImageCache.from_settings(self.settings)
+        tracer.configure(
+            sample_rate=self.settings.get("monitoring.trace_sample_rate", 0.0),
+            export_path=self.settings.get("monitoring.trace_file"),
+        )
+        self.metrics = None
+        self._metrics_task: Optional[asyncio.Task] = None
+        if self.settings.get("monitoring.enabled", False):
+            self.metrics = MetricsCollector(
+                prometheus_port=self.settings.get("monitoring.metrics_port", 9090),
+                resource_interval=self.settings.get("monitoring.resource_interval", 60),
+            )
+            tracer.add_listener(self.metrics.observe_span)
+        self.prompt_index = None
+        if self.settings.get("generation.approximate_cache", False):
+            self.prompt_index = PromptIndex(PromptIndexConfig(
+                threshold=self.settings.get("generation.approximate_threshold", 0.8),
+                capacity=self.settings.get("generation.approximate_capacity", 10000)
+            ))
+            self.image_cache.on_remove = self.prompt_index.remove
         
         # Initialize bot token from environment or config
         self.token = os.getenv("BOT_TOKEN") or self.settings.get("bot.token")
@@ -56,13 +95,25 @@ class OmegaBot:
 
     async def generate_image(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle the /generate command."""
+        with tracer.span("generate_image", model=self.generator.default_model):
+            success = await self._generate_image(update, context)
+        if self.metrics is not None:
+            await self.metrics.record_request(
+                "generate", update.effective_user.id, success, prompt=" ".join(context.args or [])
+            )
+
+    async def _generate_image(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+        """Answer one /generate; returns whether an image was sent."""
+        user_id = update.effective_user.id
         try:
             # Check rate limit
-            if not self.rate_limiter.can_process(update.effective_user.id):
+            if not self.rate_limiter.can_process(user_id):
+                if self.metrics is not None:
+                    await self.metrics.record_rate_limit(user_id)
                 await update.message.reply_text(
                     "?? Rate limit exceeded. Please try again later."
                 )
-                return
+                return False
 
             # Get the prompt from the command
             prompt = " ".join(context.args)
@@ -71,7 +122,27 @@ class OmegaBot:
                     "Please provide a description for the image.\n"
                     "Example: /generate a beautiful sunset over mountains"
                 )
-                return
+                return False
+
+            # Serve repeated prompts from the image cache
+            model = self.generator.default_model
+            key = cache_key(prompt, model)
+            with tracer.span("cache_lookup") as span:
+                cached = await self.image_cache.get(key)
+                if cached is None and self.prompt_index is not None:
+                    match = self.prompt_index.lookup(prompt, model)
+                    if match is not None:
+                        cached = await self.image_cache.get(match[0])
+                span.set_attribute("hit", cached is not None)
+            if self.metrics is not None:
+                await (self.metrics.record_cache_hit() if cached is not None else self.metrics.record_cache_miss())
+            if cached is not None:
+                with tracer.span("upload"):
+                    await update.message.reply_photo(
+                        photo=cached,
+                        caption=f"?? Generated image for: {prompt}"
+                    )
+                return True
 
             # Send processing message
             processing_message = await update.message.reply_text(
@@ -79,18 +150,30 @@ class OmegaBot:
             )
 
             # Generate the image
-            image_path = await self.generator.generate(prompt)
+            started = time.perf_counter()
+            try:
+                image_path = await self.backend.generate(prompt)
+            except Exception:
+                await self._record_generation(user_id, prompt, started, False, model)
+                raise
+            await self._record_generation(user_id, prompt, started, True, model)
+            with open(image_path, "rb") as image:
+                image_bytes = image.read()
+            await self.image_cache.set(key, image_bytes)
+            if self.prompt_index is not None:
+                self.prompt_index.add(prompt, model, None, key)
 
             # Send the generated image
-            with open(image_path, "rb") as image:
+            with tracer.span("upload"):
                 await update.message.reply_photo(
-                    photo=image,
+                    photo=image_bytes,
                     caption=f"?? Generated image for: {prompt}"
                 )
 
             # Clean up
             os.remove(image_path)
             await processing_message.delete()
+            return True
 
         except BotError as e:
             await update.message.reply_text(f"Error: {str(e)}")
@@ -99,6 +182,13 @@ class OmegaBot:
             await update.message.reply_text(
                 "? An error occurred while generating the image. Please try again later."
             )
+        return False
+
+    async def _record_generation(self, user_id: int, prompt: str, started: float, success: bool, model: str) -> None:
+        if self.metrics is not None:
+            await self.metrics.record_generation(
+                user_id, prompt, time.perf_counter() - started, success, model_id=model
+            )
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle the /help command."""
@@ -117,16 +207,97 @@ class OmegaBot:
         )
         await update.message.reply_text(help_text)
 
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle the /profile [seconds] admin command: send collapsed CPU stacks."""
+        if update.effective_user.id not in self.admin_users:
+            await update.message.reply_text("? This command is for administrators only.")
+            return
+        try:
+            seconds = float(context.args[0]) if context.args else 10.0
+        except ValueError:
+            seconds = math.nan
+        if not math.isfinite(seconds):
+            await update.message.reply_text("Usage: /profile [seconds]")
+            return
+
+        await update.message.reply_text(f"Profiling for {seconds:g}s...")
+        try:
+            result = await self.profiler.profile_async(seconds)
+        except BotError as e:
+            await update.message.reply_text(f"Error: {str(e)}")
+            return
+        await update.message.reply_document(
+            document=result.collapsed().encode("utf-8"),
+            filename="profile.collapsed",
+            caption=(
+                f"{result.samples} samples over {result.duration:.1f}s, "
+                f"{result.overhead:.2%} sampling overhead"
+            )
+        )
+
+    async def heap_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle the /heap [stop] admin command: report heap growth since the last call."""
+        if update.effective_user.id not in self.admin_users:
+            await update.message.reply_text("? This command is for administrators only.")
+            return
+        if context.args and context.args[0] == "stop":
+            self.heap.stop()
+            await update.message.reply_text("Heap tracing stopped.")
+            return
+
+        report = await self.heap.report_async(limit=10)
+        lines = [f"Traced: {report['heap']['traced_bytes'] / 1024 / 1024:.1f} MiB"]
+        growth = report["heap"].get("growth_since_previous")
+        if growth is None:
+            lines.append("Tracing started; run /heap again later to see growth.")
+        for site in growth or []:
+            lines.append(f"+{site['size_diff'] / 1024:.0f} KiB ({site['count_diff']:+d}) {site['site']}")
+        lines.append("Objects: " + ", ".join(f"{k}={v}" for k, v in report["objects"].items() if v))
+        for owner, devices in report["tensors"].items():
+            usage = ", ".join(f"{device} {size / 1024 / 1024:.0f} MiB" for device, size in devices.items())
+            lines.append(f"Tensors {owner}: {usage}")
+        await update.message.reply_text("\n".join(lines))
+
+    def build_application(self, base_url: Optional[str] = None, concurrent_updates: Union[bool, int] = False) -> Application:
+        """Create the Telegram application with the bot's command handlers.
+
+        ``base_url`` points the Bot API client elsewhere, e.g. at a local
+        fake; ``concurrent_updates`` lets handlers for several updates run
+        at once instead of one after another.
+        """
+        builder = Application.builder().token(self.token)
+        if base_url:
+            builder = builder.base_url(base_url)
+        if concurrent_updates:
+            builder = builder.concurrent_updates(concurrent_updates)
+        application = builder.post_init(self._post_init).post_shutdown(self._post_shutdown).build()
+
+        # Add command handlers
+        application.add_handler(CommandHandler("start", self.start))
+        application.add_handler(CommandHandler("help", self.help_command))
+        application.add_handler(CommandHandler("generate", self.generate_image))
+        application.add_handler(CommandHandler("profile", self.profile_command))
+        application.add_handler(CommandHandler("heap", self.heap_command))
+        return application
+
+    async def _post_init(self, application: Application) -> None:
+        """Start background work once the application's event loop is running."""
+        self.model_store.start()
+        if self.metrics is not None:
+            self._metrics_task = asyncio.ensure_future(self.metrics.start_collection())
+
+    async def _post_shutdown(self, application: Application) -> None:
+        """Stop background work and persist model usage."""
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            await asyncio.gather(self._metrics_task, return_exceptions=True)
+            self._metrics_task = None
+        await self.model_store.stop()
+
     def run(self) -> None:
         """Run the bot."""
         try:
-            # Create application and add handlers
-            application = Application.builder().token(self.token).build()
-            
-            # Add command handlers
-            application.add_handler(CommandHandler("start", self.start))
-            application.add_handler(CommandHandler("help", self.help_command))
-            application.add_handler(CommandHandler("generate", self.generate_image))
+            application = self.build_application()
             
             # Start the bot
             logger.info("Starting Omega Bot...")
@@ -145,4 +316,4 @@ if __name__ == "__main__":
     
     # Create and run the bot
     bot = OmegaBot()
-    bot.run()
+    bot.run()
@@ -1,94 +1,365 @@
 # omega_bot/core/cache.py
-from typing import Any, Optional
-from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 import asyncio
+import heapq
+import itertools
+import sys
+import time
 from dataclasses import dataclass
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by a cached value, in bytes."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return sys.getsizeof(value)
+
 @dataclass
 class CacheConfig:
-    max_size: int = 100
+    max_bytes: int = 100 * 1024 * 1024
+    max_entries: Optional[int] = None
     ttl: int = 3600  # Time to live in seconds
     cleanup_interval: int = 300  # Cleanup interval in seconds
+    policy: str = "lru"  # lru, lfu or slru
+    protected_ratio: float = 0.8  # share of max_bytes for the SLRU protected segment
+    sizeof: Callable[[Any], int] = estimate_size
+
+class EvictionPolicy(ABC):
+    """Decides which key to evict; every operation must be O(1).
+
+    ``on_insert`` is only called for keys the policy is not tracking yet.
+    """
+
+    @abstractmethod
+    def on_insert(self, key: Hashable, size: int) -> None:
+        ...
+
+    @abstractmethod
+    def on_access(self, key: Hashable) -> None:
+        ...
+
+    @abstractmethod
+    def on_remove(self, key: Hashable) -> None:
+        ...
+
+    @abstractmethod
+    def victim(self) -> Hashable:
+        ...
+
+class LRUPolicy(EvictionPolicy):
+    """Evict the least recently used key."""
+
+    def __init__(self, config: CacheConfig):
+        self._order: "OrderedDict[Hashable, None]" = OrderedDict()
+
+    def on_insert(self, key, size):
+        self._order[key] = None
+
+    def on_access(self, key):
+        self._order.move_to_end(key)
+
+    def on_remove(self, key):
+        self._order.pop(key, None)
+
+    def victim(self):
+        return next(iter(self._order))
+
+class LFUPolicy(EvictionPolicy):
+    """Evict the least frequently used key, oldest first among ties.
+
+    Keys live in one insertion-ordered bucket per access count, and the
+    smallest non-empty count is tracked, which keeps every step O(1).
+    """
+
+    def __init__(self, config: CacheConfig):
+        self._freq: Dict[Hashable, int] = {}
+        self._buckets: Dict[int, "OrderedDict[Hashable, None]"] = {}
+        self._min_freq = 0
+
+    def _add(self, key, freq):
+        self._freq[key] = freq
+        self._buckets.setdefault(freq, OrderedDict())[key] = None
+
+    def _discard(self, key) -> Tuple[int, bool]:
+        """Unlink ``key``; returns its count and whether its bucket emptied."""
+        freq = self._freq.pop(key)
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if bucket:
+            return freq, False
+        del self._buckets[freq]
+        return freq, True
+
+    def on_insert(self, key, size):
+        self._add(key, 1)
+        self._min_freq = 1
+
+    def on_access(self, key):
+        freq, emptied = self._discard(key)
+        self._add(key, freq + 1)
+        if emptied and self._min_freq == freq:
+            self._min_freq = freq + 1
+
+    def on_remove(self, key):
+        if key not in self._freq:
+            return
+        freq, emptied = self._discard(key)
+        if emptied and self._min_freq == freq:
+            # Bounded by the number of distinct counts, not the number of keys
+            self._min_freq = min(self._buckets) if self._buckets else 0
+
+    def victim(self):
+        return next(iter(self._buckets[self._min_freq]))
+
+class SLRUPolicy(EvictionPolicy):
+    """Segmented LRU: keys hit twice move to a protected segment.
+
+    One-off keys are evicted from the probationary segment first, so a burst
+    of unique prompts cannot flush out the popular ones.
+    """
+
+    def __init__(self, config: CacheConfig):
+        self._probation: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._protected: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._protected_bytes = 0
+        self._protected_limit = int(config.max_bytes * config.protected_ratio)
+
+    def on_insert(self, key, size):
+        self._probation[key] = size
+
+    def on_access(self, key):
+        if key in self._protected:
+            self._protected.move_to_end(key)
+            return
+        size = self._probation.pop(key)
+        self._protected[key] = size
+        self._protected_bytes += size
+        while self._protected_bytes > self._protected_limit and len(self._protected) > 1:
+            demoted, demoted_size = self._protected.popitem(last=False)
+            self._protected_bytes -= demoted_size
+            self._probation[demoted] = demoted_size
+
+    def on_remove(self, key):
+        if key in self._protected:
+            self._protected_bytes -= self._protected.pop(key)
+        else:
+            self._probation.pop(key, None)
+
+    def victim(self):
+        if self._probation:
+            return next(iter(self._probation))
+        return next(iter(self._protected))
+
+EVICTION_POLICIES = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "slru": SLRUPolicy,
+}
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
 
 class LRUCache:
-    def __init__(self, config: Optional[CacheConfig] = None):
+    """Byte-budgeted cache with TTL expiry and a pluggable eviction policy.
+
+    Lookups, inserts and evictions are O(1); scheduling an expiry is a heap
+    push. Expired entries are dropped lazily on access and from the top of
+    the expiry heap, never by scanning the whole cache.
+
+    ``on_evict`` is called with each key and value pushed out by the budget
+    (not by expiry), which lets a slower tier take over the entry;
+    ``on_expire`` is called with each key dropped because its TTL passed.
+
+    The ``*_nowait`` methods never await, so they are safe to call from any
+    coroutine on the cache's event loop without a lock. The async methods
+    are thin wrappers kept for existing callers.
+    """
+
+    def __init__(
+        self,
+        config: Optional[CacheConfig] = None,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        on_expire: Optional[Callable[[Hashable], None]] = None
+    ):
         self.config = config or CacheConfig()
-        self.cache: Dict[str, Any] = {}
-        self.timestamps: Dict[str, datetime] = {}
-        self.access_count: Dict[str, int] = {}
-        self._lock = asyncio.Lock()
-        self._start_cleanup_task()
-        
+        self.on_evict = on_evict
+        self.on_expire = on_expire
+        if self.config.policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {self.config.policy}")
+        self.policy: EvictionPolicy = EVICTION_POLICIES[self.config.policy](self.config)
+        self._clock = clock
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._expiry_heap: list = []  # (expires_at, seq, key); stale items skipped on pop
+        self._sequence = itertools.count()
+        self.size_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> list:
+        return list(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires_at > self._clock()
+
     def _start_cleanup_task(self):
-        """Start periodic cache cleanup task."""
-        asyncio.create_task(self._periodic_cleanup())
-        
+        """Start periodic cache cleanup task once an event loop is running."""
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.ensure_future(self._periodic_cleanup())
+
     async def _periodic_cleanup(self):
         """Periodically clean up expired cache entries."""
         while True:
             await asyncio.sleep(self.config.cleanup_interval)
-            await self.cleanup()
-            
-    async def get(self, key: str) -> Optional[Any]:
+            self.cleanup_nowait()
+
+    def get_nowait(self, key: Hashable, default: Any = None) -> Any:
+        """Get value from cache without awaiting."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return default
+        if entry.expires_at <= self._clock():
+            self._drop(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            if self.on_expire is not None:
+                self.on_expire(key)
+            return default
+        self.policy.on_access(key)
+        self.stats["hits"] += 1
+        return entry.value
+
+    def set_nowait(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> bool:
+        """Set value in cache without awaiting.
+
+        Returns False when the value alone is larger than the byte budget
+        and was therefore not cached.
+        """
+        size = self.config.sizeof(value) if size is None else size
+        if size > self.config.max_bytes:
+            self.remove_nowait(key)
+            return False
+
+        now = self._clock()
+        self._expire(now)
+        if key in self._entries:
+            self._drop(key)
+        self._evict_for(size)
+
+        expires_at = now + (self.config.ttl if ttl is None else ttl)
+        self._entries[key] = _Entry(value, size, expires_at)
+        self.size_bytes += size
+        self.policy.on_insert(key, size)
+        heapq.heappush(self._expiry_heap, (expires_at, next(self._sequence), key))
+        return True
+
+    def remove_nowait(self, key: Hashable) -> bool:
+        """Remove item from cache without awaiting."""
+        if key not in self._entries:
+            return False
+        self._drop(key)
+        return True
+
+    def cleanup_nowait(self) -> int:
+        """Drop every expired entry and return how many were removed."""
+        removed = self._expire(self._clock())
+        # Lazily invalidated heap items pile up when keys are overwritten or
+        # evicted; rebuild once they clearly outnumber live entries
+        if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [
+                (e.expires_at, next(self._sequence), k) for k, e in self._entries.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+        return removed
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._drop(key)
+        self._expiry_heap.clear()
+
+    async def get(self, key: Hashable) -> Optional[Any]:
         """Get value from cache."""
-        async with self._lock:
-            if key not in self.cache:
-                return None
-                
-            if self._is_expired(key):
-                await self.remove(key)
-                return None
-                
-            self.access_count[key] += 1
-            self.timestamps[key] = datetime.utcnow()
-            return self.cache[key]
-            
-    async def set(self, key: str, value: Any) -> None:
+        self._start_cleanup_task()
+        return self.get_nowait(key)
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
         """Set value in cache."""
-        async with self._lock:
-            if len(self.cache) >= self.config.max_size:
-                await self._evict_lru()
-                
-            self.cache[key] = value
-            self.timestamps[key] = datetime.utcnow()
-            self.access_count[key] = 0
-            
-    async def remove(self, key: str) -> None:
+        self._start_cleanup_task()
+        self.set_nowait(key, value, ttl)
+
+    async def remove(self, key: Hashable) -> None:
         """Remove item from cache."""
-        async with self._lock:
-            if key in self.cache:
-                del self.cache[key]
-                del self.timestamps[key]
-                del self.access_count[key]
-                
+        self.remove_nowait(key)
+
     async def cleanup(self) -> None:
         """Clean up expired cache entries."""
-        async with self._lock:
-            now = datetime.utcnow()
-            expired_keys = [
-                key for key, timestamp in self.timestamps.items()
-                if (now - timestamp).total_seconds() > self.config.ttl
-            ]
-            
-            for key in expired_keys:
-                await self.remove(key)
-                
-    def _is_expired(self, key: str) -> bool:
-        """Check if cache entry is expired."""
-        age = datetime.utcnow() - self.timestamps[key]
-        return age.total_seconds() > self.config.ttl
-        
-    async def _evict_lru(self) -> None:
-        """Evict least recently used item from cache."""
-        if not self.cache:
-            return
-            
-        # Find least recently used item
-        lru_key = min(
-            self.timestamps.keys(),
-            key=lambda k: (self.access_count[k], self.timestamps[k])
-        )
-        await self.remove(lru_key)
+        self.cleanup_nowait()
+
+    def close(self) -> None:
+        """Stop the periodic cleanup task."""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.config.max_bytes,
+            "hit_rate": (self.stats["hits"] / lookups * 100) if lookups else 0.0,
+        }
+
+    def _drop(self, key: Hashable) -> _Entry:
+        entry = self._entries.pop(key)
+        self.size_bytes -= entry.size
+        self.policy.on_remove(key)
+        return entry
+
+    def _expire(self, now: float) -> int:
+        """Pop expired items off the heap; stale heap items are discarded."""
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at == expires_at:
+                self._drop(key)
+                self.stats["expirations"] += 1
+                removed += 1
+                if self.on_expire is not None:
+                    self.on_expire(key)
+        return removed
+
+    def _evict_for(self, size: int) -> None:
+        """Evict until an entry of ``size`` bytes fits both budgets."""
+        max_entries = self.config.max_entries
+        while self._entries and (
+            self.size_bytes + size > self.config.max_bytes
+            or (max_entries is not None and len(self._entries) >= max_entries)
+        ):
+            victim = self.policy.victim()
+            entry = self._drop(victim)
+            self.stats["evictions"] += 1
+            if self.on_evict is not None:
+                self.on_evict(victim, entry.value)
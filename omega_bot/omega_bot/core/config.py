@@ -3,11 +3,13 @@ from datetime import datetime
 from typing import Dict, Optional, List
 
 class ModelInfo:
-    def __init__(self, name: str, model_id: str, description: str, civitai_url: str = None):
+    def __init__(self, name: str, model_id: str, description: str, civitai_url: str = None,
+                 sha256: str = None):
         self.name = name
         self.model_id = model_id
         self.description = description
         self.civitai_url = civitai_url
+        self.sha256 = sha256
         self.default_positive_prompt = "highly detailed, high quality"
         self.default_negative_prompt = "low quality, ugly, deformed"
 
@@ -34,6 +36,9 @@ class BotConfig:
     TEMP_DIR = os.getenv("TEMP_DIR", "/tmp/omega_bot")
     DEFAULT_MODEL = "flux"
     MAX_DAILY_GENERATIONS = int(os.getenv("MAX_DAILY_GENERATIONS", "50"))
+    DOWNLOAD_CONNECTIONS = int(os.getenv("DOWNLOAD_CONNECTIONS", "1"))
+    DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+    MODELS_QUOTA_BYTES = int(float(os.getenv("MODELS_QUOTA_GB", "50")) * 1024 ** 3)
 
     @staticmethod
     def is_user_allowed(user_id: int) -> bool:
@@ -19,16 +19,23 @@ from PIL import Image
 from omega_bot.data.settings_manager import SettingsManager
 from omega_bot.utils.error_handler import BotError
 from omega_bot.data.model_manager import ModelManager
+from omega_bot.data.model_store import ModelStore
+from omega_bot.utils.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 class ImageGenerator:
     """Handles image generation using various AI models."""
 
-    def __init__(self, config_path: str = "config/settings.yaml"):
-        """Initialize the image generator with configuration."""
+    def __init__(self, config_path: str = "config/settings.yaml", model_store: Optional[ModelStore] = None):
+        """Initialize the image generator with configuration.
+
+        With ``model_store``, checkpoints it can download are fetched through
+        it before loading and every generation is recorded as a use.
+        """
         self.settings = SettingsManager(config_path)
         self.model_manager = ModelManager()
+        self.model_store = model_store
         
         # Load generation settings
         self.max_size = self.settings.get("generation.max_image_size", 1024)
@@ -39,8 +46,10 @@ class ImageGenerator:
         self.output_dir = Path(self.settings.get("storage.output_dir", "output"))
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Initialize the pipeline
+        # Initialize the pipeline; one inference runs at a time
         self._pipeline = None
+        self._loaded_model: Optional[str] = None
+        self._inference_lock = asyncio.Lock()
 
     async def _load_model(self, model_name: Optional[str] = None) -> None:
         """Load the Stable Diffusion model."""
@@ -51,20 +60,35 @@ class ImageGenerator:
             if not model_info:
                 raise BotError(f"Model {model_name} not found in configuration")
             
+            # Downloadable checkpoints are kept on disk by the model store
+            from_store = self._store_manages(model_name)
+            if from_store:
+                checkpoint = str(await self.model_store.ensure_available(model_name))
+            else:
+                checkpoint = model_info["checkpoint"]
+
             # Load model in a separate thread to avoid blocking
             def load_pipeline():
-                return StableDiffusionPipeline.from_pretrained(
-                    model_info["checkpoint"],
+                load = StableDiffusionPipeline.from_single_file if from_store else StableDiffusionPipeline.from_pretrained
+                return load(
+                    checkpoint,
                     torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
                     safety_checker=model_info.get("requires_safety_checker", True),
                 )
             
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             self._pipeline = await loop.run_in_executor(None, load_pipeline)
             
             # Move to GPU if available
             if torch.cuda.is_available():
                 self._pipeline = self._pipeline.to("cuda")
+
+            # Keep the loaded checkpoint on disk while its pipeline is in use
+            if self.model_store is not None:
+                if self._loaded_model is not None:
+                    self.model_store.unpin(self._loaded_model)
+                self.model_store.pin(model_name)
+            self._loaded_model = model_name
                 
             logger.info(f"Successfully loaded model: {model_name}")
             
@@ -80,28 +104,57 @@ class ImageGenerator:
     ) -> str:
         """Generate an image from the given prompt."""
         try:
-            # Load model if not loaded or different model requested
-            if self._pipeline is None or (model_name and model_name != self.default_model):
-                await self._load_model(model_name)
-
-            # Get model parameters
-            model_info = self.model_manager.get_model_info(model_name or self.default_model)
-            params = {**model_info["default_parameters"], **(parameters or {})}
-
-            # Generate the image
-            logger.info(f"Generating image for prompt: {prompt}")
-            image = self._pipeline(
-                prompt,
-                num_inference_steps=params.get("num_inference_steps", 50),
-                guidance_scale=params.get("guidance_scale", 7.5),
-                negative_prompt=params.get("negative_prompt", ""),
-                width=self.max_size,
-                height=self.max_size,
-            ).images[0]
+            with tracer.span("queue_wait"):
+                await self._inference_lock.acquire()
+            try:
+                # Load model if not loaded or different model requested;
+                # loading through the store already records the use
+                if self._pipeline is None or (model_name and model_name != self.default_model):
+                    with tracer.span("model_load", model=model_name or self.default_model):
+                        await self._load_model(model_name)
+                elif self._store_manages(model_name or self.default_model):
+                    self.model_store.record_use(model_name or self.default_model)
+
+                # Get model parameters
+                model_info = self.model_manager.get_model_info(model_name or self.default_model)
+                params = {**model_info["default_parameters"], **(parameters or {})}
+                guidance_scale = params.get("guidance_scale", 7.5)
+                loop = asyncio.get_running_loop()
+
+                # Encode the prompt separately so its cost shows up on its own
+                logger.info(f"Generating image for prompt: {prompt}")
+                with tracer.span("encode"):
+                    prompt_embeds, negative_prompt_embeds = await loop.run_in_executor(
+                        None,
+                        lambda: self._pipeline.encode_prompt(
+                            prompt,
+                            self._pipeline.device,
+                            1,
+                            guidance_scale > 1,
+                            negative_prompt=params.get("negative_prompt", ""),
+                        )
+                    )
+
+                # Generate the image
+                with tracer.span("inference", steps=params.get("num_inference_steps", 50)):
+                    image = await loop.run_in_executor(
+                        None,
+                        lambda: self._pipeline(
+                            prompt_embeds=prompt_embeds,
+                            negative_prompt_embeds=negative_prompt_embeds,
+                            num_inference_steps=params.get("num_inference_steps", 50),
+                            guidance_scale=guidance_scale,
+                            width=self.max_size,
+                            height=self.max_size,
+                        ).images[0]
+                    )
+            finally:
+                self._inference_lock.release()
 
             # Save the generated image
             output_path = self.output_dir / f"generated_{os.urandom(8).hex()}.png"
-            image.save(output_path)
+            with tracer.span("image_encode"):
+                await loop.run_in_executor(None, image.save, output_path)
             logger.info(f"Image saved to: {output_path}")
 
             return str(output_path)
@@ -110,6 +163,10 @@ class ImageGenerator:
             logger.error(f"Error generating image: {str(e)}")
             raise BotError(f"Image generation failed: {str(e)}")
 
+    def _store_manages(self, model_name: str) -> bool:
+        """Check whether ``model_name`` is a checkpoint the model store downloads."""
+        return self.model_store is not None and self.model_store.manages(model_name)
+
     def __del__(self):
         """Cleanup resources."""
         if self._pipeline is not None and torch.cuda.is_available():
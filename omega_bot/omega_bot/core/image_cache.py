@@ -0,0 +1,545 @@
+# omega_bot/core/image_cache.py
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Set, Tuple
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from .cache import CacheConfig, LRUCache
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# key_len, value_len, expires_at, crc32(key + value)
+_RECORD = struct.Struct("<HIdI")
+_TOMBSTONE = 0xFFFFFFFF
+_INDEX_MAGIC = b"OMIX\x01"
+_INDEX_SEGMENT = struct.Struct("<IQ")  # segment id, bytes covered by the index
+_INDEX_ENTRY = struct.Struct("<HIQId")  # key_len, segment, offset, length, expires_at
+
+def cache_key(prompt: str, model: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+    """Build the cache key for one generation request."""
+    payload = json.dumps([prompt, model, parameters or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@dataclass
+class TieredCacheConfig:
+    cache_dir: str = "cache"
+    memory_bytes: int = 128 * 1024 * 1024
+    disk_bytes: int = 1024 * 1024 * 1024
+    segment_bytes: int = 64 * 1024 * 1024
+    ttl: int = 7 * 86400  # seconds
+    promote_after: int = 2  # disk hits before an entry is copied into memory
+    compact_ratio: float = 0.5  # garbage share that triggers segment compaction
+    write_through: bool = True  # persist on set, not only on demotion
+    maintenance_every: int = 64  # writes between compaction/index flushes
+
+class _Location:
+    __slots__ = ("segment", "offset", "length", "expires_at", "hits")
+
+    def __init__(self, segment: int, offset: int, length: int, expires_at: float):
+        self.segment = segment
+        self.offset = offset  # of the value, not the record header
+        self.length = length
+        self.expires_at = expires_at
+        self.hits = 0
+
+class SegmentStore:
+    """Append-only segment files read through mmap.
+
+    Each record is ``header | key | value``; deletes append a tombstone.
+    The in-memory index maps keys to value offsets and is persisted as a
+    compact binary file, so startup only replays records written after the
+    last index flush. Segments whose garbage share passes the threshold are
+    compacted by copying their live records forward.
+
+    ``on_drop`` is called with each key that leaves the store through a
+    delete, expiry or a dropped segment.
+    """
+
+    def __init__(self, config: TieredCacheConfig, on_drop: Optional[Callable[[str], None]] = None):
+        self.config = config
+        self.on_drop = on_drop
+        self.directory = Path(config.cache_dir)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._index: Dict[str, _Location] = {}
+        self._segment_keys: Dict[int, Set[str]] = {}
+        self._segment_size: Dict[int, int] = {}
+        self._segment_live: Dict[int, int] = {}
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._active: Optional[int] = None
+        self._writer = None
+        self._load()
+
+    # -- paths and bookkeeping -------------------------------------------
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"segment-{segment:08d}.dat"
+
+    @property
+    def _index_path(self) -> Path:
+        return self.directory / "index.bin"
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        location = self._index.get(key)
+        return location is not None and location.expires_at > time.time()
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(self._segment_size.values())
+
+    def garbage_ratio(self, segment: int) -> float:
+        size = self._segment_size.get(segment, 0)
+        return 1 - self._segment_live.get(segment, 0) / size if size else 0.0
+
+    def _track(self, key: str, location: _Location) -> None:
+        self._forget(key)
+        self._index[key] = location
+        self._segment_keys.setdefault(location.segment, set()).add(key)
+        self._segment_live[location.segment] = (
+            self._segment_live.get(location.segment, 0)
+            + _RECORD.size + len(key.encode("utf-8")) + location.length
+        )
+
+    def _forget(self, key: str) -> Optional[_Location]:
+        location = self._index.pop(key, None)
+        if location is not None:
+            self._segment_keys[location.segment].discard(key)
+            self._segment_live[location.segment] -= (
+                _RECORD.size + len(key.encode("utf-8")) + location.length
+            )
+        return location
+
+    def _dropped(self, key: str) -> None:
+        if self.on_drop is not None:
+            self.on_drop(key)
+
+    # -- loading ---------------------------------------------------------
+
+    def _load(self) -> None:
+        segments = sorted(
+            int(p.stem.split("-")[1]) for p in self.directory.glob("segment-*.dat")
+        )
+        for segment in segments:
+            self._segment_size[segment] = self._segment_path(segment).stat().st_size
+        covered = self._load_index(set(segments))
+        for segment in segments:
+            self._segment_keys.setdefault(segment, set())
+            self._segment_live.setdefault(segment, 0)
+            self._replay(segment, covered.get(segment, 0))
+        self._active = segments[-1] if segments else None
+        if self._index:
+            logger.info(f"Disk cache loaded {len(self._index)} entries from {len(segments)} segments")
+
+    def _load_index(self, segments: Set[int]) -> Dict[int, int]:
+        """Load the persisted index; returns how much of each segment it covers."""
+        try:
+            data = self._index_path.read_bytes()
+        except FileNotFoundError:
+            return {}
+        try:
+            if not data.startswith(_INDEX_MAGIC):
+                raise ValueError("bad magic")
+            pos = len(_INDEX_MAGIC)
+            (segment_count,) = struct.unpack_from("<I", data, pos)
+            pos += 4
+            covered = {}
+            for _ in range(segment_count):
+                segment, length = _INDEX_SEGMENT.unpack_from(data, pos)
+                pos += _INDEX_SEGMENT.size
+                covered[segment] = length
+            if any(s not in segments or n > self._segment_size[s] for s, n in covered.items()):
+                raise ValueError("index refers to missing or truncated segments")
+            while pos < len(data):
+                key_len, segment, offset, length, expires_at = _INDEX_ENTRY.unpack_from(data, pos)
+                pos += _INDEX_ENTRY.size
+                key = data[pos:pos + key_len].decode("utf-8")
+                pos += key_len
+                self._segment_keys.setdefault(segment, set())
+                self._segment_live.setdefault(segment, 0)
+                self._track(key, _Location(segment, offset, length, expires_at))
+            return covered
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            logger.warning(f"Rebuilding disk cache index: {str(e)}")
+            self._index.clear()
+            self._segment_keys.clear()
+            self._segment_live.clear()
+            return {}
+
+    def _replay(self, segment: int, start: int) -> None:
+        """Apply records appended after ``start``, truncating a torn tail."""
+        path = self._segment_path(segment)
+        size = self._segment_size[segment]
+        if start >= size:
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            key_len, value_len, expires_at, crc = _RECORD.unpack_from(data, pos)
+            body_start = pos + _RECORD.size
+            length = 0 if value_len == _TOMBSTONE else value_len
+            end = body_start + key_len + length
+            if end > len(data) or zlib.crc32(data[body_start:end]) != crc:
+                break
+            key = data[body_start:body_start + key_len].decode("utf-8")
+            if value_len == _TOMBSTONE:
+                self._forget(key)
+            else:
+                self._track(key, _Location(segment, start + body_start + key_len, length, expires_at))
+            pos = end
+        if start + pos < size:
+            logger.warning(f"Truncating torn tail of {path.name} at {start + pos}")
+            with open(path, "r+b") as f:
+                f.truncate(start + pos)
+            self._segment_size[segment] = start + pos
+
+    # -- writing ---------------------------------------------------------
+
+    def _append(self, key: str, value, expires_at: float, tombstone: bool = False) -> Tuple[int, int]:
+        """Append one record; returns the segment and the value offset."""
+        key_bytes = key.encode("utf-8")
+        length = 0 if tombstone else len(value)
+        record_size = _RECORD.size + len(key_bytes) + length
+        if (
+            self._active is None
+            or self._segment_size[self._active] + record_size > self.config.segment_bytes
+        ):
+            self._roll()
+
+        crc = zlib.crc32(key_bytes)
+        if not tombstone:
+            crc = zlib.crc32(value, crc)
+        header = _RECORD.pack(len(key_bytes), _TOMBSTONE if tombstone else length, expires_at, crc)
+        offset = self._segment_size[self._active]
+        self._writer.write(header)
+        self._writer.write(key_bytes)
+        if not tombstone:
+            self._writer.write(value)
+        self._writer.flush()
+        self._segment_size[self._active] = offset + record_size
+        return self._active, offset + _RECORD.size + len(key_bytes)
+
+    def _roll(self) -> None:
+        """Seal the active segment and start a new one."""
+        if self._writer is not None:
+            self._writer.close()
+        self._active = (self._active or 0) + 1
+        self._segment_size[self._active] = 0
+        self._segment_keys[self._active] = set()
+        self._segment_live[self._active] = 0
+        self._writer = open(self._segment_path(self._active), "ab")
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None and self._active is not None:
+            self._writer = open(self._segment_path(self._active), "ab")
+
+    def _put(self, key: str, value, expires_at: float) -> _Location:
+        self._ensure_writer()
+        segment, offset = self._append(key, value, expires_at)
+        location = _Location(segment, offset, len(value), expires_at)
+        self._track(key, location)
+        return location
+
+    def put(self, key: str, value, ttl: Optional[float] = None) -> None:
+        self._put(key, value, time.time() + (self.config.ttl if ttl is None else ttl))
+        self._enforce_budget()
+
+    def delete(self, key: str) -> bool:
+        if key not in self._index:
+            return False
+        self._ensure_writer()
+        self._append(key, b"", 0.0, tombstone=True)
+        self._forget(key)
+        self._dropped(key)
+        return True
+
+    # -- reading ---------------------------------------------------------
+
+    def _map(self, segment: int) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < self._segment_size[segment]:
+            # The active segment grows; remap it to cover newly appended records
+            with open(self._segment_path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """Return a zero-copy view of the value, or None."""
+        location = self._index.get(key)
+        if location is None:
+            return None
+        if location.expires_at <= time.time():
+            self.delete(key)
+            return None
+        location.hits += 1
+        view = memoryview(self._map(location.segment))
+        return view[location.offset:location.offset + location.length]
+
+    def hits(self, key: str) -> int:
+        location = self._index.get(key)
+        return location.hits if location else 0
+
+    # -- maintenance -----------------------------------------------------
+
+    def _drop_segment(self, segment: int) -> None:
+        for key in list(self._segment_keys.pop(segment, ())):
+            self._index.pop(key, None)
+            self._dropped(key)
+        self._segment_live.pop(segment, None)
+        self._segment_size.pop(segment, None)
+        # Views handed out earlier keep the mapping alive; just drop our reference
+        self._maps.pop(segment, None)
+        self._segment_path(segment).unlink(missing_ok=True)
+
+    def _enforce_budget(self) -> None:
+        """Drop the oldest sealed segments while the store is over budget."""
+        while self.size_bytes > self.config.disk_bytes and len(self._segment_size) > 1:
+            oldest = min(self._segment_size)
+            logger.info(f"Disk cache over budget, dropping segment {oldest}")
+            self._drop_segment(oldest)
+
+    def compact(self) -> int:
+        """Rewrite the sealed segment with the most garbage if past the threshold.
+
+        Returns the number of bytes reclaimed. One segment per call keeps each
+        maintenance step short.
+        """
+        now = time.time()
+        for key in [k for k, loc in self._index.items() if loc.expires_at <= now]:
+            self._forget(key)
+            self._dropped(key)
+
+        sealed = [s for s in self._segment_size if s != self._active]
+        if not sealed:
+            return 0
+        segment = max(sealed, key=self.garbage_ratio)
+        if self.garbage_ratio(segment) < self.config.compact_ratio:
+            return 0
+
+        before = self._segment_size[segment]
+        mapped = self._map(segment)
+        for key in list(self._segment_keys[segment]):
+            location = self._index[key]
+            value = mapped[location.offset:location.offset + location.length]
+            self._put(key, value, location.expires_at).hits = location.hits
+        self._drop_segment(segment)
+        logger.info(f"Compacted disk cache segment {segment}, reclaimed {before} bytes")
+        return before
+
+    def flush_index(self) -> None:
+        """Atomically write the compact index file."""
+        parts = [_INDEX_MAGIC, struct.pack("<I", len(self._segment_size))]
+        for segment, size in self._segment_size.items():
+            parts.append(_INDEX_SEGMENT.pack(segment, size))
+        for key, loc in self._index.items():
+            key_bytes = key.encode("utf-8")
+            parts.append(_INDEX_ENTRY.pack(len(key_bytes), loc.segment, loc.offset, loc.length, loc.expires_at))
+            parts.append(key_bytes)
+        tmp_path = self._index_path.with_name("index.bin.tmp")
+        tmp_path.write_bytes(b"".join(parts))
+        os.replace(tmp_path, self._index_path)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self.flush_index()
+        self._maps.clear()
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+class TieredImageCache:
+    """Hot in-memory tier over a persistent mmap-backed disk tier.
+
+    New images go to memory (and to disk when ``write_through`` is set).
+    Entries pushed out of memory are demoted to disk, and disk entries that
+    are hit ``promote_after`` times are copied back into memory. Disk hits
+    from ``get_nowait`` are zero-copy ``memoryview`` slices of the segment
+    mapping.
+
+    The async ``get``/``set`` keep the memory tier on the event loop and run
+    all disk-tier work on a single cache thread, so a handler never blocks on
+    a segment read, write or compaction. Demotions and disk removals are
+    queued and settled from the caller's thread, which keeps the memory tier
+    and ``on_remove`` off the cache thread.
+
+    ``on_remove`` is called with each key that is no longer held by either
+    tier, e.g. to keep an index over the cached keys in step.
+    """
+
+    def __init__(
+        self,
+        config: Optional[TieredCacheConfig] = None,
+        on_remove: Optional[Callable[[str], None]] = None
+    ):
+        self.config = config or TieredCacheConfig()
+        self.on_remove = on_remove
+        self._demoted: Deque[Tuple[str, Any]] = deque()
+        self._dropped: Deque[str] = deque()
+        self.disk = SegmentStore(self.config, on_drop=self._dropped.append)
+        self.memory = LRUCache(
+            CacheConfig(max_bytes=self.config.memory_bytes, ttl=self.config.ttl),
+            on_evict=self._demote,
+            on_expire=self._expired
+        )
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "promotions": 0, "demotions": 0}
+        self._writes = 0
+        self._disk_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-cache")
+
+    @classmethod
+    def from_settings(cls, settings) -> "TieredImageCache":
+        """Build the cache from the ``storage`` section of the bot settings."""
+        return cls(TieredCacheConfig(
+            cache_dir=settings.get("storage.cache_dir", "cache"),
+            memory_bytes=settings.get("storage.memory_cache_size", 128) * 1024 * 1024,
+            disk_bytes=settings.get("storage.max_cache_size", 1024) * 1024 * 1024,
+        ))
+
+    def _demote(self, key: str, value) -> None:
+        # Written to disk by the next disk operation, on whichever thread runs it
+        self._demoted.append((key, value))
+        self.stats["demotions"] += 1
+
+    def _expired(self, key: str) -> None:
+        if self.on_remove is not None and key not in self.disk:
+            self.on_remove(key)
+
+    def _write_demoted(self) -> None:
+        while self._demoted:
+            key, value = self._demoted.popleft()
+            if key not in self.disk:
+                self.disk.put(key, value)
+
+    def _report_dropped(self) -> None:
+        while self._dropped:
+            key = self._dropped.popleft()
+            if self.on_remove is not None and key not in self.memory:
+                self.on_remove(key)
+
+    def _read_disk(self, key: str) -> Tuple[Optional[bytes], int]:
+        view = self.disk.get(key)
+        if view is None:
+            return None, 0
+        return bytes(view), self.disk.hits(key)
+
+    def _write_disk(self, key: Optional[str], value: bytes, maintain: bool) -> int:
+        self._write_demoted()
+        if key is not None:
+            self.disk.put(key, value)
+        if not maintain:
+            return 0
+        reclaimed = self.disk.compact()
+        self.disk.flush_index()
+        return reclaimed
+
+    def _locked(self, func: Callable, *args):
+        with self._disk_lock:
+            return func(*args)
+
+    async def _on_disk(self, func: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._locked, func, *args)
+
+    def _start_write(self, key: str, value: bytes) -> Tuple[Optional[str], bool]:
+        self.memory.set_nowait(key, value)
+        self._writes += 1
+        maintain = self._writes % self.config.maintenance_every == 0
+        if maintain:
+            self.memory.cleanup_nowait()
+        return (key if self.config.write_through else None), maintain
+
+    def get_nowait(self, key: str):
+        """Return cached image bytes (or a memoryview for disk hits), or None."""
+        value = self.memory.get_nowait(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+        with self._disk_lock:
+            view = self.disk.get(key)
+            hits = self.disk.hits(key) if view is not None else 0
+        self._report_dropped()
+        if view is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["disk_hits"] += 1
+        if hits >= self.config.promote_after:
+            self.memory.set_nowait(key, bytes(view))
+            self.stats["promotions"] += 1
+            self._locked(self._write_demoted)
+        return view
+
+    def set_nowait(self, key: str, value: bytes) -> None:
+        disk_key, maintain = self._start_write(key, value)
+        self._locked(self._write_disk, disk_key, value, maintain)
+        self._report_dropped()
+
+    def remove_nowait(self, key: str) -> None:
+        in_memory = self.memory.remove_nowait(key)
+        # A disk delete reports the removal itself
+        if not self._locked(self.disk.delete, key) and in_memory and self.on_remove is not None:
+            self.on_remove(key)
+        self._report_dropped()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return cached image bytes, or None.
+
+        Disk hits are copied out of the segment mapping on the cache thread,
+        so the result can be handed straight to the caller without a copy.
+        """
+        value = self.memory.get_nowait(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+        value, hits = await self._on_disk(self._read_disk, key)
+        self._report_dropped()
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["disk_hits"] += 1
+        if hits >= self.config.promote_after:
+            self.memory.set_nowait(key, value)
+            self.stats["promotions"] += 1
+            if self._demoted:
+                await self._on_disk(self._write_demoted)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        disk_key, maintain = self._start_write(key, value)
+        await self._on_disk(self._write_disk, disk_key, value, maintain)
+        self._report_dropped()
+
+    def maintain(self) -> int:
+        """Expire, compact and persist the index; call periodically."""
+        self.memory.cleanup_nowait()
+        reclaimed = self._locked(self._write_disk, None, b"", True)
+        self._report_dropped()
+        return reclaimed
+
+    def close(self) -> None:
+        """Demote the memory tier and persist the disk index."""
+        self._executor.shutdown(wait=True)
+        with self._disk_lock:
+            self._write_demoted()
+            if not self.config.write_through:
+                for key in self.memory.keys():
+                    value = self.memory.get_nowait(key)
+                    if value is not None and key not in self.disk:
+                        self.disk.put(key, value)
+            self.memory.close()
+            self.disk.close()
@@ -1,17 +1,111 @@
 import os
+import json
+import asyncio
+import hashlib
 import logging
+import time
+from dataclasses import dataclass, asdict
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 import httpx
 from tqdm import tqdm
-from .error_handler import ModelError, handle_errors
+from ..utils.error_handler import ModelError, handle_errors
 from .config import BotConfig, AVAILABLE_MODELS
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 logger = logging.getLogger(__name__)
 
+class _IncompleteDownload(Exception):
+    """The connection ended before all expected bytes arrived; safe to resume."""
+
+@dataclass
+class ByteRange:
+    """A slice of the remote file and how much of it is already on disk."""
+    start: int
+    end: int  # inclusive, as in the HTTP Range header
+    done: int = 0
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def complete(self) -> bool:
+        return self.done >= self.length
+
+class _FileLock:
+    """Advisory exclusive lock on a file, shared by every process on the host.
+
+    The OS drops the lock when its holder exits, so a crashed download never
+    leaves a stale lock behind.
+    """
+
+    def __init__(self, path: Path, poll_interval: float = 0.1):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    async def acquire(self) -> None:
+        """Wait for the lock without blocking the event loop."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while not self._try_lock(fd):
+                await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
 class ModelDownloader:
-    def __init__(self, models_dir: str = BotConfig.MODELS_DIR):
+    def __init__(
+        self,
+        models_dir: str = BotConfig.MODELS_DIR,
+        connections: int = BotConfig.DOWNLOAD_CONNECTIONS,
+        retries: int = BotConfig.DOWNLOAD_RETRIES,
+        chunk_size: int = 1024 * 1024
+    ):
         self.models_dir = Path(models_dir)
         self.models_dir.mkdir(parents=True, exist_ok=True)
+        self.connections = max(1, connections)
+        self.retries = max(1, retries)
+        self.chunk_size = chunk_size
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, Any] = {
+            "downloads": 0,
+            "bytes_downloaded": 0,
+            "shared_waits": 0,
+            "cross_process_reuses": 0,
+            "bytes_saved": 0,
+            "wait_seconds": 0.0
+        }
         self._initialize_models()
 
     def _initialize_models(self) -> None:
@@ -21,7 +115,17 @@ class ModelDownloader:
 
     @handle_errors()
     async def download_model(self, model_id: str) -> Path:
-        """Download a model from Civitai or other sources."""
+        """Download a model from Civitai or other sources.
+
+        The file is streamed into ``model.safetensors.part`` next to the
+        final path and only renamed into place once it is complete and its
+        SHA-256 matches, so a crash never leaves a truncated checkpoint
+        behind. A later call resumes the partial file with Range requests.
+
+        Concurrent callers for the same model share one download: within a
+        process they await the same task, across processes they wait on a
+        lock file and then reuse the finished checkpoint.
+        """
         if model_id not in AVAILABLE_MODELS:
             raise ModelError(f"Unknown model: {model_id}")
 
@@ -35,23 +139,286 @@ class ModelDownloader:
         if not model_info.civitai_url:
             raise ModelError(f"No download URL for model: {model_id}")
 
+        # Single flight: concurrent callers in this process share one task
+        task = self._inflight.get(model_id)
+        if task is None:
+            task = asyncio.ensure_future(self._download_locked(model_id, model_info, model_path))
+            self._inflight[model_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(model_id, None))
+            return await asyncio.shield(task)
+
+        started = time.monotonic()
+        path = await asyncio.shield(task)
+        self._record_reuse("shared_waits", path, time.monotonic() - started)
+        return path
+
+    async def _download_locked(self, model_id: str, model_info, model_path: Path) -> Path:
+        """Download under a host-wide file lock, reusing another process's result."""
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        lock = _FileLock(model_path.with_name(".download.lock"))
+        started = time.monotonic()
+        await lock.acquire()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(model_info.civitai_url, follow_redirects=True)
-                response.raise_for_status()
-                
-                total_size = int(response.headers.get("content-length", 0))
-                with tqdm(total=total_size, unit="iB", unit_scale=True) as progress_bar:
-                    with open(model_path, "wb") as f:
-                        for data in response.iter_bytes():
-                            f.write(data)
-                            progress_bar.update(len(data))
-
-            logger.info(f"Successfully downloaded model: {model_id}")
-            return model_path
+            if model_path.exists():
+                self._record_reuse("cross_process_reuses", model_path, time.monotonic() - started)
+                return model_path
+            await self._download_with_retries(model_id, model_info, model_path)
+        finally:
+            lock.release()
+
+        self.stats["downloads"] += 1
+        self.stats["bytes_downloaded"] += model_path.stat().st_size
+        logger.info(f"Successfully downloaded model: {model_id}")
+        return model_path
+
+    async def _download_with_retries(self, model_id: str, model_info, model_path: Path) -> None:
+        for attempt in range(self.retries):
+            try:
+                await self._fetch(model_info.civitai_url, model_path, model_info.sha256)
+                return
+            except (httpx.TransportError, _IncompleteDownload) as e:
+                # Whatever reached the .part file is kept, so the next attempt resumes
+                if attempt == self.retries - 1:
+                    raise ModelError(f"Failed to download model {model_id}: {str(e)}")
+                logger.warning(f"Download of {model_id} interrupted ({str(e)}), resuming")
+                await asyncio.sleep(2 ** attempt)
+            except ModelError:
+                raise
+            except Exception as e:
+                raise ModelError(f"Failed to download model {model_id}: {str(e)}")
+
+    def _record_reuse(self, kind: str, model_path: Path, waited: float) -> None:
+        """Account for a download that was avoided by waiting on someone else's."""
+        size = model_path.stat().st_size
+        self.stats[kind] += 1
+        self.stats["bytes_saved"] += size
+        self.stats["wait_seconds"] += waited
+        logger.info(
+            f"Reused {model_path.parent.name} after waiting {waited:.1f}s "
+            f"({size / 1024 / 1024:.1f} MiB not downloaded)"
+        )
+
+    def is_downloading(self, model_id: str) -> bool:
+        """Check whether this process is currently fetching ``model_id``."""
+        return model_id in self._inflight
 
-        except Exception as e:
-            raise ModelError(f"Failed to download model {model_id}: {str(e)}")
+    def get_download_stats(self) -> Dict[str, Any]:
+        """Get download deduplication statistics."""
+        return dict(self.stats)
+
+    async def _fetch(self, url: str, model_path: Path, sha256: Optional[str] = None) -> None:
+        """Fetch ``url`` into a temp file, verify it and rename it over ``model_path``."""
+        part_path = model_path.with_name(model_path.name + ".part")
+        state_path = part_path.with_name(part_path.name + ".json")
+
+        async with httpx.AsyncClient(follow_redirects=True, timeout=httpx.Timeout(60.0)) as client:
+            total_size, accepts_ranges = await self._probe(client, url)
+            if (
+                self.connections > 1
+                and accepts_ranges
+                and total_size
+                and total_size >= self.connections * self.chunk_size
+            ):
+                await self._fetch_ranges(client, url, part_path, state_path, total_size)
+                digest = await asyncio.to_thread(_sha256_file, part_path) if sha256 else None
+            else:
+                digest = await self._fetch_stream(client, url, part_path, state_path, total_size, bool(sha256))
+
+        if total_size and part_path.stat().st_size != total_size:
+            raise _IncompleteDownload(
+                f"got {part_path.stat().st_size} of {total_size} bytes"
+            )
+        if sha256 and digest != sha256.lower():
+            part_path.unlink(missing_ok=True)
+            state_path.unlink(missing_ok=True)
+            raise ModelError(f"Checksum mismatch for {model_path.parent.name}: expected {sha256}, got {digest}")
+
+        with open(part_path, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(part_path, model_path)
+        state_path.unlink(missing_ok=True)
+
+    async def _probe(self, client: httpx.AsyncClient, url: str) -> Tuple[Optional[int], bool]:
+        """Return the remote size and whether the server accepts byte ranges."""
+        try:
+            response = await client.head(url)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return None, False
+        length = response.headers.get("content-length")
+        accepts_ranges = response.headers.get("accept-ranges", "").lower() == "bytes"
+        return (int(length) if length else None), accepts_ranges
+
+    async def _fetch_stream(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        part_path: Path,
+        state_path: Path,
+        total_size: Optional[int],
+        verify: bool
+    ) -> Optional[str]:
+        """Stream the file over one connection, appending to any existing partial file."""
+        offset = self._valid_prefix(part_path, state_path, url, total_size)
+
+        hasher = hashlib.sha256() if verify else None
+        if hasher and offset:
+            await asyncio.to_thread(_sha256_file, part_path, hasher)
+        if total_size is not None and offset == total_size and offset:
+            return hasher.hexdigest() if hasher else None
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        async with client.stream("GET", url, headers=headers) as response:
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                logger.info(f"Server ignored range request, restarting {part_path.name}")
+                offset = 0
+                hasher = hashlib.sha256() if verify else None
+
+            if total_size is None and "content-length" in response.headers:
+                total_size = offset + int(response.headers["content-length"])
+
+            with tqdm(total=total_size, initial=offset, unit="iB", unit_scale=True) as progress_bar:
+                with open(part_path, "ab" if offset else "wb") as f:
+                    async for data in response.aiter_bytes(self.chunk_size):
+                        f.write(data)
+                        if hasher:
+                            hasher.update(data)
+                        progress_bar.update(len(data))
+
+        return hasher.hexdigest() if hasher else None
+
+    async def _fetch_ranges(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        part_path: Path,
+        state_path: Path,
+        total_size: int
+    ) -> None:
+        """Fetch the file as several byte ranges over parallel connections."""
+        ranges = self._load_ranges(state_path, part_path, url, total_size)
+        if ranges is None:
+            ranges = self._split_ranges(self._valid_prefix(part_path, state_path, url, total_size), total_size)
+            with open(part_path, "r+b" if part_path.exists() else "wb") as f:
+                f.truncate(total_size)
+            self._save_ranges(state_path, url, total_size, ranges)
+
+        initial = sum(r.done for r in ranges)
+        with tqdm(total=total_size, initial=initial, unit="iB", unit_scale=True) as progress_bar:
+            tasks = [
+                asyncio.ensure_future(self._fetch_range(client, url, part_path, r, progress_bar))
+                for r in ranges if not r.complete
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                self._save_ranges(state_path, url, total_size, ranges)
+
+    async def _fetch_range(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        part_path: Path,
+        byte_range: ByteRange,
+        progress_bar: tqdm
+    ) -> None:
+        """Download the missing tail of one range into its slot in the part file."""
+        position = byte_range.start + byte_range.done
+        headers = {"Range": f"bytes={position}-{byte_range.end}"}
+        async with client.stream("GET", url, headers=headers) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise ModelError("Server stopped honouring range requests")
+            with open(part_path, "r+b") as f:
+                f.seek(position)
+                async for data in response.aiter_bytes(self.chunk_size):
+                    data = data[:byte_range.length - byte_range.done]
+                    f.write(data)
+                    byte_range.done += len(data)
+                    progress_bar.update(len(data))
+
+        if not byte_range.complete:
+            raise _IncompleteDownload(f"range {byte_range.start}-{byte_range.end} ended early")
+
+    def _valid_prefix(self, part_path: Path, state_path: Path, url: str, total_size: Optional[int]) -> int:
+        """Return how many leading bytes of the part file are downloaded data.
+
+        A single-stream download appends in order, so its whole file counts.
+        A parallel one preallocates the file to full size, so only the
+        contiguous run of downloaded ranges from the start, as recorded in
+        its state file, counts; without a usable record nothing does. The
+        file is cut to the returned length and the range state dropped.
+        """
+        if not part_path.exists():
+            state_path.unlink(missing_ok=True)
+            return 0
+        if not state_path.exists():
+            size = part_path.stat().st_size
+            return size if total_size is None or size <= total_size else 0
+        prefix = 0
+        ranges = self._load_ranges(state_path, part_path, url, total_size) if total_size else None
+        for byte_range in sorted(ranges or [], key=lambda r: r.start):
+            if byte_range.start != prefix:
+                break
+            prefix += byte_range.done
+            if not byte_range.complete:
+                break
+        with open(part_path, "r+b") as f:
+            f.truncate(prefix)
+        state_path.unlink(missing_ok=True)
+        return prefix
+
+    def _split_ranges(self, prefix: int, total_size: int) -> List[ByteRange]:
+        """Split the file into one range per connection.
+
+        The first ``prefix`` bytes are already on disk (see ``_valid_prefix``)
+        and are counted as done for the first range.
+        """
+        remaining = total_size - prefix
+        step = -(-remaining // self.connections)
+        ranges = [ByteRange(0, min(prefix + step, total_size) - 1, prefix)]
+        start = ranges[0].end + 1
+        while start < total_size:
+            end = min(start + step, total_size) - 1
+            ranges.append(ByteRange(start, end))
+            start = end + 1
+        return ranges
+
+    def _load_ranges(
+        self,
+        state_path: Path,
+        part_path: Path,
+        url: str,
+        total_size: int
+    ) -> Optional[List[ByteRange]]:
+        """Load saved range progress if it still describes the same remote file."""
+        if not state_path.exists() or not part_path.exists():
+            return None
+        try:
+            state = json.loads(state_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != url or state.get("size") != total_size:
+            return None
+        if part_path.stat().st_size != total_size:
+            return None
+        return [ByteRange(**r) for r in state["ranges"]]
+
+    def _save_ranges(self, state_path: Path, url: str, total_size: int, ranges: List[ByteRange]) -> None:
+        """Atomically persist range progress so an interrupted download can resume."""
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        tmp_path.write_text(json.dumps({
+            "url": url,
+            "size": total_size,
+            "ranges": [asdict(r) for r in ranges]
+        }))
+        os.replace(tmp_path, state_path)
 
     @handle_errors()
     async def get_model_path(self, model_id: str) -> Path:
@@ -66,5 +433,13 @@ class ModelDownloader:
         """List all available models."""
         return list(AVAILABLE_MODELS.keys())
 
+def _sha256_file(path: Path, hasher=None) -> str:
+    """Hash a file in 1 MiB blocks; meant to run in a worker thread."""
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
 # Last Updated: 2025-01-22 19:51:41
 # Created By: Omega-Open-AI
\ No newline at end of file
@@ -0,0 +1,191 @@
+# omega_bot/core/prompt_index.py
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import hashlib
+import json
+import random
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_NON_WORD = re.compile(r"[\W_]+")
+_STOPWORDS = frozenset(["a", "an", "the", "and"])
+_RELATIONS = frozenset([
+    "above", "at", "behind", "below", "beside", "by", "from", "in", "inside",
+    "into", "near", "of", "on", "onto", "over", "to", "under", "with",
+])
+
+def canonicalize(prompt: str) -> FrozenSet[str]:
+    """Reduce a prompt to the set of words that matter.
+
+    Case, punctuation, whitespace, word order, repeats and a few filler
+    words are ignored, so "Sunset over mountains, beautiful!" and
+    "beautiful sunset over the mountains" canonicalize identically.
+    Prepositions carry meaning, so each one is kept bound to the words
+    around it: "cat on a dog" yields "cat on dog" and differs from
+    "dog on a cat".
+    """
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    words = _NON_WORD.sub(" ", text).split()
+    tokens = set()
+    previous: List[str] = []
+    relation: List[str] = []
+    for word in words:
+        if word in _STOPWORDS:
+            continue
+        if word in _RELATIONS:
+            relation.append(word)
+            continue
+        tokens.add(word)
+        if relation:
+            tokens.add(" ".join(previous + relation + [word]))
+            relation = []
+        previous = [word]
+    tokens.update(relation)
+    return frozenset(tokens) or frozenset(words)
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+@dataclass
+class PromptIndexConfig:
+    threshold: float = 0.8  # minimum Jaccard similarity of canonical word sets
+    bands: int = 8
+    rows_per_band: int = 4
+    seed: int = 1
+    capacity: int = 10000  # indexed prompts; the least recently matched are dropped first
+
+class _Entry:
+    __slots__ = ("tokens", "scope", "band_hashes")
+
+    def __init__(self, tokens: FrozenSet[str], scope: int, band_hashes: List[int]):
+        self.tokens = tokens
+        self.scope = scope
+        self.band_hashes = band_hashes
+
+class PromptIndex:
+    """MinHash/LSH index mapping near-duplicate prompts to cached results.
+
+    Each prompt's canonical word set gets a ``bands * rows_per_band`` MinHash
+    signature. Prompts sharing any band for the same model and parameters
+    become candidates, and a candidate is accepted only if the exact Jaccard
+    similarity of the word sets reaches the threshold, so false positives
+    from LSH never reach the user. Lookup cost depends on the number of
+    bands, not on the number of indexed prompts.
+
+    Entries are keyed by cache key. At most ``capacity`` are kept, dropping
+    the least recently added or matched; callers should also :meth:`remove`
+    keys their cache no longer holds.
+    """
+
+    def __init__(self, config: Optional[PromptIndexConfig] = None):
+        self.config = config or PromptIndexConfig()
+        rng = random.Random(self.config.seed)
+        permutations = self.config.bands * self.config.rows_per_band
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(permutations)
+        ]
+        self._buckets: Dict[int, Any] = {}  # band hash -> key or list of keys
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # least recently used first
+        self._scope_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _scope(self, model: str, parameters: Optional[Dict[str, Any]]) -> int:
+        """Intern (model, parameters) as a small integer."""
+        scope = json.dumps([model, parameters or {}], sort_keys=True, default=str)
+        return self._scope_ids.setdefault(scope, len(self._scope_ids))
+
+    def signature(self, tokens: FrozenSet[str]) -> List[int]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "little")
+            for t in tokens
+        ] or [0]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    def _band_hashes(self, scope: int, signature: List[int]) -> List[int]:
+        rows = self.config.rows_per_band
+        return [
+            hash((scope, band, *signature[band * rows:(band + 1) * rows]))
+            for band in range(self.config.bands)
+        ]
+
+    def add(self, prompt: str, model: str, parameters: Optional[Dict[str, Any]], key: str) -> None:
+        """Index ``prompt`` as producing the cached result ``key``."""
+        self.remove(key)
+        tokens = canonicalize(prompt)
+        scope = self._scope(model, parameters)
+        band_hashes = self._band_hashes(scope, self.signature(tokens))
+        self._entries[key] = _Entry(tokens, scope, band_hashes)
+        for band_hash in band_hashes:
+            bucket = self._buckets.get(band_hash)
+            if bucket is None:
+                self._buckets[band_hash] = key
+            elif isinstance(bucket, list):
+                bucket.append(key)
+            else:
+                self._buckets[band_hash] = [bucket, key]
+        while len(self._entries) > self.config.capacity:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, key: str) -> bool:
+        """Forget the prompt indexed for ``key``; returns whether there was one."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for band_hash in entry.band_hashes:
+            bucket = self._buckets.get(band_hash)
+            if isinstance(bucket, list):
+                bucket.remove(key)
+                if len(bucket) == 1:
+                    self._buckets[band_hash] = bucket[0]
+            elif bucket == key:
+                del self._buckets[band_hash]
+        return True
+
+    def lookup(
+        self,
+        prompt: str,
+        model: str,
+        parameters: Optional[Dict[str, Any]] = None
+    ) -> Optional[Tuple[str, float]]:
+        """Return the key and similarity of the closest indexed prompt, if close enough."""
+        tokens = canonicalize(prompt)
+        scope = self._scope_ids.get(json.dumps([model, parameters or {}], sort_keys=True, default=str))
+        if scope is None:
+            return None
+
+        candidates = set()
+        for band_hash in self._band_hashes(scope, self.signature(tokens)):
+            bucket = self._buckets.get(band_hash)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                candidates.update(bucket)
+            else:
+                candidates.add(bucket)
+
+        best: Optional[Tuple[str, float]] = None
+        for key in candidates:
+            entry = self._entries[key]
+            if entry.scope != scope:
+                continue
+            similarity = jaccard(tokens, entry.tokens)
+            if similarity >= self.config.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+                if similarity == 1.0:
+                    break
+        if best is not None:
+            self._entries.move_to_end(best[0])
+        return best
@@ -0,0 +1,296 @@
+"""
+Model Store Module
+Decides which model checkpoints stay on local disk.
+
+Author: Omega-Open-AI
+Date: 2025-01-22
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, asdict, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from omega_bot.utils.error_handler import ModelError
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ModelUsage:
+    """Decayed request counts for one model.
+
+    ``fast`` and ``slow`` are exponentially decayed use counts with short and
+    long time constants; their ratio tells whether demand is rising.
+    """
+    last_used: float = 0.0
+    total: int = 0
+    fast: float = 0.0
+    slow: float = 0.0
+    updated: float = 0.0
+    size: int = 0  # checkpoint bytes when last seen on disk, 0 if never
+
+    def decayed(self, now: float, fast_tau: float, slow_tau: float) -> "ModelUsage":
+        """Return a copy with both counters decayed to ``now``."""
+        elapsed = max(0.0, now - self.updated)
+        return ModelUsage(
+            last_used=self.last_used,
+            total=self.total,
+            fast=self.fast * math.exp(-elapsed / fast_tau),
+            slow=self.slow * math.exp(-elapsed / slow_tau),
+            updated=now,
+            size=self.size
+        )
+
+@dataclass
+class StoreConfig:
+    quota_bytes: Optional[int] = None  # defaults to BotConfig.MODELS_QUOTA_BYTES
+    fast_tau: float = 3600.0  # ~1 hour memory for recent demand
+    slow_tau: float = 86400.0  # ~1 day memory for baseline demand
+    rise_ratio: float = 2.0  # prefetch when recent rate is this many times the baseline
+    min_recent_uses: float = 3.0
+    maintenance_interval: int = 300  # seconds
+
+class ModelStore:
+    """Keeps the local model directory under a disk quota.
+
+    Every generation should call :meth:`record_use`. Cold checkpoints (lowest
+    long-term decayed frequency, which also folds in recency) are evicted
+    when the quota is exceeded, and models whose short-term demand is rising
+    are downloaded in the background before they are requested again.
+
+    Prefetching only knows models from their usage history, so it re-fetches
+    checkpoints that were evicted while still in demand; a model's very first
+    request always downloads it on the request path.
+    """
+
+    def __init__(
+        self,
+        downloader,
+        config: Optional[StoreConfig] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.downloader = downloader
+        self.models_dir = Path(downloader.models_dir)
+        # core imports data, so the bot config is only reachable at call time
+        from omega_bot.core.config import AVAILABLE_MODELS, BotConfig
+
+        self.config = config or StoreConfig()
+        if self.config.quota_bytes is None:
+            self.config = replace(self.config, quota_bytes=BotConfig.MODELS_QUOTA_BYTES)
+        self._clock = clock
+        self._usage_file = self.models_dir / ".usage.json"
+        self.usage: Dict[str, ModelUsage] = self._load_usage()
+        self._pinned: Set[str] = {BotConfig.DEFAULT_MODEL}
+        self._downloadable: Set[str] = set(AVAILABLE_MODELS)
+        self._prefetching: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _load_usage(self) -> Dict[str, ModelUsage]:
+        """Load persisted usage so demand history survives restarts."""
+        try:
+            with open(self._usage_file) as f:
+                return {k: ModelUsage(**v) for k, v in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable model usage file: {str(e)}")
+            return {}
+
+    def save_usage(self) -> None:
+        """Atomically persist usage statistics."""
+        tmp_path = self._usage_file.with_name(self._usage_file.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({k: asdict(v) for k, v in self.usage.items()}, f)
+        os.replace(tmp_path, self._usage_file)
+
+    def manages(self, model_id: str) -> bool:
+        """Check whether ``model_id`` is a checkpoint the downloader can fetch."""
+        return model_id in self._downloadable
+
+    def record_use(self, model_id: str) -> None:
+        """Record one generation with ``model_id``."""
+        now = self._clock()
+        usage = self.usage.get(model_id, ModelUsage(updated=now))
+        usage = usage.decayed(now, self.config.fast_tau, self.config.slow_tau)
+        usage.fast += 1
+        usage.slow += 1
+        usage.total += 1
+        usage.last_used = now
+        self.usage[model_id] = usage
+
+    def pin(self, model_id: str) -> None:
+        """Never evict ``model_id`` (e.g. while its pipeline is loaded)."""
+        self._pinned.add(model_id)
+
+    def unpin(self, model_id: str) -> None:
+        self._pinned.discard(model_id)
+
+    def score(self, model_id: str) -> float:
+        """Long-term decayed frequency; higher means more worth keeping."""
+        usage = self.usage.get(model_id)
+        if usage is None:
+            return 0.0
+        return usage.decayed(self._clock(), self.config.fast_tau, self.config.slow_tau).slow
+
+    def is_rising(self, model_id: str) -> bool:
+        """Check whether recent demand clearly exceeds the long-term baseline."""
+        usage = self.usage.get(model_id)
+        if usage is None:
+            return False
+        usage = usage.decayed(self._clock(), self.config.fast_tau, self.config.slow_tau)
+        if usage.fast < self.config.min_recent_uses:
+            return False
+        fast_rate = usage.fast / self.config.fast_tau
+        slow_rate = usage.slow / self.config.slow_tau
+        return fast_rate >= self.config.rise_ratio * slow_rate
+
+    def _model_path(self, model_id: str) -> Path:
+        return self.models_dir / model_id / "model.safetensors"
+
+    def local_models(self) -> Dict[str, int]:
+        """Map each checkpoint on disk to its size in bytes."""
+        sizes = {}
+        for path in self.models_dir.glob("*/model.safetensors"):
+            try:
+                sizes[path.parent.name] = path.stat().st_size
+            except FileNotFoundError:
+                continue
+        return sizes
+
+    def disk_usage(self) -> int:
+        return sum(self.local_models().values())
+
+    def _evictable(self) -> List[str]:
+        """Local models that may be evicted, coldest first."""
+        busy = self._pinned | set(self._prefetching)
+        candidates = [
+            m for m in self.local_models()
+            if m not in busy and not self.downloader.is_downloading(m)
+        ]
+        return sorted(candidates, key=lambda m: (self.score(m), self.usage.get(m, ModelUsage()).last_used))
+
+    def evict(self, model_id: str) -> int:
+        """Delete a checkpoint and return the number of bytes freed."""
+        path = self._model_path(model_id)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        logger.info(f"Evicted model {model_id} ({size / 1024 / 1024:.1f} MiB)")
+        return size
+
+    def make_room(self, needed: int = 0, protect_score: Optional[float] = None) -> bool:
+        """Evict cold models until ``needed`` more bytes fit under the quota.
+
+        With ``protect_score`` only models colder than that score are evicted,
+        so a prefetch never pushes out something more popular than itself.
+        Returns whether enough space is now available.
+        """
+        sizes = self.local_models()
+        used = sum(sizes.values())
+        for model_id in self._evictable():
+            if used + needed <= self.config.quota_bytes:
+                break
+            if protect_score is not None and self.score(model_id) >= protect_score:
+                break
+            used -= self.evict(model_id)
+        return used + needed <= self.config.quota_bytes
+
+    async def ensure_available(self, model_id: str) -> Path:
+        """Record a use of ``model_id`` and return its path, downloading if needed."""
+        self.record_use(model_id)
+        path = self._model_path(model_id)
+        if path.exists():
+            return path
+
+        self.pin(model_id)
+        try:
+            path = await self.downloader.download_model(model_id)
+            self._remember_size(model_id, path)
+            self.make_room()
+        finally:
+            self.unpin(model_id)
+        return path
+
+    def _remember_size(self, model_id: str, path: Path) -> None:
+        usage = self.usage.get(model_id)
+        if usage is not None:
+            try:
+                usage.size = path.stat().st_size
+            except FileNotFoundError:
+                pass
+
+    def prefetch_candidates(self) -> List[str]:
+        """Evicted models with rising demand, hottest first."""
+        local = self.local_models()
+        rising = [
+            m for m in self.usage
+            if m not in local and m not in self._prefetching and self.is_rising(m)
+        ]
+        return sorted(rising, key=self.score, reverse=True)
+
+    def _prefetch(self, model_id: str) -> None:
+        """Start a background download for ``model_id``."""
+        async def run():
+            try:
+                self._remember_size(model_id, await self.downloader.download_model(model_id))
+                logger.info(f"Prefetched model {model_id}")
+            except ModelError as e:
+                logger.warning(f"Prefetch of {model_id} failed: {str(e)}")
+            finally:
+                self._prefetching.pop(model_id, None)
+
+        self._prefetching[model_id] = asyncio.ensure_future(run())
+
+    async def maintain(self) -> None:
+        """Enforce the quota and start prefetches for rising models.
+
+        A prefetch only evicts models strictly colder than itself, since it
+        is a guess about demand and the models it would push out are not.
+        """
+        self.make_room()
+        local = self.local_models()
+        for model_id, size in local.items():
+            if model_id in self.usage:
+                self.usage[model_id].size = size
+        largest = max(local.values(), default=0)
+
+        def expected_size(model_id: str) -> int:
+            # Known from when the model was last on disk; otherwise assume it
+            # is as large as the largest checkpoint we hold
+            usage = self.usage.get(model_id)
+            return usage.size if usage is not None and usage.size else largest
+
+        for model_id in self.prefetch_candidates():
+            reserved = sum(expected_size(m) for m in [*self._prefetching, model_id])
+            if self.make_room(reserved, protect_score=self.score(model_id)):
+                self._prefetch(model_id)
+        self.save_usage()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"Model store maintenance failed: {str(e)}")
+            await asyncio.sleep(self.config.maintenance_interval)
+
+    def start(self) -> None:
+        """Start periodic maintenance in the background."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop maintenance and wait for running prefetches."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.gather(*self._prefetching.values(), return_exceptions=True)
+        self.save_usage()
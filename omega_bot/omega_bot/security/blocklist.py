@@ -0,0 +1,123 @@
+# omega_bot/security/blocklist.py
+from typing import Iterable, List, Optional, Tuple
+import unicodedata
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def normalize(text: str) -> str:
+    """Fold compatibility forms and case, so "Ｈａｃｋ" and "HACK" both read "hack"."""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+def load_terms(path: str) -> List[str]:
+    """Read one term per line; blank lines and ``#`` comments are skipped."""
+    terms = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            term = line.strip()
+            if term and not term.startswith("#"):
+                terms.append(term)
+    return terms
+
+class Blocklist:
+    """Multi-pattern matcher (Aho-Corasick automaton) over normalized terms.
+
+    The automaton is built once; a search is a single pass over the
+    normalized text whose cost does not depend on the number of terms.
+    With ``word_boundaries`` a match only counts when it is not preceded
+    or followed by a letter, digit or underscore, so "hack" does not
+    block "shackle".
+    """
+
+    def __init__(self, terms: Iterable[str], word_boundaries: bool = False):
+        self.word_boundaries = word_boundaries
+        self.terms: List[str] = []
+        # Node 0 is the root. Per node: transitions, failure link, the term
+        # ending here (-1 if none) and the nearest term-ending node on the
+        # failure chain (-1 if none)
+        self._goto: List[dict] = [{}]
+        self._fail: List[int] = [0]
+        self._term: List[int] = [-1]
+        self._output_link: List[int] = [-1]
+        self._lengths: List[int] = []
+        for term in terms:
+            self._insert(term)
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @classmethod
+    def from_file(cls, path: str, word_boundaries: bool = False, extra: Iterable[str] = ()) -> "Blocklist":
+        return cls([*extra, *load_terms(path)], word_boundaries)
+
+    def _insert(self, term: str) -> None:
+        normalized = normalize(term)
+        if not normalized:
+            return
+        node = 0
+        for char in normalized:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._term.append(-1)
+                self._output_link.append(-1)
+            node = nxt
+        if self._term[node] == -1:
+            self._term[node] = len(self.terms)
+            self.terms.append(term)
+            self._lengths.append(len(normalized))
+
+    def _build_links(self) -> None:
+        goto, fail, term, output_link = self._goto, self._fail, self._term, self._output_link
+        queue = list(goto[0].values())
+        for node in queue:  # breadth first; the list grows while iterating
+            for char, child in goto[node].items():
+                state = fail[node]
+                while char not in goto[state] and state:
+                    state = fail[state]
+                target = goto[state].get(char, 0)
+                fail[child] = target if target != child else 0
+                output_link[child] = fail[child] if term[fail[child]] != -1 else output_link[fail[child]]
+                queue.append(child)
+
+    def _matches(self, text: str):
+        goto, fail, term, output_link, lengths = (
+            self._goto, self._fail, self._term, self._output_link, self._lengths
+        )
+        node = 0
+        for end, char in enumerate(text, 1):
+            while True:
+                nxt = goto[node].get(char)
+                if nxt is not None:
+                    node = nxt
+                    break
+                if not node:
+                    break
+                node = fail[node]
+            hit = node if term[node] != -1 else output_link[node]
+            while hit != -1:
+                index = term[hit]
+                start = end - lengths[index]
+                if not self.word_boundaries or (
+                    (start == 0 or not _is_word_char(text[start - 1]))
+                    and (end == len(text) or not _is_word_char(text[end]))
+                ):
+                    yield start, end, index
+                hit = output_link[hit]
+
+    def find(self, text: str) -> Optional[str]:
+        """Return the first blocked term found in ``text``, or None."""
+        for _, _, index in self._matches(normalize(text)):
+            return self.terms[index]
+        return None
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """Every match as ``(start, end, term)``; offsets refer to the normalized text."""
+        return [(start, end, self.terms[index]) for start, end, index in self._matches(normalize(text))]
@@ -1,9 +1,13 @@
 # omega_bot/security/input_validation.py
 from typing import Optional, Dict, Any
+import os
 import re
+import threading
+import time
 from dataclasses import dataclass
 from ..utils.error_handler import ValidationError, SecurityError
 from ..utils.logger import get_logger
+from .blocklist import Blocklist
 
 logger = get_logger(__name__)
 
@@ -13,10 +17,49 @@ class PromptValidationRules:
     max_length: int = 500
     allowed_chars: str = r"[a-zA-Z0-9\s\-_.,!?()'\"]+"
     forbidden_words: set = frozenset(["hack", "exploit", "nsfw"])
+    blocklist_path: Optional[str] = None  # one term per line, added to forbidden_words
+    word_boundaries: bool = False  # match whole words only
+    reload_interval: float = 5.0  # seconds between checks for a changed blocklist file
 
 class InputValidator:
     def __init__(self, rules: Optional[PromptValidationRules] = None):
         self.rules = rules or PromptValidationRules()
+        self._allowed = re.compile(self.rules.allowed_chars)
+        self._blocklist_mtime: Optional[float] = None
+        self._next_reload_check = 0.0
+        self._reloading = threading.Lock()
+        self.blocklist = self._build_blocklist()
+
+    def _build_blocklist(self) -> Blocklist:
+        if self.rules.blocklist_path is None:
+            return Blocklist(self.rules.forbidden_words, self.rules.word_boundaries)
+        self._blocklist_mtime = os.stat(self.rules.blocklist_path).st_mtime
+        blocklist = Blocklist.from_file(
+            self.rules.blocklist_path, self.rules.word_boundaries, extra=self.rules.forbidden_words
+        )
+        logger.info(f"Loaded {len(blocklist)} blocked terms from {self.rules.blocklist_path}")
+        return blocklist
+
+    def reload_blocklist(self) -> None:
+        """Rebuild the blocklist; validation keeps using the old one until it is ready."""
+        with self._reloading:
+            try:
+                self.blocklist = self._build_blocklist()
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Error reloading blocklist: {str(e)}")
+
+    def _check_reload(self) -> None:
+        """Rebuild in the background when the blocklist file has changed."""
+        now = time.monotonic()
+        if self.rules.blocklist_path is None or now < self._next_reload_check:
+            return
+        self._next_reload_check = now + self.rules.reload_interval
+        try:
+            mtime = os.stat(self.rules.blocklist_path).st_mtime
+        except OSError:
+            return
+        if mtime != self._blocklist_mtime and not self._reloading.locked():
+            threading.Thread(target=self.reload_blocklist, name="blocklist-reload", daemon=True).start()
         
     def validate_prompt(self, prompt: str) -> str:
         """Validate and sanitize user input prompt."""
@@ -29,12 +72,13 @@ class InputValidator:
                 f"and {self.rules.max_length} characters"
             )
             
-        if not re.match(f"^{self.rules.allowed_chars}$", prompt):
+        if not self._allowed.fullmatch(prompt):
             raise ValidationError("Prompt contains invalid characters")
             
-        for word in self.rules.forbidden_words:
-            if word.lower() in prompt.lower():
-                raise SecurityError(f"Prompt contains forbidden word: {word}")
+        self._check_reload()
+        word = self.blocklist.find(prompt)
+        if word is not None:
+            raise SecurityError(f"Prompt contains forbidden word: {word}")
                 
         return prompt.strip()
 
@@ -55,3 +99,12 @@ class InputValidator:
             raise ValidationError("Height must be between 64 and 1024")
             
         return settings
+
+_default_validator: Optional[InputValidator] = None
+
+def validate_prompt(prompt: str) -> str:
+    """Validate a prompt against the default rules."""
+    global _default_validator
+    if _default_validator is None:
+        _default_validator = InputValidator()
+    return _default_validator.validate_prompt(prompt)
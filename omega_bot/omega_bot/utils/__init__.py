@@ -1,6 +1,18 @@
 """Utility functions and classes for the Omega Text to Image Bot."""
 
-from .error_handler import BotError
-from .monitoring import MetricsCollector
+import importlib
+
+# Imported on first use: monitoring needs prometheus_client, and the CLI
+# imports omega_bot.utils.router without it
+_EXPORTS = {
+    "BotError": ".error_handler",
+    "MetricsCollector": ".monitoring",
+}
 
 __all__ = ["BotError", "MetricsCollector"]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,6 +6,7 @@ Author: Omega-Open-AI
 Date: 2025-01-22
 """
 
+import functools
 import logging
 from typing import Optional
 
@@ -43,6 +44,26 @@ class ConfigurationError(BotError):
     def __init__(self, message: str):
         super().__init__(message, error_code=501)
 
+class SecurityError(BotError):
+    """Raised when input is rejected for security reasons."""
+    def __init__(self, message: str):
+        super().__init__(message, error_code=403)
+
+def handle_errors(error_class: type = BotError):
+    """Decorate a coroutine so unexpected exceptions surface as bot errors."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except BotError:
+                raise
+            except Exception as e:
+                logger.exception(f"Unexpected error in {func.__name__}")
+                raise error_class(str(e))
+        return wrapper
+    return decorator
+
 def handle_error(error: Exception) -> str:
     """Convert exceptions to user-friendly messages."""
     if isinstance(error, ValidationError):
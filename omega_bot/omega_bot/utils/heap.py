@@ -0,0 +1,171 @@
+# omega_bot/utils/heap.py
+from typing import Any, Dict, Iterable, List, Optional
+from collections import Counter
+import asyncio
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Classes whose instance counts reveal the usual leaks in this bot
+KEY_CLASSES = (
+    "RateLimiter", "MetricsCollector", "LRUCache", "TieredImageCache", "SegmentStore",
+    "PromptIndex", "ImageGenerator", "StableDiffusionPipeline", "Tensor", "Span",
+)
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+class HeapDiagnostics:
+    """On-demand heap snapshots and growth reports for a live process.
+
+    ``tracemalloc`` is only started when the first snapshot is requested
+    (or by ``start()``), since tracing every allocation slows Python code
+    down noticeably; ``stop()`` turns it off again. Each snapshot is
+    compared with the previous one and with the first, so both recent and
+    long-term growth sites show up.
+    """
+
+    def __init__(self, frames: int = 10, key_classes: Iterable[str] = KEY_CLASSES):
+        self.frames = frames
+        self.key_classes = tuple(key_classes)
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._previous_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            logger.info(f"tracemalloc started with {self.frames} frames")
+
+    def stop(self) -> None:
+        """Stop tracing and drop the stored snapshots."""
+        with self._lock:
+            self._baseline = self._previous = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def snapshot(self, limit: int = 20) -> Dict[str, Any]:
+        """Take a snapshot and report the top growth sites since the last one."""
+        with self._lock:
+            first = not self.tracing
+            self.start()
+            snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+            now = time.time()
+            report: Dict[str, Any] = {
+                "traced_bytes": tracemalloc.get_traced_memory()[0],
+                "tracing_started": first,
+                "top_sites": _stats(snapshot.statistics("lineno")[:limit]),
+            }
+            if self._previous is not None:
+                report["interval_seconds"] = now - self._previous_at
+                report["growth_since_previous"] = _growth(snapshot, self._previous, limit)
+            if self._baseline is not None and self._baseline is not self._previous:
+                report["growth_since_baseline"] = _growth(snapshot, self._baseline, limit)
+            if self._baseline is None:
+                self._baseline = snapshot
+            self._previous = snapshot
+            self._previous_at = now
+        return report
+
+    def object_counts(self) -> Dict[str, int]:
+        """Live instances of the key classes, matched by class name."""
+        wanted = set(self.key_classes)
+        counts: Counter = Counter()
+        for obj in gc.get_objects():
+            name = type(obj).__name__
+            if name in wanted:
+                counts[name] += 1
+        return {name: counts.get(name, 0) for name in self.key_classes}
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "heap": self.snapshot(limit),
+            "objects": self.object_counts(),
+            "tensors": tensor_memory_by_owner(),
+        }
+
+    async def report_async(self, limit: int = 20) -> Dict[str, Any]:
+        """Build the report in a worker thread so the event loop keeps serving updates."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.report, limit)
+
+def _stats(stats: List[tracemalloc.Statistic]) -> List[Dict[str, Any]]:
+    return [
+        {"site": _site(stat.traceback), "size": stat.size, "count": stat.count}
+        for stat in stats
+    ]
+
+def _growth(current: tracemalloc.Snapshot, older: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    diffs = [d for d in current.compare_to(older, "lineno") if d.size_diff > 0]
+    return [
+        {
+            "site": _site(d.traceback),
+            "size_diff": d.size_diff,
+            "count_diff": d.count_diff,
+            "size": d.size,
+        }
+        for d in diffs[:limit]
+    ]
+
+def _site(traceback: tracemalloc.Traceback) -> str:
+    frame = traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+def tensor_memory_by_owner() -> Dict[str, Dict[str, int]]:
+    """Bytes held by live torch tensors, grouped by owning module and device.
+
+    Tensors reachable from a top-level ``torch.nn.Module`` are attributed
+    to that module's class, everything else to ``"unowned"``; shared
+    storage is only counted once. Returns an empty dict when torch has
+    not been imported, so this never pulls torch in by itself.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return {}
+
+    objects = gc.get_objects()
+    modules = [o for o in objects if isinstance(o, torch.nn.Module)]
+    children = {id(child) for m in modules for child in m.children()}
+    seen = set()
+    owners: Dict[str, Dict[str, int]] = {}
+
+    def account(owner: str, tensor) -> None:
+        try:
+            key = (tensor.device.type, tensor.untyped_storage().data_ptr())
+            size = tensor.untyped_storage().nbytes()
+        except Exception:
+            return
+        if key in seen:
+            return
+        seen.add(key)
+        by_device = owners.setdefault(owner, {})
+        by_device[key[0]] = by_device.get(key[0], 0) + size
+
+    for module in modules:
+        if id(module) in children:
+            continue
+        owner = type(module).__name__
+        for tensor in module.parameters():
+            account(owner, tensor)
+        for tensor in module.buffers():
+            account(owner, tensor)
+    for obj in objects:
+        if isinstance(obj, torch.Tensor):
+            account("unowned", obj)
+    return owners
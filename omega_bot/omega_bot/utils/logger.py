@@ -0,0 +1,6 @@
+# omega_bot/utils/logger.py
+import logging
+
+def get_logger(name: str) -> logging.Logger:
+    """Get a module logger; handlers are configured by the application."""
+    return logging.getLogger(name)
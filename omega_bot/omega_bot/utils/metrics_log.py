@@ -0,0 +1,127 @@
+# omega_bot/utils/metrics_log.py
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import os
+import time
+from pathlib import Path
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_SEGMENT_PREFIX = "metrics-"
+_SEGMENT_SUFFIX = ".ndjson"
+
+class MetricsLog:
+    """Append-only NDJSON log of metric deltas, split into size-rotated segments.
+
+    Each record is one JSON line with a ``ts`` field. Segments are named
+    after the timestamp of their first record, so a segment covers every
+    record up to the first record of the next one. Range reads only open
+    the segments that can overlap the range, and retention deletes whole
+    segments without rewriting anything.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = 8 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self._active: Optional[Path] = None
+        self._active_size = 0
+        segments = self.segments()
+        if segments:
+            self._active = segments[-1][1]
+            self._active_size = self._truncate_torn_tail(self._active)
+
+    @staticmethod
+    def _truncate_torn_tail(path: Path) -> int:
+        """Cut a partial last line left by a crash so new records start cleanly."""
+        with open(path, "rb+") as f:
+            data = f.read()
+            size = data.rfind(b"\n") + 1
+            if size != len(data):
+                logger.warning(f"Truncating torn metrics record in {path.name}")
+                f.truncate(size)
+        return size
+
+    def segments(self) -> List[Tuple[float, Path]]:
+        """Return ``(first_timestamp, path)`` for every segment, oldest first."""
+        result = []
+        for path in self.directory.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"):
+            try:
+                start_ms = int(path.name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            result.append((start_ms / 1000, path))
+        result.sort()
+        return result
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record, rotating to a new segment when the active one is full."""
+        record.setdefault("ts", time.time())
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        if self._active is None or self._active_size + len(line) > self.max_segment_bytes:
+            self._rotate(record["ts"])
+        with open(self._active, "ab") as f:
+            f.write(line)
+        self._active_size += len(line)
+
+    def _rotate(self, timestamp: float) -> None:
+        start_ms = int(timestamp * 1000)
+        if self._active is not None:
+            # Segment names must stay ordered even if the clock stepped back
+            last_start = self.segments()[-1][0]
+            start_ms = max(start_ms, int(last_start * 1000) + 1)
+        self._active = self.directory / f"{_SEGMENT_PREFIX}{start_ms:013d}{_SEGMENT_SUFFIX}"
+        self._active_size = 0
+
+    def read(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Yield records with ``start <= ts < end``, oldest first."""
+        segments = self.segments()
+        for i, (seg_start, path) in enumerate(segments):
+            seg_end = segments[i + 1][0] if i + 1 < len(segments) else None
+            if end is not None and seg_start >= end:
+                break
+            if start is not None and seg_end is not None and seg_end <= start:
+                continue
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn write at the tail of a segment after a crash
+                        logger.warning(f"Skipping corrupt metrics record in {path.name}")
+                        continue
+                    ts = record.get("ts", 0)
+                    if (start is None or ts >= start) and (end is None or ts < end):
+                        yield record
+
+    def reconstruct(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, Any]:
+        """Fold the deltas in a time range back into counters, samples and errors."""
+        counters: Dict[str, float] = {}
+        series: Dict[str, List[List[float]]] = {}
+        errors: List[List[Any]] = []
+        for record in self.read(start, end):
+            for name, delta in record.get("counters", {}).items():
+                counters[name] = counters.get(name, 0) + delta
+            for name, samples in record.get("series", {}).items():
+                series.setdefault(name, []).extend(samples)
+            errors.extend(record.get("errors", []))
+        return {"counters": counters, "series": series, "errors": errors}
+
+    def cleanup(self, before: float) -> int:
+        """Delete segments whose records are all older than ``before``.
+
+        The active segment is never removed. Returns the number of deleted
+        segments.
+        """
+        segments = self.segments()
+        removed = 0
+        for (_, path), (next_start, _) in zip(segments, segments[1:]):
+            if next_start > before or path == self._active:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                logger.error(f"Error removing metrics segment {path.name}: {str(e)}")
+        return removed
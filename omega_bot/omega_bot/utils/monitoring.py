@@ -1,20 +1,33 @@
 # omega_bot/utils/monitoring.py
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+from collections import deque
 import asyncio
-import psutil
+import atexit
 import json
-import aiofiles
+import math
+import time
 from pathlib import Path
-from prometheus_client import (
-    Counter, Gauge, Histogram, start_http_server,
-    CollectorRegistry, multiprocess
-)
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry
+
 from .logger import get_logger
+from .timeseries import TimeSeries
+from .sketches import HeavyHitters, QuantileSketch
+from .metrics_log import MetricsLog
+from .tracing import Span
+from .prometheus import (
+    LatencyQuantileCollector, exporter_registry, mark_process_dead,
+    multiprocess_dir, start_exporter, write_latency_file
+)
+from .heap import HeapDiagnostics
+from .profiler import SamplingProfiler
+from .resources import ResourceSampler, cuda_available, accelerator_memory
 from ..utils.error_handler import BotError
 
 logger = get_logger(__name__)
 
+# Wide enough for the slow tail of large models on shared GPUs
+GENERATION_TIME_BUCKETS = [0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0]
+
 class MetricsCollector:
     """Comprehensive metrics collection and monitoring system."""
     
@@ -24,7 +37,15 @@ class MetricsCollector:
         export_interval: int = 60,
         retention_days: int = 7,
         enable_prometheus: bool = True,
-        prometheus_port: int = 9090
+        prometheus_port: int = 9090,
+        series_capacity: int = 1024,
+        max_recent_errors: int = 100,
+        segment_bytes: int = 8 * 1024 * 1024,
+        heavy_hitters_k: int = 10,
+        heavy_hitters_error: float = 0.001,
+        heavy_hitters_window: int = 300,
+        resource_interval: float = 60,
+        debug_endpoints: bool = False
     ):
         self.metrics_dir = Path(metrics_dir)
         self.metrics_dir.mkdir(parents=True, exist_ok=True)
@@ -32,43 +53,75 @@ class MetricsCollector:
         self.retention_days = retention_days
         self.enable_prometheus = enable_prometheus
         self.prometheus_port = prometheus_port
+        self.series_capacity = series_capacity
+        self.resource_sampler = ResourceSampler(resource_interval)
+        self.debug_endpoints = debug_endpoints
+        self.profiler = SamplingProfiler()
+        self.heap = HeapDiagnostics()
+
+        def heavy_hitters():
+            return HeavyHitters(heavy_hitters_k, heavy_hitters_error, heavy_hitters_window)
         
-        # Initialize metrics storage
+        # Initialize metrics storage; time series are fixed-size ring buffers
+        # with minute/hour rollups, so memory stays flat on long runs
         self.metrics: Dict[str, Any] = {
             "requests": {
                 "total": 0,
                 "success": 0,
                 "failed": 0,
                 "by_command": {},
-                "by_user": {}
+                # Per-user and per-prompt stats keep only the heaviest keys,
+                # so memory does not grow with the number of users
+                "by_user": heavy_hitters(),
+                "failed_by_user": heavy_hitters()
             },
-            "generation_times": [],
+            "prompts": heavy_hitters(),
+            "generation_times": TimeSeries(series_capacity),
             "cache": {
                 "hits": 0,
                 "misses": 0
             },
             "errors": {},
+            "recent_errors": deque(maxlen=max_recent_errors),
             "rate_limits": {
                 "total": 0,
-                "by_user": {}
+                "by_user": heavy_hitters()
             },
             "resource_usage": {
-                "cpu": [],
-                "memory": [],
-                "disk": [],
-                "gpu": [] if self._has_gpu() else None
+                "cpu": TimeSeries(series_capacity),
+                "memory": TimeSeries(series_capacity),
+                "disk": TimeSeries(series_capacity),
+                "gpu": TimeSeries(series_capacity) if self._has_gpu() else None,
+                "process_rss": TimeSeries(series_capacity),
+                "open_fds": TimeSeries(series_capacity),
+                "loop_lag": TimeSeries(series_capacity)
             },
             "model_usage": {},
             "daily_stats": {}
         }
+
+        # Latency sketches per stage ("generation", "queue", ...) and model
+        self.latency: Dict[str, Dict[str, QuantileSketch]] = {}
+
+        # Exports append only what changed since the previous flush
+        self.log = MetricsLog(str(self.metrics_dir), max_segment_bytes=segment_bytes)
+        self._flushed_counters: Dict[str, int] = {}
+        self._flushed_counts: Dict[str, int] = {}
+        self._flushed_errors = 0
         
         # Initialize Prometheus metrics if enabled
         if self.enable_prometheus:
             self._init_prometheus_metrics()
             
     def _init_prometheus_metrics(self) -> None:
-        """Initialize Prometheus metrics collectors."""
+        """Initialize Prometheus metrics collectors.
+
+        With ``PROMETHEUS_MULTIPROC_DIR`` set, every worker writes its
+        values to shared files and only one process per host serves their
+        aggregate; gauges declare how worker values are combined.
+        """
         self.registry = CollectorRegistry()
+        self.multiprocess = multiprocess_dir() is not None
         
         # Counter metrics
         self.request_counter = Counter(
@@ -89,26 +142,110 @@ class MetricsCollector:
         self.active_users_gauge = Gauge(
             'bot_active_users',
             'Number of active users',
-            registry=self.registry
+            registry=self.registry,
+            multiprocess_mode='livesum'
         )
         
+        # Host-wide values: every worker sees the same number
         self.resource_usage_gauge = Gauge(
             'bot_resource_usage',
             'System resource usage',
             ['resource_type'],
-            registry=self.registry
+            registry=self.registry,
+            multiprocess_mode='livemax'
+        )
+        
+        # Per-process values are reported per worker (pid label)
+        self.process_rss_gauge = Gauge(
+            'bot_process_resident_memory_bytes',
+            'Resident memory of the bot process',
+            registry=self.registry,
+            multiprocess_mode='liveall'
+        )
+        
+        self.open_fds_gauge = Gauge(
+            'bot_process_open_fds',
+            'Open file descriptors of the bot process',
+            registry=self.registry,
+            multiprocess_mode='liveall'
+        )
+        
+        self.loop_lag_gauge = Gauge(
+            'bot_event_loop_lag_seconds',
+            'Delay before a callback scheduled on the event loop runs',
+            registry=self.registry,
+            multiprocess_mode='liveall'
+        )
+        
+        self.accelerator_memory_gauge = Gauge(
+            'bot_accelerator_memory_bytes',
+            'Accelerator memory per device',
+            ['device', 'kind'],
+            registry=self.registry,
+            multiprocess_mode='liveall'
         )
         
         # Histogram metrics
         self.generation_time_histogram = Histogram(
             'bot_generation_time_seconds',
             'Image generation time in seconds',
-            buckets=[0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0],
+            buckets=GENERATION_TIME_BUCKETS,
+            registry=self.registry
+        )
+        self.stage_time_histogram = Histogram(
+            'bot_stage_seconds',
+            'Time spent in each request stage',
+            ['stage'],
+            buckets=GENERATION_TIME_BUCKETS,
             registry=self.registry
         )
         
-        # Start Prometheus HTTP server
-        start_http_server(self.prometheus_port, registry=self.registry)
+        # Start Prometheus HTTP server, once per host in multiprocess mode
+        if self.multiprocess:
+            atexit.register(mark_process_dead)
+            self._served_registry = exporter_registry()
+        else:
+            self.registry.register(LatencyQuantileCollector(lambda: self.latency))
+            self._served_registry = self.registry
+        self.exporter_started = start_exporter(
+            self.prometheus_port, self._served_registry, routes=self._debug_routes()
+        )
+        
+    def _debug_routes(self) -> Dict[str, Any]:
+        """Diagnostics served next to /metrics; off unless debug_endpoints is set."""
+        if not self.debug_endpoints:
+            return {}
+        return {"/debug/profile": self._profile_route, "/debug/heap": self._heap_route}
+        
+    def _profile_route(self, query: Dict[str, List[str]]):
+        """GET /debug/profile?seconds=N: collapsed stacks of this process."""
+        try:
+            seconds = float(query.get("seconds", ["10"])[0])
+        except ValueError:
+            return 400, "text/plain", b"seconds must be a number\n"
+        if not math.isfinite(seconds):
+            return 400, "text/plain", b"seconds must be finite\n"
+        try:
+            result = self.profiler.profile(seconds)
+        except BotError as e:
+            return 409, "text/plain", f"{str(e)}\n".encode()
+        logger.info(
+            f"Profiled {result.duration:.1f}s: {result.samples} samples, "
+            f"{result.overhead:.2%} sampling overhead"
+        )
+        return 200, "text/plain; charset=utf-8", result.collapsed().encode("utf-8")
+        
+    def _heap_route(self, query: Dict[str, List[str]]):
+        """GET /debug/heap[?limit=N][&stop=1]: heap growth, key object counts, tensor memory.
+
+        Like every route this runs on the exporter's own thread, never on the
+        bot's event loop.
+        """
+        if query.get("stop", ["0"])[0] == "1":
+            self.heap.stop()
+            return 200, "application/json", b'{"tracing": false}\n'
+        report = self.heap.report(int(query.get("limit", ["20"])[0]))
+        return 200, "application/json", json.dumps(report, indent=2).encode("utf-8")
         
     async def start_collection(self) -> None:
         """Start periodic metrics collection and maintenance tasks."""
@@ -119,56 +256,48 @@ class MetricsCollector:
         )
         
     async def _collect_system_metrics(self) -> None:
-        """Collect system resource usage metrics periodically."""
-        while True:
-            try:
-                # CPU usage
-                cpu_percent = psutil.cpu_percent(interval=1)
-                self.metrics["resource_usage"]["cpu"].append({
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "value": cpu_percent
-                })
-                
-                # Memory usage
-                memory = psutil.virtual_memory()
-                self.metrics["resource_usage"]["memory"].append({
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "value": memory.percent
-                })
-                
-                # Disk usage
-                disk = psutil.disk_usage('/')
-                self.metrics["resource_usage"]["disk"].append({
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "value": disk.percent
-                })
-                
-                # GPU metrics if available
-                if self._has_gpu():
-                    gpu_usage = self._get_gpu_usage()
-                    self.metrics["resource_usage"]["gpu"].append({
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "value": gpu_usage
-                    })
-                    
-                # Update Prometheus metrics
-                if self.enable_prometheus:
-                    self.resource_usage_gauge.labels('cpu').set(cpu_percent)
-                    self.resource_usage_gauge.labels('memory').set(memory.percent)
-                    self.resource_usage_gauge.labels('disk').set(disk.percent)
-                    
-            except Exception as e:
-                logger.error(f"Error collecting system metrics: {str(e)}")
+        """Collect system resource usage metrics periodically.
+
+        Sampling runs on a background thread and never blocks the event
+        loop; samples are recorded here, on the loop.
+        """
+        self.resource_sampler.start(asyncio.get_running_loop(), self._record_resources)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.resource_sampler.stop()
+            
+    def _record_resources(self, sample: Dict[str, Any]) -> None:
+        """Record one resource sample and publish it as gauges."""
+        resource_usage = self.metrics["resource_usage"]
+        for name in ("cpu", "memory", "disk", "gpu", "process_rss", "open_fds", "loop_lag"):
+            if name in sample and resource_usage.get(name) is not None:
+                resource_usage[name].add(sample[name])
                 
-            await asyncio.sleep(60)  # Collect every minute
+        # Update Prometheus metrics
+        if self.enable_prometheus:
+            for name in ("cpu", "memory", "disk", "gpu"):
+                if name in sample:
+                    self.resource_usage_gauge.labels(name).set(sample[name])
+            self.process_rss_gauge.set(sample["process_rss"])
+            self.open_fds_gauge.set(sample["open_fds"])
+            self.loop_lag_gauge.set(sample["loop_lag"])
+            for device, memory in sample.get("accelerators", {}).items():
+                for kind, value in memory.items():
+                    self.accelerator_memory_gauge.labels(device, kind).set(value)
             
     async def record_request(
         self,
         command: str,
         user_id: int,
-        success: bool = True
+        success: bool = True,
+        prompt: Optional[str] = None
     ) -> None:
-        """Record a bot request."""
+        """Record a bot request.
+
+        ``prompt`` feeds the top prompts; it is counted per request rather
+        than per generation so prompts answered from a cache count as well.
+        """
         self.metrics["requests"]["total"] += 1
         self.metrics["requests"]["success"] += 1 if success else 0
         self.metrics["requests"]["failed"] += 0 if success else 1
@@ -186,15 +315,11 @@ class MetricsCollector:
         
         # Update user stats
         user_id_str = str(user_id)
-        if user_id_str not in self.metrics["requests"]["by_user"]:
-            self.metrics["requests"]["by_user"][user_id_str] = {
-                "total": 0,
-                "success": 0,
-                "failed": 0
-            }
-        self.metrics["requests"]["by_user"][user_id_str]["total"] += 1
-        self.metrics["requests"]["by_user"][user_id_str]["success"] += 1 if success else 0
-        self.metrics["requests"]["by_user"][user_id_str]["failed"] += 0 if success else 1
+        self.metrics["requests"]["by_user"].add(user_id_str)
+        if not success:
+            self.metrics["requests"]["failed_by_user"].add(user_id_str)
+        if prompt:
+            self.metrics["prompts"].add(prompt[:200])
         
         # Update Prometheus metrics
         if self.enable_prometheus:
@@ -209,13 +334,13 @@ class MetricsCollector:
         success: bool,
         model_id: Optional[str] = None
     ) -> None:
-        """Record image generation metrics."""
-        self.metrics["generation_times"].append({
-            "timestamp": datetime.utcnow().isoformat(),
-            "user_id": user_id,
-            "generation_time": generation_time,
-            "success": success
-        })
+        """Record image generation metrics.
+
+        Prompts are counted by :meth:`record_request`, once per request.
+        """
+        self.metrics["generation_times"].add(generation_time)
+        if success:
+            self.record_latency("generation", generation_time, model_id)
         
         if model_id:
             if model_id not in self.metrics["model_usage"]:
@@ -242,21 +367,84 @@ class MetricsCollector:
         if self.enable_prometheus and success:
             self.generation_time_histogram.observe(generation_time)
             
+    def record_latency(self, stage: str, seconds: float, model_id: Optional[str] = None) -> None:
+        """Record a latency sample for one request stage."""
+        by_model = self.latency.setdefault(stage, {})
+        model = model_id or "default"
+        sketch = by_model.get(model)
+        if sketch is None:
+            sketch = by_model[model] = QuantileSketch()
+        sketch.add(seconds)
+
+    def observe_span(self, span: Span) -> None:
+        """Tracer listener: record each finished stage as latency."""
+        self.record_latency(span.name, span.duration, span.get("model"))
+        if self.enable_prometheus:
+            self.stage_time_histogram.labels(span.name).observe(span.duration)
+
+    def get_latency_quantiles(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Get p50/p95/p99 per stage and model, plus an "all" row per stage."""
+        result = {}
+        for stage, by_model in self.latency.items():
+            combined = QuantileSketch()
+            for sketch in by_model.values():
+                combined.merge(sketch)
+            result[stage] = {model: s.summary() for model, s in by_model.items()}
+            result[stage]["all"] = combined.summary()
+        return result
+
+    def export_latency(self) -> Dict[str, Dict[str, Any]]:
+        """Serialize latency sketches so another process can merge them."""
+        return {
+            stage: {model: s.to_dict() for model, s in by_model.items()}
+            for stage, by_model in self.latency.items()
+        }
+
+    def merge_latency(self, exported: Dict[str, Dict[str, Any]]) -> None:
+        """Merge sketches exported by another worker process."""
+        for stage, by_model in exported.items():
+            for model, data in by_model.items():
+                target = self.latency.setdefault(stage, {}).setdefault(model, QuantileSketch())
+                target.merge(QuantileSketch.from_dict(data))
+
     async def record_error(self, error: str, error_type: Optional[str] = None) -> None:
         """Record an error occurrence."""
         error_type = error_type or "unknown"
         if error_type not in self.metrics["errors"]:
-            self.metrics["errors"][error_type] = []
+            self.metrics["errors"][error_type] = TimeSeries(self.series_capacity)
             
-        self.metrics["errors"][error_type].append({
-            "timestamp": datetime.utcnow().isoformat(),
-            "error": error
-        })
+        now = time.time()
+        self.metrics["errors"][error_type].add(1.0, now)
+        self.metrics["recent_errors"].append((now, error_type, error))
         
         # Update Prometheus metrics
         if self.enable_prometheus:
             self.error_counter.labels(type=error_type).inc()
             
+    async def record_rate_limit(self, user_id: int) -> None:
+        """Record a request rejected by the rate limiter."""
+        self.metrics["rate_limits"]["total"] += 1
+        self.metrics["rate_limits"]["by_user"].add(str(user_id))
+
+    def get_heavy_hitters(self, k: Optional[int] = None, recent: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the top users and prompts, by default over the last few minutes.
+
+        Counts are upper bounds; ``error`` is how much each may overestimate.
+        """
+        sources = {
+            "users": self.metrics["requests"]["by_user"],
+            "failing_users": self.metrics["requests"]["failed_by_user"],
+            "rate_limited_users": self.metrics["rate_limits"]["by_user"],
+            "prompts": self.metrics["prompts"],
+        }
+        return {
+            name: [
+                {"key": key, "count": count, "error": error}
+                for key, count, error in hitters.top(k, recent=recent)
+            ]
+            for name, hitters in sources.items()
+        }
+
     async def record_cache_hit(self) -> None:
         """Record a cache hit."""
         self.metrics["cache"]["hits"] += 1
@@ -279,51 +467,126 @@ class MetricsCollector:
             "cpu_usage": self._get_latest_resource_usage("cpu"),
             "memory_usage": self._get_latest_resource_usage("memory"),
             "disk_usage": self._get_latest_resource_usage("disk"),
-            "error_rate": self._calculate_error_rate()
+            "process_rss": self._get_latest_resource_usage("process_rss"),
+            "open_fds": self._get_latest_resource_usage("open_fds"),
+            "event_loop_lag": self._get_latest_resource_usage("loop_lag"),
+            "error_rate": self._calculate_error_rate(),
+            "latency": self.get_latency_quantiles(),
+            "heavy_hitters": self.get_heavy_hitters()
         }
         
     async def _export_metrics(self) -> None:
         """Export metrics to file periodically."""
         while True:
             try:
-                current_time = datetime.utcnow()
-                filename = self.metrics_dir / f"metrics_{current_time.strftime('%Y%m%d')}.json"
-                
-                async with aiofiles.open(filename, 'w') as f:
-                    await f.write(json.dumps(self.metrics, indent=2))
-                    
+                self.flush_metrics()
+                if self.enable_prometheus and self.multiprocess:
+                    write_latency_file(self.export_latency())
+                    # Take over serving if the host's exporter process exited
+                    if not self.exporter_started:
+                        self.exporter_started = start_exporter(
+                            self.prometheus_port, self._served_registry, routes=self._debug_routes()
+                        )
             except Exception as e:
                 logger.error(f"Error exporting metrics: {str(e)}")
                 
             await asyncio.sleep(self.export_interval)
             
+    def flush_metrics(self) -> Optional[Dict[str, Any]]:
+        """Append the changes since the previous flush to the metrics log.
+
+        Counters are written as deltas, time series as their new samples and
+        errors as the ones recorded since the last flush, so the cost of a
+        flush does not grow with the bot's uptime. Returns the record, or
+        None when nothing changed.
+        """
+        record: Dict[str, Any] = {"ts": time.time()}
+
+        counters = {}
+        for name, value in self._counter_values().items():
+            delta = value - self._flushed_counters.get(name, 0)
+            if delta:
+                counters[name] = delta
+                self._flushed_counters[name] = value
+        if counters:
+            record["counters"] = counters
+
+        series = {}
+        for name, values in self._series().items():
+            new_samples = values.samples_since(self._flushed_counts.get(name, 0))
+            if new_samples:
+                series[name] = [list(sample) for sample in new_samples]
+            self._flushed_counts[name] = values.count
+        if series:
+            record["series"] = series
+
+        total_errors = sum(values.count for values in self.metrics["errors"].values())
+        new_errors = min(total_errors - self._flushed_errors, len(self.metrics["recent_errors"]))
+        if new_errors > 0:
+            record["errors"] = [list(item) for item in list(self.metrics["recent_errors"])[-new_errors:]]
+        self._flushed_errors = total_errors
+
+        if len(record) == 1:
+            return None
+        self.log.append(record)
+        return record
+
+    def load_history(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, Any]:
+        """Rebuild counters, samples and errors for a time range from the metrics log."""
+        return self.log.reconstruct(start, end)
+
+    def _counter_values(self) -> Dict[str, int]:
+        """Flatten the monotonically increasing counters to dotted names."""
+        flat: Dict[str, int] = {}
+
+        def walk(prefix, value):
+            if isinstance(value, dict):
+                for key, item in value.items():
+                    if not str(key).startswith("avg_"):
+                        walk(f"{prefix}.{key}", item)
+            elif isinstance(value, int) and not isinstance(value, bool):
+                flat[prefix] = value
+
+        for section in ("requests", "cache", "rate_limits", "model_usage"):
+            walk(section, self.metrics[section])
+        return flat
+
+    def _series(self) -> Dict[str, TimeSeries]:
+        series = {"generation_times": self.metrics["generation_times"]}
+        for resource, values in self.metrics["resource_usage"].items():
+            if values is not None:
+                series[f"resource_usage.{resource}"] = values
+        for error_type, values in self.metrics["errors"].items():
+            series[f"errors.{error_type}"] = values
+        return series
+
     async def _cleanup_old_metrics(self) -> None:
         """Clean up old metrics files."""
         while True:
             try:
-                current_time = datetime.utcnow()
-                retention_limit = current_time - timedelta(days=self.retention_days)
-                
-                for metrics_file in self.metrics_dir.glob("metrics_*.json"):
-                    file_date = datetime.strptime(
-                        metrics_file.stem.split('_')[1],
-                        '%Y%m%d'
-                    )
-                    if file_date < retention_limit:
-                        metrics_file.unlink()
-                        
+                self.log.cleanup(time.time() - self.retention_days * 86400)
             except Exception as e:
                 logger.error(f"Error cleaning up old metrics: {str(e)}")
                 
-            await asyncio.sleep(86400)  # Run daily
+            await asyncio.sleep(3600)  # Segments are small; check hourly
             
+    def _snapshot(self) -> Dict[str, Any]:
+        """Convert the metrics to plain JSON-serializable structures."""
+        def convert(value):
+            if isinstance(value, TimeSeries):
+                return value.to_dict()
+            if isinstance(value, (QuantileSketch, HeavyHitters)):
+                return value.to_dict()
+            if isinstance(value, dict):
+                return {k: convert(v) for k, v in value.items()}
+            if isinstance(value, deque):
+                return [list(item) for item in value]
+            return value
+        return convert({**self.metrics, "latency": self.latency})
+
     def _calculate_avg_generation_time(self) -> float:
         """Calculate average generation time."""
-        if not self.metrics["generation_times"]:
-            return 0.0
-        return sum(
-            g["generation_time"] for g in self.metrics["generation_times"]
-        ) / len(self.metrics["generation_times"])
+        return self.metrics["generation_times"].mean
         
     def _calculate_cache_hit_rate(self) -> float:
         """Calculate cache hit rate."""
@@ -340,29 +603,23 @@ class MetricsCollector:
         
     def _get_latest_resource_usage(self, resource_type: str) -> float:
         """Get latest resource usage value."""
-        if not self.metrics["resource_usage"][resource_type]:
-            return 0.0
-        return self.metrics["resource_usage"][resource_type][-1]["value"]
+        series = self.metrics["resource_usage"][resource_type]
+        return series.latest if series is not None else 0.0
         
     def _has_gpu(self) -> bool:
         """Check if GPU is available."""
-        try:
-            import torch
-            return torch.cuda.is_available()
-        except ImportError:
-            return False
+        return cuda_available()
             
     def _get_gpu_usage(self) -> float:
         """Get GPU usage percentage."""
         try:
-            import torch
-            if not torch.cuda.is_available():
+            devices = accelerator_memory()
+            if not devices:
                 return 0.0
             
             # Get GPU memory usage
-            gpu_memory_used = torch.cuda.memory_allocated(0)
-            gpu_memory_total = torch.cuda.get_device_properties(0).total_memory
-            return (gpu_memory_used / gpu_memory_total) * 100
+            first = devices["0"]
+            return (first["allocated"] / first["total"]) * 100
             
         except Exception:
             return 0.0
@@ -0,0 +1,109 @@
+# omega_bot/utils/profiler.py
+from typing import Dict
+from collections import Counter
+from dataclasses import dataclass, field
+import asyncio
+import math
+import os
+import sys
+import threading
+import time
+from .logger import get_logger
+from ..utils.error_handler import BotError
+
+logger = get_logger(__name__)
+
+# One profile at a time per process, whoever triggers it
+_running = threading.Lock()
+
+@dataclass
+class ProfileResult:
+    stacks: Dict[str, int] = field(default_factory=dict)
+    samples: int = 0
+    duration: float = 0.0
+    interval: float = 0.0  # final sampling interval, after any backoff
+    overhead: float = 0.0  # share of wall time spent taking samples
+
+    def collapsed(self) -> str:
+        """Collapsed stacks ("frame;frame;frame count"), as read by flamegraph.pl and speedscope."""
+        lines = [f"{stack} {count}" for stack, count in sorted(self.stacks.items())]
+        return "\n".join(lines) + "\n" if lines else ""
+
+class SamplingProfiler:
+    """Statistical CPU profiler that periodically samples every thread's stack.
+
+    Sampling reads ``sys._current_frames()`` from the calling thread, so
+    nothing is instrumented and threads that are not sampled run at full
+    speed. Each sample costs time proportional to the total stack depth;
+    when that cost exceeds ``max_overhead`` of the interval the interval
+    is stretched, so sampling never takes more than ``max_overhead`` of one
+    core however deep the stacks get.
+    """
+
+    def __init__(self, interval: float = 0.005, max_overhead: float = 0.02, max_seconds: float = 120):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_seconds = max_seconds
+
+    def profile(self, seconds: float) -> ProfileResult:
+        """Sample all other threads for ``seconds``; blocks the calling thread."""
+        if not math.isfinite(seconds):
+            raise BotError(f"Profile duration must be a finite number of seconds, got {seconds}")
+        seconds = min(max(seconds, 0.0), self.max_seconds)
+        if not _running.acquire(blocking=False):
+            raise BotError("A profile is already running")
+        try:
+            return self._sample(seconds)
+        finally:
+            _running.release()
+
+    async def profile_async(self, seconds: float) -> ProfileResult:
+        """Profile from a worker thread so the event loop keeps running (and is sampled)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.profile, seconds)
+
+    def _sample(self, seconds: float) -> ProfileResult:
+        own_id = threading.get_ident()
+        names = {}
+        stacks: Counter = Counter()
+        interval = self.interval
+        samples = 0
+        busy = 0.0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            tick = time.perf_counter()
+            if tick >= deadline:
+                break
+            frames = sys._current_frames()
+            if len(names) != len(frames):
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            del frames
+            samples += 1
+            cost = time.perf_counter() - tick
+            busy += cost
+            if cost > interval * self.max_overhead:
+                interval = cost / self.max_overhead
+            time.sleep(max(0.0, min(interval - cost, deadline - time.perf_counter())))
+        duration = time.perf_counter() - start
+        return ProfileResult(
+            stacks=dict(stacks),
+            samples=samples,
+            duration=duration,
+            interval=interval,
+            overhead=busy / duration if duration else 0.0,
+        )
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        parts.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(parts))
@@ -0,0 +1,149 @@
+# omega_bot/utils/prometheus.py
+from typing import Callable, Dict, List, Optional, Tuple
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import errno
+import json
+import os
+import threading
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.exposition import MetricsHandler
+from .logger import get_logger
+from .sketches import QuantileSketch
+
+logger = get_logger(__name__)
+
+_LATENCY_PREFIX = "latency_"
+
+# A debug route takes the query parameters and returns (status, content type, body)
+Route = Callable[[Dict[str, List[str]]], Tuple[int, str, bytes]]
+
+def multiprocess_dir() -> Optional[str]:
+    """Directory shared by worker processes in multiprocess mode, if enabled.
+
+    prometheus_client picks its value backend when it is first imported, so
+    ``PROMETHEUS_MULTIPROC_DIR`` has to be in the environment before any
+    worker starts; every Counter, Gauge, Histogram and Summary then writes
+    to mmap'd files in that directory instead of process memory.
+    """
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+def clear_multiprocess_dir() -> None:
+    """Remove files left by a previous run; call once per host before workers start."""
+    directory = multiprocess_dir()
+    if not directory:
+        return
+    for path in Path(directory).glob("*"):
+        if path.suffix == ".db" or path.name.startswith(_LATENCY_PREFIX):
+            path.unlink()
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """Drop the live gauges of an exited worker from the aggregate."""
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+def write_latency_file(exported: Dict[str, Dict[str, dict]], pid: Optional[int] = None) -> None:
+    """Publish this process's latency sketches for the host exporter."""
+    directory = multiprocess_dir()
+    if not directory:
+        return
+    path = Path(directory) / f"{_LATENCY_PREFIX}{pid or os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(exported))
+    os.replace(tmp, path)
+
+def merged_latency(directory: str) -> Dict[str, Dict[str, QuantileSketch]]:
+    """Merge the latency sketches published by every worker on the host."""
+    merged: Dict[str, Dict[str, QuantileSketch]] = {}
+    for path in Path(directory).glob(f"{_LATENCY_PREFIX}*.json"):
+        try:
+            exported = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable latency file {path.name}: {str(e)}")
+            continue
+        for stage, by_model in exported.items():
+            for model, data in by_model.items():
+                target = merged.setdefault(stage, {}).setdefault(model, QuantileSketch())
+                target.merge(QuantileSketch.from_dict(data))
+    return merged
+
+class LatencyQuantileCollector:
+    """Expose latency sketches as quantile gauges at scrape time."""
+
+    def __init__(self, sketches: Callable[[], Dict[str, Dict[str, QuantileSketch]]]):
+        self.sketches = sketches
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            'bot_latency_quantile_seconds',
+            'Streaming latency quantiles per stage and model',
+            labels=['stage', 'model', 'quantile']
+        )
+        for stage, by_model in self.sketches().items():
+            for model, sketch in by_model.items():
+                for q in (0.5, 0.95, 0.99):
+                    family.add_metric([stage, model, str(q)], sketch.quantile(q))
+        yield family
+
+def exporter_registry() -> CollectorRegistry:
+    """Registry to serve: the aggregate of all workers in multiprocess mode."""
+    directory = multiprocess_dir()
+    if not directory:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=directory)
+    registry.register(LatencyQuantileCollector(lambda: merged_latency(directory)))
+    return registry
+
+class _ExporterHandler(MetricsHandler):
+    """Serves metrics, plus any debug routes registered with the exporter."""
+
+    routes: Dict[str, Route] = {}
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        route = self.routes.get(url.path)
+        if route is None:
+            super().do_GET()
+            return
+        try:
+            status, content_type, body = route(parse_qs(url.query))
+        except Exception as e:
+            logger.error(f"Error serving {url.path}: {str(e)}")
+            status, content_type, body = 500, "text/plain", f"{str(e)}\n".encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_exporter(
+    port: int,
+    registry: Optional[CollectorRegistry] = None,
+    addr: str = "0.0.0.0",
+    routes: Optional[Dict[str, Route]] = None
+) -> bool:
+    """Start the metrics HTTP server unless another process on the host already has.
+
+    The port itself is the host-wide lock: the first worker to bind it
+    serves the aggregate, the others return False and may retry later to
+    take over if that worker exits. ``routes`` adds debug endpoints next
+    to ``/metrics``.
+    """
+    handler = type("ExporterHandler", (_ExporterHandler,), {
+        "registry": registry or exporter_registry(),
+        "routes": dict(routes or {}),
+    })
+    try:
+        server = ThreadingHTTPServer((addr, port), handler)
+    except OSError as e:
+        if e.errno != errno.EADDRINUSE:
+            raise
+        logger.debug(f"Metrics exporter already running on port {port}")
+        return False
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    logger.info(f"Metrics exporter listening on port {port}")
+    return True
@@ -0,0 +1,129 @@
+# omega_bot/utils/resources.py
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import functools
+import os
+import threading
+import time
+import psutil
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+@functools.lru_cache(maxsize=None)
+def _torch() -> Optional[Any]:
+    """Import torch once; importing it is slow and it is optional."""
+    try:
+        import torch
+        return torch
+    except ImportError:
+        return None
+
+def cuda_available() -> bool:
+    torch = _torch()
+    try:
+        return torch is not None and torch.cuda.is_available()
+    except Exception:
+        return False
+
+def accelerator_memory() -> Dict[str, Dict[str, int]]:
+    """Allocated and total memory per CUDA device, keyed by device index."""
+    if not cuda_available():
+        return {}
+    torch = _torch()
+    devices = {}
+    for index in range(torch.cuda.device_count()):
+        devices[str(index)] = {
+            "allocated": torch.cuda.memory_allocated(index),
+            "reserved": torch.cuda.memory_reserved(index),
+            "total": torch.cuda.get_device_properties(index).total_memory,
+        }
+    return devices
+
+class ResourceSampler:
+    """Samples system and process resources on a background thread.
+
+    CPU usage is the non-blocking delta since the previous sample, so no
+    call ever sleeps. Each sample is handed to ``callback`` on the event
+    loop via ``call_soon_threadsafe``; the delay until that callback runs
+    is the event-loop lag reported with the sample.
+    """
+
+    def __init__(self, interval: float = 60, disk_path: str = "/"):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.latest: Dict[str, Any] = {}
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._callback: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample without blocking."""
+        memory = psutil.virtual_memory()
+        process_memory = self._process.memory_info()
+        sample = {
+            "cpu": psutil.cpu_percent(interval=None),
+            "memory": memory.percent,
+            "disk": psutil.disk_usage(self.disk_path).percent,
+            "process_rss": process_memory.rss,
+            "process_cpu": self._process.cpu_percent(interval=None),
+            "open_fds": self._open_fds(),
+            "threads": self._process.num_threads(),
+        }
+        devices = accelerator_memory()
+        if devices:
+            sample["accelerators"] = devices
+            # Kept for the existing "gpu" series: memory use of the first device
+            first = devices["0"]
+            sample["gpu"] = first["allocated"] / first["total"] * 100 if first["total"] else 0.0
+        return sample
+
+    def _open_fds(self) -> int:
+        try:
+            if hasattr(self._process, "num_fds"):
+                return self._process.num_fds()
+            return self._process.num_handles()
+        except (psutil.Error, OSError):
+            return -1
+
+    def start(self, loop: asyncio.AbstractEventLoop, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Start sampling; ``callback`` runs on ``loop`` with every sample."""
+        if self._thread is not None:
+            return
+        self._loop = loop
+        self._callback = callback
+        self._stop.clear()
+        # The first non-blocking cpu_percent call only primes the counters
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                sample = self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling system resources: {str(e)}")
+                continue
+            try:
+                self._loop.call_soon_threadsafe(self._deliver, time.monotonic(), sample)
+            except RuntimeError:
+                # Event loop closed underneath us
+                break
+
+    def _deliver(self, scheduled_at: float, sample: Dict[str, Any]) -> None:
+        sample["loop_lag"] = time.monotonic() - scheduled_at
+        self.latest = sample
+        try:
+            self._callback(sample)
+        except Exception as e:
+            logger.error(f"Error recording resource sample: {str(e)}")
@@ -0,0 +1,247 @@
+# omega_bot/utils/router.py
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+import asyncio
+import random
+import time
+
+# Standard library only, and no omega_bot imports: the CLI in src/ routes
+# through this module too, without the bot's dependencies installed
+
+
+class RouterError(Exception):
+    """No backend could serve the request."""
+
+
+class RequestRejected(Exception):
+    """Base for errors that mean the request itself is bad, whichever backend gets it."""
+
+
+class Backend(ABC):
+    """Anything that can turn a prompt into an image.
+
+    ``generate`` returns whatever the backend produces (a URL, a file path,
+    a saved-image record) and raises on failure. A ``RequestRejected``
+    subclass means the request itself is bad: the router passes it straight to the
+    caller; any other exception counts against the backend.
+    """
+
+    name: str = "backend"
+
+    @abstractmethod
+    async def generate(self, prompt: str, **params: Any) -> Any:
+        ...
+
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+MIN_LATENCY = 0.001  # seconds; keeps weights finite for instant backends
+
+
+class BackendState:
+    """Moving health of one backend, as seen by the router."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.latency: Optional[float] = None  # EWMA of successful call latency
+        self.deviation = 0.0  # EWMA of |latency - mean|, for the hedge delay
+        self.error_rate = 0.0  # EWMA of failures (1) and successes (0)
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.circuit = CLOSED
+        self.open_until = 0.0
+        self.open_seconds = 0.0
+        self.probing = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.backend.name,
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "failures": self.failures,
+            "circuit": self.circuit,
+        }
+
+
+class Router(Backend):
+    """Spread generations over several backends by observed latency and errors.
+
+    Each call goes to a backend drawn at random with weight
+    ``(1 - error_rate)^2 / (latency * (in_flight + 1))``, so slow, busy or
+    failing backends get proportionally less traffic without being starved
+    of the samples that would show them recovering.
+
+    - Hedging: if the chosen backend has not answered after its usual
+      latency plus four deviations (or ``hedge_after`` seconds), the same
+      request also goes to another backend and the first success wins. At
+      most ``hedge_budget`` of requests are hedged, so a slow fleet is not
+      hit with double load.
+    - Failover: a failed call is retried on a backend not yet tried, up to
+      ``max_attempts`` backends per request.
+    - Circuit breaking: ``failure_threshold`` consecutive failures take a
+      backend out for ``open_seconds``; then a single probe request decides
+      whether it comes back or stays out for twice as long.
+    """
+
+    name = "router"
+
+    def __init__(
+        self,
+        backends: Sequence[Backend],
+        max_attempts: int = 2,
+        hedge_after: Optional[float] = None,
+        hedge_budget: float = 0.1,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        max_open_seconds: float = 600.0,
+        alpha: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ):
+        if not backends:
+            raise ValueError("Router needs at least one backend")
+        self.states = [BackendState(backend) for backend in backends]
+        self.max_attempts = max_attempts
+        self.hedge_after = hedge_after
+        self.hedge_budget = hedge_budget
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.alpha = alpha
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.hedges = 0
+        self._hedge_tokens = 1.0
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [state.to_dict() for state in self.states]
+
+    async def generate(self, prompt: str, **params: Any) -> Any:
+        self._hedge_tokens = min(10.0, self._hedge_tokens + self.hedge_budget)
+        tried: Set[int] = set()
+        error: Optional[BaseException] = None
+        for _ in range(self.max_attempts):
+            state = self._pick(tried)
+            if state is None:
+                break
+            try:
+                return await self._hedged(state, tried, prompt, params)
+            except RequestRejected:
+                raise
+            except Exception as e:
+                error = e
+        if error is None:
+            raise RouterError("No backend available: every circuit is open")
+        raise RouterError(f"All backends failed, last error: {str(error)}")
+
+    # Selection
+
+    def _available(self, state: BackendState) -> bool:
+        if state.circuit == CLOSED:
+            return True
+        if state.circuit == OPEN and self.clock() >= state.open_until:
+            state.circuit = HALF_OPEN
+        return state.circuit == HALF_OPEN and not state.probing
+
+    def _pick(self, tried: Set[int]) -> Optional[BackendState]:
+        candidates = [s for s in self.states if id(s) not in tried and self._available(s)]
+        if not candidates:
+            return None
+        known = [s.latency for s in candidates if s.latency is not None]
+        # Untried backends are assumed as fast as the fastest known one, so they get sampled
+        default = min(known) if known else 1.0
+        weights = [
+            (1.0 - s.error_rate) ** 2 / (max(s.latency or default, MIN_LATENCY) * (s.in_flight + 1))
+            for s in candidates
+        ]
+        if not any(weights):
+            weights = [1.0] * len(candidates)
+        state = self.rng.choices(candidates, weights)[0]
+        tried.add(id(state))
+        if state.circuit == HALF_OPEN:
+            state.probing = True
+        return state
+
+    def _hedge_delay(self, state: BackendState) -> Optional[float]:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        if state.latency is None:
+            return None
+        return state.latency + 4 * state.deviation
+
+    # Calls
+
+    async def _hedged(self, state: BackendState, tried: Set[int], prompt: str, params: Dict[str, Any]) -> Any:
+        tasks = {asyncio.ensure_future(self._call(state, prompt, params)): state}
+        try:
+            delay = self._hedge_delay(state)
+            if delay is not None and len(self.states) > 1:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._hedge_tokens >= 1.0:
+                    second = self._pick(tried)
+                    if second is not None:
+                        self._hedge_tokens -= 1.0
+                        self.hedges += 1
+                        tasks[asyncio.ensure_future(self._call(second, prompt, params))] = second
+            error: Optional[BaseException] = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    del tasks[task]
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    if isinstance(error, RequestRejected):
+                        raise error
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()  # the losing hedge; _call does not count it as a failure
+
+    async def _call(self, state: BackendState, prompt: str, params: Dict[str, Any]) -> Any:
+        state.in_flight += 1
+        started = self.clock()
+        try:
+            result = await state.backend.generate(prompt, **params)
+        except (asyncio.CancelledError, RequestRejected):
+            state.probing = False
+            raise
+        except Exception:
+            self._record_failure(state)
+            raise
+        else:
+            self._record_success(state, self.clock() - started)
+            return result
+        finally:
+            state.in_flight -= 1
+
+    def _record_success(self, state: BackendState, latency: float) -> None:
+        a = self.alpha
+        state.calls += 1
+        if state.latency is None:
+            state.latency, state.deviation = latency, latency / 2
+        else:
+            state.deviation = (1 - a) * state.deviation + a * abs(latency - state.latency)
+            state.latency = (1 - a) * state.latency + a * latency
+        state.error_rate = (1 - a) * state.error_rate
+        state.consecutive_failures = 0
+        if state.circuit != CLOSED:
+            state.circuit, state.open_seconds, state.probing = CLOSED, 0.0, False
+
+    def _record_failure(self, state: BackendState) -> None:
+        a = self.alpha
+        state.calls += 1
+        state.failures += 1
+        state.error_rate = (1 - a) * state.error_rate + a
+        state.consecutive_failures += 1
+        if state.circuit == HALF_OPEN or state.consecutive_failures >= self.failure_threshold:
+            if state.circuit == HALF_OPEN:
+                state.open_seconds = min(self.max_open_seconds, state.open_seconds * 2)
+            else:
+                state.open_seconds = self.open_seconds
+            state.circuit = OPEN
+            state.open_until = self.clock() + state.open_seconds
+            state.probing = False
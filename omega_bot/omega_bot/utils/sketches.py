@@ -0,0 +1,275 @@
+# omega_bot/utils/sketches.py
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import heapq
+import itertools
+import math
+import time
+
+class QuantileSketch:
+    """Mergeable streaming quantile sketch with relative-error guarantees.
+
+    Values are counted in logarithmic buckets (DDSketch style): bucket ``i``
+    covers ``(gamma**(i-1), gamma**i]`` with ``gamma = (1+a)/(1-a)``, so any
+    reported quantile is within ``relative_accuracy`` of the true value.
+    Inserting is one ``log`` and a dict update; merging adds bucket counts,
+    which makes sketches from several worker processes combinable exactly.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048, min_value: float = 1e-6):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        buckets = self.buckets
+        buckets[index] = buckets.get(index, 0) + 1
+        if len(buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        """Fold the two lowest buckets together; only the fast tail keeps full precision."""
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile (0 <= q <= 1)."""
+        if not self.count:
+            return 0.0
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                estimate = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)) -> Dict[str, float]:
+        return {f"p{round(q * 100):d}": self.quantile(q) for q in qs}
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Add ``other``'s samples into this sketch."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.buckets = {int(k): v for k, v in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if data["count"]:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+    def summary(self) -> Dict[str, float]:
+        return {"count": self.count, "mean": self.mean, **self.quantiles()}
+
+class SpaceSaving:
+    """Top-K heavy hitters in fixed memory (the Space-Saving algorithm).
+
+    At most ``capacity`` keys are tracked. A new key arriving when the
+    summary is full replaces the key with the smallest count and inherits
+    that count as its error, so every reported count overestimates the
+    true one by at most ``total / capacity``. The minimum is found through
+    a lazily invalidated heap, which keeps updates at O(log capacity).
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self.total = 0
+        self._heap: List[Tuple[int, int, Hashable]] = []  # (count, seq, key); stale items skipped
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    @property
+    def error_bound(self) -> float:
+        """Maximum overestimate of any reported count."""
+        return self.total / self.capacity
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        self.total += count
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+        else:
+            floor, victim = self._pop_min()
+            del counts[victim]
+            del self.errors[victim]
+            counts[key] = floor + count
+            self.errors[key] = floor
+        heapq.heappush(self._heap, (counts[key], next(self._sequence), key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _pop_min(self) -> Tuple[int, Hashable]:
+        heap = self._heap
+        while True:
+            count, _, key = heapq.heappop(heap)
+            if self.counts.get(key) == count:
+                return count, key
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(c, next(self._sequence), k) for k, c in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _floor(self) -> int:
+        """Count any untracked key may have had."""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def estimate(self, key: Hashable) -> int:
+        """Upper bound on the count of ``key``."""
+        return self.counts.get(key, self._floor())
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[Hashable, int, int]]:
+        """Return ``(key, count, error)`` for the ``k`` heaviest keys."""
+        ranked = heapq.nlargest(k or len(self.counts), self.counts.items(), key=lambda item: item[1])
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Combine two summaries; the result keeps this summary's capacity."""
+        own_floor, other_floor = self._floor(), other._floor()
+        merged: Dict[Hashable, Tuple[int, int]] = {}
+        for key in set(self.counts) | set(other.counts):
+            count = self.counts.get(key, own_floor) + other.counts.get(key, other_floor)
+            error = self.errors.get(key, own_floor) + other.errors.get(key, other_floor)
+            merged[key] = (count, error)
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+        self.counts = {key: count for key, (count, _) in kept}
+        self.errors = {key: error for key, (_, error) in kept}
+        self.total += other.total
+        self._rebuild_heap()
+        return self
+
+    def clear(self) -> None:
+        self.counts.clear()
+        self.errors.clear()
+        self._heap.clear()
+        self.total = 0
+
+    def to_dict(self, k: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "error_bound": self.error_bound,
+            "top": [[str(key), count, error] for key, count, error in self.top(k)],
+        }
+
+class HeavyHitters:
+    """Who is hammering us: all-time and recent top-K in constant memory.
+
+    ``error`` is the tolerated overestimate as a fraction of all events;
+    it sets the Space-Saving capacity to ``max(k, 1 / error)``. Recent
+    counts cover the current and the previous ``window`` seconds, kept in
+    two summaries that rotate, so bursts show up quickly and fade out.
+    """
+
+    def __init__(
+        self,
+        k: int = 10,
+        error: float = 0.001,
+        window: float = 300,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if not 0 < error < 1:
+            raise ValueError("error must be between 0 and 1")
+        self.k = k
+        self.window = window
+        self.capacity = max(k, math.ceil(1 / error))
+        self._clock = clock
+        self.lifetime = SpaceSaving(self.capacity)
+        self._current = SpaceSaving(self.capacity)
+        self._previous = SpaceSaving(self.capacity)
+        self._window_start = clock()
+
+    def _rotate(self) -> None:
+        now = self._clock()
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+        if elapsed < 2 * self.window:
+            self._previous, self._current = self._current, self._previous
+            self._window_start += self.window
+        else:
+            self._previous.clear()
+            self._window_start = now
+        self._current.clear()
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        self._rotate()
+        self.lifetime.add(key, count)
+        self._current.add(key, count)
+
+    def recent(self) -> SpaceSaving:
+        """Summary of the last one to two windows."""
+        self._rotate()
+        combined = SpaceSaving(self.capacity)
+        return combined.merge(self._previous).merge(self._current)
+
+    def top(self, k: Optional[int] = None, recent: bool = True) -> List[Tuple[Hashable, int, int]]:
+        summary = self.recent() if recent else self.lifetime
+        return summary.top(k or self.k)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"recent": self.recent().to_dict(self.k), "lifetime": self.lifetime.to_dict(self.k)}
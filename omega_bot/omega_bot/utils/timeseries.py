@@ -0,0 +1,205 @@
+# omega_bot/utils/timeseries.py
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from array import array
+import math
+import time
+
+class RingBuffer:
+    """Fixed-capacity buffer of ``(timestamp, value)`` samples.
+
+    Backed by two preallocated ``array('d')`` so memory never grows, and
+    the window sum is adjusted on every append and overwrite so the mean is
+    O(1).
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._len = 0
+        self.sum = 0.0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def append(self, timestamp: float, value: float) -> None:
+        if self._len == self.capacity:
+            self.sum -= self._values[self._next]
+        else:
+            self._len += 1
+        self._timestamps[self._next] = timestamp
+        self._values[self._next] = value
+        self.sum += value
+        self._next = (self._next + 1) % self.capacity
+        if self._next == 0:
+            # Once per wrap, drop the rounding drift of incremental updates
+            self.sum = math.fsum(self._values[:self._len])
+
+    def __iter__(self) -> Iterator[Tuple[float, float]]:
+        """Iterate samples oldest first."""
+        start = (self._next - self._len) % self.capacity
+        for i in range(self._len):
+            j = (start + i) % self.capacity
+            yield self._timestamps[j], self._values[j]
+
+    def tail(self, n: int) -> List[Tuple[float, float]]:
+        """Return the ``n`` newest samples, oldest first."""
+        n = min(n, self._len)
+        start = (self._next - n) % self.capacity
+        return [
+            (self._timestamps[j], self._values[j])
+            for j in ((start + i) % self.capacity for i in range(n))
+        ]
+
+    def last(self) -> Optional[Tuple[float, float]]:
+        if not self._len:
+            return None
+        j = (self._next - 1) % self.capacity
+        return self._timestamps[j], self._values[j]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self._len if self._len else 0.0
+
+class RollupBuffer:
+    """Fixed-capacity buffer of aggregated buckets (count, sum, min, max)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._counts = array("d", bytes(8 * capacity))
+        self._sums = array("d", bytes(8 * capacity))
+        self._mins = array("d", bytes(8 * capacity))
+        self._maxs = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def append(self, bucket: "_Bucket") -> None:
+        j = self._next
+        self._timestamps[j] = bucket.start
+        self._counts[j] = bucket.count
+        self._sums[j] = bucket.sum
+        self._mins[j] = bucket.min
+        self._maxs[j] = bucket.max
+        self._next = (j + 1) % self.capacity
+        self._len = min(self._len + 1, self.capacity)
+
+    def __iter__(self) -> Iterator[Tuple[float, int, float, float, float]]:
+        start = (self._next - self._len) % self.capacity
+        for i in range(self._len):
+            j = (start + i) % self.capacity
+            yield (self._timestamps[j], int(self._counts[j]), self._sums[j], self._mins[j], self._maxs[j])
+
+class _Bucket:
+    __slots__ = ("start", "count", "sum", "min", "max")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "_Bucket") -> None:
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+class TimeSeries:
+    """Bounded numeric time series with minute and hour rollups.
+
+    Raw samples live in a ring buffer; each sample is also folded into the
+    current minute bucket, finished minutes into the current hour bucket,
+    and finished buckets into their own ring buffers. Lifetime count, sum,
+    min and max are kept as running totals, so summaries never rescan.
+    """
+
+    def __init__(self, raw_capacity: int = 1024, minutes: int = 24 * 60, hours: int = 30 * 24):
+        self.raw = RingBuffer(raw_capacity)
+        self.minutes = RollupBuffer(minutes)
+        self.hours = RollupBuffer(hours)
+        self._minute: Optional[_Bucket] = None
+        self._hour: Optional[_Bucket] = None
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, timestamp: Optional[float] = None) -> None:
+        timestamp = time.time() if timestamp is None else timestamp
+        self.raw.append(timestamp, value)
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        minute_start = timestamp - timestamp % 60
+        if self._minute is None or minute_start > self._minute.start:
+            self._close_minute()
+            self._minute = _Bucket(minute_start)
+        self._minute.add(value)
+
+    def _close_minute(self) -> None:
+        minute = self._minute
+        if minute is None:
+            return
+        self.minutes.append(minute)
+        hour_start = minute.start - minute.start % 3600
+        if self._hour is None or hour_start > self._hour.start:
+            if self._hour is not None:
+                self.hours.append(self._hour)
+            self._hour = _Bucket(hour_start)
+        self._hour.merge(minute)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    @property
+    def latest(self) -> float:
+        last = self.raw.last()
+        return last[1] if last else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+            "latest": self.latest,
+            "window_mean": self.raw.mean,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly view: summary plus the finished rollups."""
+        return {
+            **self.summary(),
+            "minutes": [list(b) for b in self.minutes],
+            "hours": [list(b) for b in self.hours],
+        }
+
+    def samples(self) -> List[Tuple[float, float]]:
+        return list(self.raw)
+
+    def samples_since(self, count: int) -> List[Tuple[float, float]]:
+        """Samples added after the series held ``count`` samples.
+
+        Only the raw window is kept, so at most ``raw_capacity`` samples
+        are returned.
+        """
+        return self.raw.tail(self.count - count) if self.count > count else []
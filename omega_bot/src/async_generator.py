@@ -1,38 +1,334 @@
 import aiohttp
 import asyncio
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Union
+from omega_bot.utils.router import Backend, Router
 from .config_loader import ConfigLoader
-from .exceptions import ImageGenerationError
+from .concurrency import THROTTLE_STATUSES, AdaptiveLimiter, parse_retry_after
+from .exceptions import ImageGenerationError, RequestRejectedError
+from .utils import stream_b64_image
+
+DEFAULT_URL = "https://api.openai.com/v1/images/generations"
+
+
+@dataclass(frozen=True)
+class PromptSpec:
+    """One prompt of a batch; unset fields fall back to the config defaults."""
+
+    index: int
+    prompt: str
+    model: Optional[str] = None
+    size: Optional[str] = None
+    quality: Optional[str] = None
+    seed: Optional[int] = None
+    output: Optional[str] = None  # file name within the output directory
+
+    @property
+    def overrides(self) -> Dict[str, Any]:
+        return {
+            name: value
+            for name, value in (
+                ("model", self.model),
+                ("size", self.size),
+                ("quality", self.quality),
+                ("seed", self.seed),
+                ("output", self.output),
+            )
+            if value is not None
+        }
+
+    def params_key(self) -> tuple:
+        """Requests with equal keys can share a backend batch."""
+        return (self.model, self.size, self.quality)
+
+
+def output_name(index: int, overrides: Dict[str, Any]) -> str:
+    name = overrides.get("output") or f"output_{index}.png"
+    return name if Path(name).suffix else name + ".png"
+
+
+@dataclass
+class BatchResult:
+    index: int
+    prompt: str
+    url: Optional[str] = None
+    error: Optional[str] = None
+    latency: float = 0.0
+    path: Optional[str] = None  # set once the image is saved
+    size: int = 0
+    sha256: Optional[str] = None
+    overrides: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class EndpointBackend(Backend):
+    """One images API endpoint, tried once per routed attempt.
+
+    Inline images are written to a file of this endpoint's own and moved
+    to the output path on success, so a hedged twin writing the same
+    output cannot interleave with it.
+    """
+
+    def __init__(self, generator: "AsyncImageGenerator", url: str, slot: int):
+        self.generator = generator
+        self.url = url
+        self.name = url
+        self.slot = slot
+
+    async def generate(
+        self,
+        prompt: str,
+        session: aiohttp.ClientSession = None,
+        limiter: AdaptiveLimiter = None,
+        params: Optional[Dict[str, Any]] = None,
+        output_path: Optional[Path] = None,
+    ) -> Dict[str, Any]:
+        target = None
+        if output_path is not None:
+            # Keep the suffix last: sanitize_path only accepts image extensions
+            target = output_path.with_name(
+                f"{output_path.stem}.slot{self.slot}{output_path.suffix}"
+            )
+        image = await self.generator._post(
+            session, self.url, params, limiter, target, attempts=1
+        )
+        if target is not None:
+            os.replace(target, output_path)
+            image["path"] = str(output_path)
+        return image
+
 
 class AsyncImageGenerator:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        endpoints: Optional[List[str]] = None,
+    ):
+        """With ``endpoints`` (or config ``endpoints``) besides ``base_url``,
+        requests are routed across all of them by latency and error rate."""
         self.api_key = api_key
         self.config = ConfigLoader().config
-        self.base_url = "https://api.openai.com/v1/images/generations"
+        self.base_url = base_url or DEFAULT_URL
+        urls = [
+            self.base_url,
+            *(self.config.get("endpoints") or [] if endpoints is None else endpoints),
+        ]
+        self.router = self.make_router(urls) if len(urls) > 1 else None
+
+    def make_router(self, urls: List[str]) -> Router:
+        return Router(
+            [EndpointBackend(self, url, slot) for slot, url in enumerate(urls)],
+            max_attempts=self.config["max_retries"],
+            hedge_after=self.config.get("hedge_after"),
+            hedge_budget=self.config.get("hedge_budget", 0.1),
+            failure_threshold=self.config.get("circuit_failures", 5),
+            open_seconds=self.config.get("circuit_open_seconds", 30.0),
+        )
+
+    def make_limiter(self) -> AdaptiveLimiter:
+        return AdaptiveLimiter(
+            initial=self.config.get("concurrency", 8),
+            min_limit=self.config.get("min_concurrency", 1),
+            max_limit=self.config.get("max_concurrency", 64),
+            latency_tolerance=self.config.get("latency_tolerance", 2.0),
+        )
+
+    def _session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            connector=aiohttp.TCPConnector(
+                limit=self.config.get("max_concurrency", 64)
+            ),
+        )
+
+    async def iter_batch(
+        self, prompts: Iterable[str], limiter: Optional[AdaptiveLimiter] = None
+    ) -> AsyncIterator[BatchResult]:
+        """Yield a result per prompt as each completes, never more in flight than the limiter allows.
 
-    async def generate_batch(self, prompts: list[str]) -> list[str]:
-        async with aiohttp.ClientSession(headers={
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }) as session:
-            tasks = [self._generate_single(session, p) for p in prompts]
-            return await asyncio.gather(*tasks)
+        Prompts are pulled from the iterable only when a slot frees up, and a
+        failed prompt yields a result with ``error`` set instead of aborting
+        the batch.
+        """
+        specs = (PromptSpec(index, prompt) for index, prompt in enumerate(prompts))
+        async for result in self.iter_specs(specs, limiter):
+            yield result
 
-    async def _generate_single(self, session: aiohttp.ClientSession, prompt: str) -> str:
+    @property
+    def inline(self) -> bool:
+        """Whether images come back inside the response (``response_format: b64_json``)."""
+        return self.config.get("response_format", "url") == "b64_json"
+
+    async def iter_specs(
+        self,
+        specs: Iterable[PromptSpec],
+        limiter: Optional[AdaptiveLimiter] = None,
+        output_dir: Optional[Union[str, Path]] = None,
+    ) -> AsyncIterator[BatchResult]:
+        """Like ``iter_batch``, for prompts with their own index and parameters.
+
+        In inline mode with an ``output_dir``, each image is decoded to its
+        output file as the response arrives and results come back with
+        ``path`` set instead of ``url``.
+        """
+        limiter = limiter or self.make_limiter()
+        items = iter(specs)
+        async with self._session() as session:
+            pending = set()
+            exhausted = False
+            try:
+                while True:
+                    while not exhausted and len(pending) < limiter.current:
+                        spec = next(items, None)
+                        if spec is None:
+                            exhausted = True
+                        else:
+                            pending.add(
+                                asyncio.ensure_future(
+                                    self._generate_result(
+                                        session, limiter, spec, output_dir
+                                    )
+                                )
+                            )
+                    if not pending:
+                        return
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        yield task.result()
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def generate_batch(self, prompts: Iterable[str]) -> list[BatchResult]:
+        """Generate every prompt; results come back in prompt order."""
+        results = [result async for result in self.iter_batch(prompts)]
+        return sorted(results, key=lambda result: result.index)
+
+    async def _generate_result(
+        self,
+        session: aiohttp.ClientSession,
+        limiter: AdaptiveLimiter,
+        spec: PromptSpec,
+        output_dir: Optional[Union[str, Path]] = None,
+    ) -> BatchResult:
+        result = BatchResult(spec.index, spec.prompt, overrides=spec.overrides)
+        output_path = None
+        if self.inline and output_dir is not None:
+            output_path = Path(output_dir) / output_name(spec.index, result.overrides)
+        started = limiter.clock()
+        try:
+            image = await self._generate_single(
+                session, spec.prompt, limiter, spec, output_path
+            )
+            for name, value in image.items():
+                setattr(result, name, value)
+        except Exception as e:
+            result.error = str(e)
+        result.latency = limiter.clock() - started
+        return result
+
+    async def _generate_single(
+        self,
+        session: aiohttp.ClientSession,
+        prompt: str,
+        limiter: AdaptiveLimiter,
+        spec: Optional[PromptSpec] = None,
+        output_path: Optional[Path] = None,
+    ) -> Dict[str, Any]:
+        """Return ``{"url": ...}``, or with an ``output_path`` in inline mode,
+        the saved image's ``path``, ``size`` and ``sha256``."""
+        overrides = spec.overrides if spec is not None else {}
         params = {
-            "model": self.config["model"],
+            "model": overrides.get("model") or self.config["model"],
             "prompt": prompt,
-            "size": self.config["size"],
-            "quality": self.config["quality"],
-            "n": 1
+            "size": overrides.get("size") or self.config["size"],
+            "quality": overrides.get("quality") or self.config["quality"],
+            "n": 1,
         }
+        if "seed" in overrides:
+            params["seed"] = overrides["seed"]
+        if output_path is not None:
+            params["response_format"] = "b64_json"
+
+        if self.router is not None:
+            return await self.router.generate(
+                prompt,
+                session=session,
+                limiter=limiter,
+                params=params,
+                output_path=output_path,
+            )
+        return await self._post(
+            session,
+            self.base_url,
+            params,
+            limiter,
+            output_path,
+            self.config["max_retries"],
+        )
 
-        for attempt in range(self.config["max_retries"]):
+    async def _post(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        params: Dict[str, Any],
+        limiter: AdaptiveLimiter,
+        output_path: Optional[Path],
+        attempts: int,
+    ) -> Dict[str, Any]:
+        for attempt in range(attempts):
+            await limiter.wait()
+            started = limiter.clock()
+            delay = self.config["retry_delay"] * (2**attempt)
             try:
-                async with session.post(self.base_url, json=params) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-                    return data["data"][0]["url"]
+                async with session.post(url, json=params) as response:
+                    if response.status in THROTTLE_STATUSES:
+                        retry_after = parse_retry_after(
+                            response.headers.get("Retry-After")
+                        )
+                        limiter.on_throttle(started, retry_after)
+                        if retry_after is not None:
+                            delay = 0  # limiter.wait() sits out the pause
+                        error = f"{response.status} {response.reason}"
+                    elif 400 <= response.status < 500 and response.status != 408:
+                        # The request itself is bad; retrying will not help
+                        raise RequestRejectedError(
+                            f"{response.status} {response.reason}: {await response.text()}"
+                        )
+                    else:
+                        response.raise_for_status()
+                        if output_path is not None:
+                            size, sha256 = await stream_b64_image(
+                                response.content, output_path
+                            )
+                            image = {
+                                "path": str(output_path),
+                                "size": size,
+                                "sha256": sha256,
+                            }
+                        else:
+                            data = await response.json()
+                            image = {"url": data["data"][0]["url"]}
+                        limiter.on_success(started, limiter.clock() - started)
+                        return image
+            except ImageGenerationError:
+                raise
             except Exception as e:
-                if attempt == self.config["max_retries"] - 1:
-                    raise ImageGenerationError(f"Async failed after {self.config['max_retries']} attempts: {str(e)}")
-                await asyncio.sleep(self.config["retry_delay"] * (2 ** attempt))
+                error = str(e)
+            if attempt == attempts - 1:
+                raise ImageGenerationError(
+                    f"Async failed after {attempts} attempts: {error}"
+                )
+            await asyncio.sleep(delay)
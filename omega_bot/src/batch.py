@@ -0,0 +1,123 @@
+import aiohttp
+import asyncio
+import time
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Union
+from .async_generator import AsyncImageGenerator, BatchResult, PromptSpec, output_name
+from .batch_input import group_by_params
+from .manifest import JobManifest
+from .utils import download_image
+
+
+@dataclass
+class BatchStats:
+    completed: int = 0
+    saved: int = 0
+    failed: int = 0
+    skipped: int = 0  # already done according to the manifest
+    bytes: int = 0
+    elapsed: float = 0.0
+
+
+async def run_batch(
+    generator: AsyncImageGenerator,
+    prompts: Iterable[Union[str, PromptSpec]],
+    output_dir: Union[str, Path],
+    on_result: Optional[Callable[[BatchResult, BatchStats], None]] = None,
+    download_concurrency: Optional[int] = None,
+    manifest: Optional[JobManifest] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+    group_window: int = 0,
+) -> BatchStats:
+    """Generate, download and save a batch of images as one pipeline.
+
+    Each download starts as soon as its URL arrives, over a single pooled
+    session, and streams to disk in chunks, so wall time approaches the
+    slower of the two stages instead of their sum. When
+    ``download_concurrency`` downloads are already running, no more results
+    are taken from the generator, which in turn stops starting new prompts.
+    ``on_result`` is called once per prompt, in completion order. With
+    ``response_format: b64_json`` there is no second fetch: images are
+    decoded to disk straight from the generation response.
+
+    ``prompts`` are consumed lazily, one as each slot frees up, so an
+    iterator over a huge file is never read ahead. Only prompts with
+    ``start <= index < end`` are processed. With a ``manifest``, prompts it
+    records as done are skipped and every other result is recorded as it
+    finishes. A ``group_window`` above zero reorders prompts within that
+    many so equal parameters run together (see ``group_by_params``).
+    """
+    download_concurrency = download_concurrency or generator.config.get(
+        "download_concurrency", 16
+    )
+    chunk_size = generator.config.get("download_chunk_size", 64 * 1024)
+    stats = BatchStats()
+    started = time.monotonic()
+
+    def finish(result: BatchResult) -> None:
+        stats.completed += 1
+        if result.ok:
+            stats.saved += 1
+            stats.bytes += result.size
+        else:
+            stats.failed += 1
+        stats.elapsed = time.monotonic() - started
+        if manifest is not None:
+            manifest.record(result)
+        if on_result:
+            on_result(result, stats)
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=download_concurrency)
+    ) as session:
+
+        async def save(result: BatchResult) -> None:
+            path = Path(output_dir) / output_name(result.index, result.overrides)
+            try:
+                result.size, result.sha256 = await download_image(
+                    session, result.url, path, chunk_size
+                )
+                result.path = str(path)
+            except Exception as e:
+                result.error = f"Download failed: {str(e)}"
+            finish(result)
+
+        def pending():
+            for position, spec in islice(enumerate(prompts), start, end):
+                if isinstance(spec, str):
+                    spec = PromptSpec(position, spec)
+                if manifest is not None and manifest.is_done(
+                    spec.index, spec.prompt, spec.overrides
+                ):
+                    stats.skipped += 1
+                else:
+                    yield spec
+
+        downloads = set()
+        try:
+            specs = (
+                group_by_params(pending(), group_window)
+                if group_window > 0
+                else pending()
+            )
+            async for result in generator.iter_specs(specs, output_dir=output_dir):
+                if (
+                    not result.ok or result.path is not None
+                ):  # failed, or already saved inline
+                    finish(result)
+                    continue
+                task = asyncio.ensure_future(save(result))
+                downloads.add(task)
+                task.add_done_callback(downloads.discard)
+                if len(downloads) >= download_concurrency:
+                    await asyncio.wait(downloads, return_when=asyncio.FIRST_COMPLETED)
+            await asyncio.gather(*downloads)
+        finally:
+            for task in list(downloads):
+                task.cancel()
+
+    stats.elapsed = time.monotonic() - started
+    return stats
@@ -0,0 +1,89 @@
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+from .async_generator import PromptSpec
+from .exceptions import BatchInputError
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+_FIELDS = {
+    "prompt": str,
+    "model": str,
+    "size": str,
+    "quality": str,
+    "seed": int,
+    "output": str,
+}
+_TYPE_NAMES = {str: "a string", int: "an integer"}
+
+
+def read_prompts(
+    path: Union[str, Path], fmt: Optional[str] = None
+) -> Iterator[PromptSpec]:
+    """Lazily read a batch file, one PromptSpec per non-blank line.
+
+    ``fmt`` is "text" (one prompt per line) or "jsonl" (one object per line
+    with a ``prompt`` and optional ``model``, ``size``, ``quality``, ``seed``
+    and ``output``); by default it follows the file extension. Lines are
+    read as they are consumed, so memory does not grow with the file.
+    Indices count prompts, not lines, matching the output file numbering.
+    """
+    path = Path(path)
+    jsonl = fmt == "jsonl" or (fmt is None and path.suffix.lower() in JSONL_SUFFIXES)
+    index = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            yield (
+                _parse_json_line(index, line, path, line_no)
+                if jsonl
+                else PromptSpec(index, line)
+            )
+            index += 1
+
+
+def _parse_json_line(index: int, line: str, path: Path, line_no: int) -> PromptSpec:
+    where = f"{path.name}:{line_no}"
+    try:
+        data = json.loads(line)
+    except ValueError as e:
+        raise BatchInputError(f"{where}: invalid JSON: {str(e)}")
+    if not isinstance(data, dict):
+        raise BatchInputError(f"{where}: expected a JSON object")
+    unknown = data.keys() - _FIELDS.keys()
+    if unknown:
+        raise BatchInputError(f"{where}: unknown fields {sorted(unknown)}")
+    for name, value in data.items():
+        if value is not None and (
+            not isinstance(value, _FIELDS[name]) or isinstance(value, bool)
+        ):
+            raise BatchInputError(
+                f"{where}: {name} must be {_TYPE_NAMES[_FIELDS[name]]}"
+            )
+    if not (data.get("prompt") or "").strip():
+        raise BatchInputError(f"{where}: missing prompt")
+    return PromptSpec(index=index, **{**data, "prompt": data["prompt"].strip()})
+
+
+def group_by_params(
+    specs: Iterable[PromptSpec], window: int = 256
+) -> Iterator[PromptSpec]:
+    """Reorder prompts so ones with the same parameters come out together.
+
+    At most ``window`` prompts are held back: when the buffer is full the
+    oldest parameter group is released whole. Indices are unchanged, so
+    outputs and the manifest are unaffected by the reordering.
+    """
+    groups: "OrderedDict[tuple, List[PromptSpec]]" = OrderedDict()
+    buffered = 0
+    for spec in specs:
+        groups.setdefault(spec.params_key(), []).append(spec)
+        buffered += 1
+        if buffered >= window:
+            _, group = groups.popitem(last=False)
+            buffered -= len(group)
+            yield from group
+    for group in groups.values():
+        yield from group
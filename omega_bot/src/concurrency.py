@@ -0,0 +1,107 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+# Responses that mean "slow down" rather than "this request is bad"
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def parse_retry_after(
+    value: Optional[str], now: Optional[datetime] = None
+) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for calls to a rate-limited API.
+
+    Each success raises the limit by 1/limit, about one more slot per round
+    of requests. A throttled response, or a smoothed latency above
+    ``latency_tolerance`` times the baseline, multiplies it by ``backoff``.
+    The baseline is the lowest smoothed latency, drifting slowly up towards
+    the current one: single fast samples from a noisy backend would set a
+    floor that ordinary jitter keeps exceeding.
+    Only requests started after the last decrease can cause another one,
+    so a burst of 429s from a single round halves the limit once. A
+    Retry-After pauses every caller of ``wait()`` until it has passed.
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: Optional[float] = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.clock = clock
+        self.latency: Optional[float] = None  # EWMA of successful request latency
+        self.best_latency: Optional[float] = (
+            None  # baseline the smoothed latency is compared to
+        )
+        self.throttled = 0
+        self._last_decrease = -math.inf
+        self._paused_until = 0.0
+
+    @property
+    def current(self) -> int:
+        """Number of requests that may be in flight right now."""
+        return max(self.min_limit, int(self.limit))
+
+    async def wait(self) -> None:
+        """Sleep through any Retry-After pause."""
+        while True:
+            delay = self._paused_until - self.clock()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def on_success(self, started: float, latency: float) -> None:
+        self.latency = (
+            latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        )
+        if self.best_latency is None or self.latency < self.best_latency:
+            self.best_latency = self.latency
+        else:
+            self.best_latency += 0.01 * (self.latency - self.best_latency)
+        if (
+            self.latency_tolerance
+            and self.latency > self.latency_tolerance * self.best_latency
+        ):
+            self._decrease(started)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self, started: float, retry_after: Optional[float] = None) -> None:
+        self.throttled += 1
+        if retry_after:
+            self._paused_until = max(self._paused_until, self.clock() + retry_after)
+        self._decrease(started)
+
+    def _decrease(self, started: float) -> None:
+        if started < self._last_decrease:
+            return
+        self._last_decrease = self.clock()
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
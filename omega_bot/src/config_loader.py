@@ -1,19 +1,36 @@
 import os
-import yaml
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from .exceptions import ConfigurationError
 
+# Parsed "defaults" per file, keyed on (path, mtime, size) so edits are picked up
+_cache: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+
+
 class ConfigLoader:
     def __init__(self, config_path: str = "config/config.yaml"):
         self.config_path = config_path
         self.config = self._load_config()
 
     def _load_config(self) -> Dict[str, Any]:
+        """Return this instance's own copy of the parsed defaults; the file is parsed once."""
         try:
-            with open(self.config_path, 'r') as f:
-                config = yaml.safe_load(f)
-                return config['defaults']
+            stat = os.stat(self.config_path)
+            key = (os.path.abspath(self.config_path), stat.st_mtime_ns, stat.st_size)
+            if key not in _cache:
+                _cache.clear()
+                _cache[key] = self._parse()
+            return dict(_cache[key])
         except FileNotFoundError:
             raise ConfigurationError(f"Config file not found at {self.config_path}")
+        except ConfigurationError:
+            raise
         except Exception as e:
             raise ConfigurationError(f"Error loading config: {str(e)}")
+
+    def _parse(self) -> Dict[str, Any]:
+        import yaml  # only paid for on the first load
+
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        with open(self.config_path, "r") as f:
+            config = yaml.load(f, Loader=loader)
+            return config["defaults"]
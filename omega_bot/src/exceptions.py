@@ -1,11 +1,31 @@
+from omega_bot.utils.router import RequestRejected
+
+
 class ImageGenerationError(Exception):
     """Base exception for image generation failures"""
+
+    pass
+
+
+class RequestRejectedError(ImageGenerationError, RequestRejected):
+    """Raised when the API rejects the request itself; no backend would accept it"""
+
     pass
 
+
 class ConfigurationError(Exception):
     """Raised when config loading fails"""
+
     pass
 
+
 class SecurityError(Exception):
     """Raised for path sanitization issues"""
+
+    pass
+
+
+class BatchInputError(Exception):
+    """Raised for malformed lines in a batch input file"""
+
     pass
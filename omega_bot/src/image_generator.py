@@ -1,8 +1,11 @@
 import openai
 import time
-from typing import Optional
+from pathlib import Path
+from typing import Optional, Union
 from .config_loader import ConfigLoader
 from .exceptions import ImageGenerationError
+from .utils import save_b64_image, save_image
+
 
 class ImageGenerator:
     def __init__(self, api_key: str):
@@ -16,24 +19,44 @@ class ImageGenerator:
             raise ImageGenerationError("Prompt cannot be empty")
 
     def generate_image(self, prompt: str, **kwargs) -> str:
+        """Generate an image and return its URL."""
+        return self._generate(prompt, "url", **kwargs).url
+
+    def generate_to_file(
+        self, prompt: str, file_path: Union[str, Path], **kwargs
+    ) -> Path:
+        """Generate an image and save it to ``file_path``.
+
+        With ``response_format: b64_json`` the image arrives inside the API
+        response and is decoded straight to disk, saving the second fetch.
+        """
+        if self.config.get("response_format", "url") != "b64_json":
+            save_image(self.generate_image(prompt, **kwargs), file_path)
+        else:
+            save_b64_image(
+                self._generate(prompt, "b64_json", **kwargs).b64_json, file_path
+            )
+        return Path(file_path)
+
+    def _generate(self, prompt: str, response_format: str, **kwargs):
         self._validate_prompt(prompt)
-        
+
         params = {
             "model": kwargs.get("model") or self.config["model"],
             "size": kwargs.get("size") or self.config["size"],
             "quality": kwargs.get("quality") or self.config["quality"],
-            "n": 1
+            "response_format": response_format,
+            "n": 1,
         }
 
         for attempt in range(self.config["max_retries"]):
             try:
-                response = self.client.images.generate(
-                    prompt=prompt,
-                    **params
-                )
-                return response.data[0].url
+                response = self.client.images.generate(prompt=prompt, **params)
+                return response.data[0]
             except Exception as e:
                 if attempt == self.config["max_retries"] - 1:
-                    raise ImageGenerationError(f"Failed after {self.config['max_retries']} attempts: {str(e)}")
-                delay = self.config["retry_delay"] * (2 ** attempt)
+                    raise ImageGenerationError(
+                        f"Failed after {self.config['max_retries']} attempts: {str(e)}"
+                    )
+                delay = self.config["retry_delay"] * (2**attempt)
                 time.sleep(delay)
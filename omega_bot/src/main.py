@@ -3,18 +3,20 @@ import asyncio
 import dotenv
 import os
 from pathlib import Path
-from .image_generator import ImageGenerator
-from .async_generator import AsyncImageGenerator
-from .utils import save_image, display_image, sanitize_path
-from .exceptions import ImageGenerationError, SecurityError
+from .exceptions import BatchInputError, ImageGenerationError, SecurityError
+
+# Generators, HTTP clients and plotting are imported inside the commands
+# that use them; tests/test_cli_startup.py keeps startup within budget
 
 dotenv.load_dotenv()
 
+
 @click.group()
 def cli():
     """Omega Text-to-Image Generator"""
     pass
 
+
 @cli.command()
 @click.option("--prompt", required=True, help="Text prompt for image generation")
 @click.option("--output", default="output.png", help="Output file path")
@@ -24,43 +26,121 @@ def generate(prompt, output, no_display, async_flag):
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise click.ClickException("OPENAI_API_KEY not found in .env")
-    
+
+    from .utils import save_image, display_image
+
     try:
         if async_flag:
+            from .async_generator import AsyncImageGenerator
+
             generator = AsyncImageGenerator(api_key)
-            url = asyncio.run(generator.generate_batch([prompt]))[0]
+            result = asyncio.run(_generate_async(generator, prompt, output))
+            if not result.ok:
+                raise ImageGenerationError(result.error)
+            if result.path is None:
+                save_image(result.url, output)
         else:
+            from .image_generator import ImageGenerator
+
             generator = ImageGenerator(api_key)
-            url = generator.generate_image(prompt)
-        
-        save_image(url, output)
+            generator.generate_to_file(prompt, output)
+
         if not no_display:
             display_image(output)
     except (ImageGenerationError, SecurityError) as e:
         raise click.ClickException(str(e))
 
+
+async def _generate_async(generator, prompt, output):
+    from .async_generator import PromptSpec
+
+    spec = PromptSpec(0, prompt, output=Path(output).name)
+    results = [
+        result
+        async for result in generator.iter_specs([spec], output_dir=Path(output).parent)
+    ]
+    return results[0]
+
+
 @cli.command()
 @click.argument("input_file", type=click.Path(exists=True))
 @click.option("--output-dir", default="./outputs", help="Output directory")
-def batch(input_file, output_dir):
-    """Process multiple prompts from a file"""
+@click.option(
+    "--start",
+    default=0,
+    type=click.IntRange(min=0),
+    help="First prompt index of this shard",
+)
+@click.option(
+    "--end",
+    default=None,
+    type=click.IntRange(min=0),
+    help="Prompt index where this shard stops (exclusive)",
+)
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["text", "jsonl"]),
+    default=None,
+    help="Input format (default: jsonl for .jsonl/.ndjson files, text otherwise)",
+)
+@click.option(
+    "--group-window",
+    default=0,
+    type=click.IntRange(min=0),
+    help="Reorder up to this many prompts so equal parameters run together",
+)
+def batch(input_file, output_dir, start, end, fmt, group_window):
+    """Process multiple prompts from a file.
+
+    The file holds one prompt per line, or one JSON object per line with a
+    "prompt" and optional "model", "size", "quality", "seed" and "output".
+    It is streamed, never loaded whole. Progress is kept in a manifest in
+    the output directory: rerunning the same command skips finished
+    prompts and retries failed ones.
+    """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise click.ClickException("OPENAI_API_KEY not found in .env")
 
-    with open(input_file, 'r') as f:
-        prompts = [line.strip() for line in f if line.strip()]
+    from .async_generator import AsyncImageGenerator
+    from .batch import run_batch
+    from .batch_input import read_prompts
+    from .manifest import JobManifest
+
+    manifest = JobManifest(output_dir, start, end)
+    if manifest.entries:
+        click.echo(f"Resuming: {manifest.counts()['done']} prompts already done")
+
+    def report(result, stats):
+        progress = f"[{stats.completed}]"
+        if result.ok:
+            click.echo(f"{progress} Generated: {result.path}")
+        else:
+            click.echo(f"{progress} Failed {result.prompt}: {result.error}")
 
     generator = AsyncImageGenerator(api_key)
-    urls = asyncio.run(generator.generate_batch(prompts))
-    
-    for idx, (prompt, url) in enumerate(zip(prompts, urls)):
-        try:
-            output_path = Path(output_dir) / f"output_{idx}.png"
-            save_image(url, output_path)
-            click.echo(f"Generated: {output_path}")
-        except Exception as e:
-            click.echo(f"Failed to save {prompt}: {str(e)}")
+    try:
+        with manifest:
+            stats = asyncio.run(
+                run_batch(
+                    generator,
+                    read_prompts(input_file, fmt),
+                    output_dir,
+                    on_result=report,
+                    manifest=manifest,
+                    start=start,
+                    end=end,
+                    group_window=group_window,
+                )
+            )
+    except BatchInputError as e:
+        raise click.ClickException(str(e))
+    click.echo(
+        f"Saved {stats.saved}, failed {stats.failed}, skipped {stats.skipped}, "
+        f"{stats.bytes / 1e6:.1f} MB in {stats.elapsed:.1f}s"
+    )
+
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from .async_generator import BatchResult
+
+MANIFEST_PREFIX = "manifest-"
+MANIFEST_SUFFIX = ".jsonl"
+
+
+def prompt_digest(prompt: str, overrides: Optional[Dict[str, Any]] = None) -> str:
+    """Identify what was asked for at an index; plain prompts hash as before."""
+    if overrides:
+        prompt = json.dumps({"prompt": prompt, **overrides}, sort_keys=True)
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class JobManifest:
+    """Per-prompt record of a batch job, used to resume it.
+
+    Each finished prompt appends one JSON line (index, prompt digest,
+    status, output path, content hash) and flushes it, so a crash loses at
+    most the line being written; a torn last line is cut on the next run.
+    Every shard writes its own ``manifest-<start>-<end>.jsonl`` but reads
+    all of them, so machines can share an output directory and a job can
+    be re-sharded between runs. A prompt counts as done only if its
+    recorded output still exists and the prompt at that index, with its
+    parameters, is unchanged.
+    """
+
+    def __init__(
+        self, directory: Union[str, Path], start: int = 0, end: Optional[int] = None
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = (
+            self.directory
+            / f"{MANIFEST_PREFIX}{start}-{'end' if end is None else end}{MANIFEST_SUFFIX}"
+        )
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self._own: Dict[int, Dict[str, Any]] = {}
+        self._file = None
+        if self.path.exists():
+            self._truncate_torn_tail(self.path)
+        for path in sorted(self.directory.glob(f"{MANIFEST_PREFIX}*{MANIFEST_SUFFIX}")):
+            self._load(path)
+
+    def __enter__(self) -> "JobManifest":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def _truncate_torn_tail(path: Path) -> None:
+        with open(path, "rb+") as f:
+            data = f.read()
+            size = data.rfind(b"\n") + 1
+            if size != len(data):
+                f.truncate(size)
+
+    def _load(self, path: Path) -> None:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    index = entry["index"]
+                except (ValueError, KeyError):
+                    continue  # torn line from a crashed shard that is still running
+                if path == self.path:
+                    self._own[index] = entry
+                # A success recorded by any shard wins over a failure recorded by another
+                current = self.entries.get(index)
+                if (
+                    current is None
+                    or entry["status"] == "done"
+                    or current["status"] != "done"
+                ):
+                    self.entries[index] = entry
+
+    def is_done(
+        self, index: int, prompt: str, overrides: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        entry = self.entries.get(index)
+        return (
+            entry is not None
+            and entry["status"] == "done"
+            and entry["prompt"] == prompt_digest(prompt, overrides)
+            and (self.directory / entry["path"]).exists()
+        )
+
+    def record(self, result: BatchResult) -> None:
+        entry = {
+            "index": result.index,
+            "prompt": prompt_digest(result.prompt, result.overrides),
+            "status": "done" if result.ok else "failed",
+            "path": self._relative(result.path),
+            "sha256": result.sha256,
+            "size": result.size,
+            "error": result.error,
+        }
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self.entries[result.index] = self._own[result.index] = entry
+
+    def _relative(self, path: Optional[str]) -> Optional[str]:
+        """Store outputs relative to the manifest so shards can mount the directory anywhere."""
+        if path is None:
+            return None
+        resolved = Path(path).resolve()
+        try:
+            return str(resolved.relative_to(self.directory.resolve()))
+        except ValueError:
+            return str(resolved)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"done": 0, "failed": 0}
+        for entry in self.entries.values():
+            counts[entry["status"]] += 1
+        return counts
+
+    def close(self) -> None:
+        """Sync the journal, then rewrite it with one line per prompt."""
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for index in sorted(self._own):
+                f.write(json.dumps(self._own[index], separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
@@ -1,12 +1,18 @@
 import os
-import requests
+import base64
+import hashlib
 from pathlib import Path
 from urllib.parse import urlparse
-from typing import Union, Optional
-import matplotlib.pyplot as plt
+from typing import TYPE_CHECKING, Union, Optional, Tuple
 from .config_loader import ConfigLoader
 from .exceptions import SecurityError
 
+# requests, aiohttp and matplotlib are imported by the functions that need
+# them, so CLI startup does not pay for them
+if TYPE_CHECKING:
+    import aiohttp
+
+
 def sanitize_path(user_path: Union[str, Path]) -> Path:
     """Sanitize and validate file paths"""
     config = ConfigLoader().config
@@ -17,7 +23,9 @@ def sanitize_path(user_path: Union[str, Path]) -> Path:
     try:
         safe_path.relative_to(output_dir)
     except ValueError:
-        raise SecurityError(f"Path {safe_path} is outside allowed directory {output_dir}")
+        raise SecurityError(
+            f"Path {safe_path} is outside allowed directory {output_dir}"
+        )
 
     # Validate file extension
     if safe_path.suffix.lower() not in config["allowed_extensions"]:
@@ -25,18 +33,127 @@ def sanitize_path(user_path: Union[str, Path]) -> Path:
 
     return safe_path
 
+
 def save_image(image_url: str, file_path: Union[str, Path]) -> None:
+    import requests
+
     sanitized_path = sanitize_path(file_path)
     sanitized_path.parent.mkdir(parents=True, exist_ok=True)
 
     response = requests.get(image_url)
     response.raise_for_status()
 
-    with open(sanitized_path, 'wb') as f:
+    with open(sanitized_path, "wb") as f:
         f.write(response.content)
 
+
+class _ImageWriter:
+    """Write an image to a ``.part`` file, hashing as it goes; ``commit`` renames it into place.
+
+    An interrupted write never leaves a truncated image at the final path.
+    """
+
+    def __init__(self, file_path: Union[str, Path]):
+        self.path = sanitize_path(file_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.part_path = self.path.with_name(self.path.name + ".part")
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self._file = None
+
+    def __enter__(self) -> "_ImageWriter":
+        self._file = open(self.part_path, "wb")
+        return self
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.part_path, self.path)
+        else:
+            self.part_path.unlink(missing_ok=True)
+
+    def result(self) -> Tuple[int, str]:
+        return self.size, self.digest.hexdigest()
+
+
+async def download_image(
+    session: "aiohttp.ClientSession",
+    image_url: str,
+    file_path: Union[str, Path],
+    chunk_size: int = 64 * 1024,
+) -> Tuple[int, str]:
+    """Stream an image to disk chunk by chunk; returns its size and SHA-256."""
+    with _ImageWriter(file_path) as writer:
+        async with session.get(image_url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(chunk_size):
+                writer.write(chunk)
+    return writer.result()
+
+
+def save_b64_image(
+    data: str, file_path: Union[str, Path], chunk_size: int = 64 * 1024
+) -> Tuple[int, str]:
+    """Decode a base64 image to disk slice by slice, without a full decoded copy in memory."""
+    step = chunk_size // 3 * 4  # whole base64 quanta
+    with _ImageWriter(file_path) as writer:
+        for offset in range(0, len(data), step):
+            writer.write(base64.b64decode(data[offset : offset + step]))
+    return writer.result()
+
+
+_B64_KEY = b'"b64_json"'
+
+
+async def stream_b64_image(
+    content: "aiohttp.StreamReader",
+    file_path: Union[str, Path],
+    chunk_size: int = 64 * 1024,
+) -> Tuple[int, str]:
+    """Decode the ``b64_json`` field of an images API response to disk while it downloads.
+
+    Scans the raw JSON body for the field and decodes its value in whole
+    base64 quanta as chunks arrive, so neither the body nor the image is
+    ever held in memory in full. Returns the image size and SHA-256.
+    """
+    with _ImageWriter(file_path) as writer:
+        head = b""  # bytes before the value starts
+        encoded = b""  # base64 not yet decoded (less than one quantum)
+        in_value = finished = False
+        async for chunk in content.iter_chunked(chunk_size):
+            if not in_value:
+                head += chunk
+                key = head.find(_B64_KEY)
+                start = head.find(b'"', key + len(_B64_KEY)) if key >= 0 else -1
+                if start < 0:
+                    head = head[key:] if key >= 0 else head[-len(_B64_KEY) :]
+                    continue
+                in_value = True
+                chunk = head[start + 1 :]
+            end = chunk.find(b'"')
+            # Base64 never contains a backslash; JSON may escape "/" as "\/"
+            encoded += (chunk if end < 0 else chunk[:end]).replace(b"\\", b"")
+            usable = len(encoded) // 4 * 4
+            writer.write(base64.b64decode(encoded[:usable]))
+            encoded = encoded[usable:]
+            if end >= 0:
+                finished = True
+                break
+        if not finished or encoded:
+            raise ValueError("Response did not contain a complete b64_json image")
+        await content.read()  # drain the rest so the connection can be reused
+    return writer.result()
+
+
 def display_image(image_path: Union[str, Path]) -> None:
+    import matplotlib.pyplot as plt
+
     img = plt.imread(image_path)
     plt.imshow(img)
-    plt.axis('off')
+    plt.axis("off")
     plt.show()
@@ -0,0 +1,242 @@
+import asyncio
+import base64
+import math
+import random
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.async_generator import AsyncImageGenerator, PromptSpec
+from src.concurrency import AdaptiveLimiter, parse_retry_after
+
+CONFIG = Path(__file__).resolve().parent.parent / "config" / "config.yaml"
+IMAGE = bytes(range(256)) * 16
+
+
+class FakeImagesAPI:
+    """Local stand-in for the images endpoint.
+
+    A prompt may carry instructions: ``sleep:<seconds>`` delays the answer
+    and ``bad`` gets a 400. The first ``throttle`` requests get a 429.
+    """
+
+    def __init__(self, delay=0.02, throttle=0, retry_after="1"):
+        self.delay = delay
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request):
+        self.requests += 1
+        prompt = (await request.json())["prompt"]
+        if self.requests <= self.throttle:
+            return web.json_response(
+                {"error": {"message": "Rate limit reached"}},
+                status=429,
+                headers={"Retry-After": self.retry_after},
+            )
+        if prompt == "bad":
+            return web.json_response(
+                {"error": {"message": "Invalid prompt"}}, status=400
+            )
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = (
+                float(prompt.split(":")[1])
+                if prompt.startswith("sleep:")
+                else self.delay
+            )
+            await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+        if (await request.json()).get("response_format") == "b64_json":
+            return web.json_response(
+                {"data": [{"b64_json": base64.b64encode(IMAGE).decode()}]}
+            )
+        return web.json_response(
+            {"data": [{"url": f"http://images.test/{prompt}.png"}]}
+        )
+
+
+@pytest_asyncio.fixture
+async def fake_api():
+    api = FakeImagesAPI()
+    app = web.Application()
+    app.router.add_post("/v1/images/generations", api.handle)
+    server = TestServer(app)
+    await server.start_server()
+    api.url = str(server.make_url("/v1/images/generations"))
+    yield api
+    await server.close()
+
+
+def make_generator(api, **config):
+    generator = AsyncImageGenerator("test-key", base_url=api.url)
+    generator.config.update({"retry_delay": 0.01, "latency_tolerance": None, **config})
+    return generator
+
+
+@pytest.mark.asyncio
+async def test_batch_never_exceeds_the_concurrency_limit(fake_api):
+    generator = make_generator(fake_api, concurrency=4, max_concurrency=4)
+    results = await generator.generate_batch([f"prompt {i}" for i in range(40)])
+    assert [r.index for r in results] == list(range(40))
+    assert all(r.ok for r in results)
+    assert fake_api.max_in_flight == 4
+
+
+@pytest.mark.asyncio
+async def test_results_are_yielded_as_they_complete(fake_api):
+    generator = make_generator(fake_api, concurrency=3)
+    prompts = ["sleep:0.3", "sleep:0.2", "sleep:0.01"]
+    order = [r.index async for r in generator.iter_batch(prompts)]
+    assert order == [2, 1, 0]
+
+
+@pytest.mark.asyncio
+async def test_one_bad_prompt_does_not_fail_the_batch(fake_api):
+    generator = make_generator(fake_api)
+    results = await generator.generate_batch(["a castle", "bad", "a lake"])
+    assert [r.ok for r in results] == [True, False, True]
+    assert "400" in results[1].error
+    assert fake_api.requests == 3  # a 400 is not retried
+
+
+@pytest.mark.asyncio
+async def test_429_backs_off_and_honours_retry_after(fake_api):
+    fake_api.throttle = 4
+    generator = make_generator(fake_api, concurrency=8, max_retries=3)
+    limiter = generator.make_limiter()
+    start = time.monotonic()
+    results = [
+        r async for r in generator.iter_batch([f"p{i}" for i in range(4)], limiter)
+    ]
+    assert all(r.ok for r in results)
+    assert time.monotonic() - start >= 1.0
+    assert limiter.throttled == 4
+    assert limiter.current == 4  # the round of 429s halved the limit once
+
+
+def test_limiter_increases_additively_and_halves_on_throttle():
+    now = [0.0]
+    limiter = AdaptiveLimiter(
+        initial=4, max_limit=10, latency_tolerance=None, clock=lambda: now[0]
+    )
+    for _ in range(4):
+        limiter.on_success(0.0, 1.0)
+    assert limiter.current == 4 and limiter.limit > 4.9
+
+    now[0] = 1.0
+    limiter.on_throttle(started=0.5)
+    assert limiter.current == 2
+    limiter.on_throttle(
+        started=0.9
+    )  # started before the decrease: same congestion event
+    assert limiter.current == 2
+    now[0] = 2.0
+    limiter.on_throttle(started=1.5)
+    assert limiter.current == 1
+
+
+def test_limiter_backs_off_when_latency_grows():
+    limiter = AdaptiveLimiter(initial=8, latency_tolerance=2.0, clock=lambda: 10.0)
+    limiter.on_success(0.0, 1.0)
+    for _ in range(10):
+        limiter.on_success(0.0, 5.0)
+    assert limiter.current == 4
+
+
+def test_limiter_tolerates_latency_jitter():
+    rng = random.Random(0)
+    limiter = AdaptiveLimiter(initial=8, latency_tolerance=2.0, clock=lambda: 10.0)
+    for _ in range(1000):
+        limiter.on_success(10.0, rng.lognormvariate(math.log(0.05), 0.5))
+    assert (
+        limiter.current >= 32
+    )  # at most one stray backoff on a noisy but unloaded backend
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    now = datetime(2025, 1, 22, 12, 0, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("Wed, 22 Jan 2025 12:00:30 GMT", now) == 30.0
+
+
+@pytest.mark.asyncio
+async def test_requests_route_around_a_failing_endpoint(fake_api):
+    broken_calls = 0
+
+    async def broken(request):
+        nonlocal broken_calls
+        broken_calls += 1
+        return web.json_response({"error": {"message": "Internal error"}}, status=500)
+
+    app = web.Application()
+    app.router.add_post("/v1/images/generations", broken)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        generator = AsyncImageGenerator(
+            "test-key",
+            base_url=str(server.make_url("/v1/images/generations")),
+            endpoints=[fake_api.url],
+        )
+        generator.config.update({"retry_delay": 0.01, "latency_tolerance": None})
+        results = await generator.generate_batch([f"prompt {i}" for i in range(20)])
+    finally:
+        await server.close()
+    assert all(r.ok for r in results)
+    assert fake_api.requests == 20
+    # Routing is randomized, so how often the broken endpoint is picked
+    # varies; every pick must count against it and enough of them open it
+    state = generator.router.states[0]
+    assert state.failures == broken_calls
+    assert state.circuit == ("open" if broken_calls >= 5 else "closed")
+
+
+@pytest.mark.asyncio
+async def test_inline_images_route_across_endpoints(fake_api, tmp_path, monkeypatch):
+    (tmp_path / "config").mkdir()
+    shutil.copy(CONFIG, tmp_path / "config" / "config.yaml")
+    monkeypatch.chdir(tmp_path)
+    second = FakeImagesAPI()
+    app = web.Application()
+    app.router.add_post("/v1/images/generations", second.handle)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        generator = AsyncImageGenerator(
+            "test-key",
+            base_url=fake_api.url,
+            endpoints=[str(server.make_url("/v1/images/generations"))],
+        )
+        generator.config.update(
+            {
+                "retry_delay": 0.01,
+                "latency_tolerance": None,
+                "response_format": "b64_json",
+            }
+        )
+        specs = [PromptSpec(i, f"prompt {i}") for i in range(20)]
+        results = [r async for r in generator.iter_specs(specs, output_dir="outputs")]
+    finally:
+        await server.close()
+    assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+    for result in results:
+        assert Path(result.path).name == f"output_{result.index}.png"
+        assert Path(result.path).read_bytes() == IMAGE
+    assert sorted(p.name for p in Path("outputs").iterdir()) == sorted(
+        f"output_{i}.png" for i in range(20)
+    )
+    assert all(s["circuit"] == "closed" for s in generator.router.snapshot())
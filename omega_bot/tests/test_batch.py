@@ -0,0 +1,264 @@
+import asyncio
+import base64
+import hashlib
+import json
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.async_generator import AsyncImageGenerator
+from src.batch import run_batch
+from src.batch_input import read_prompts
+from src.manifest import JobManifest
+from src.utils import save_b64_image, stream_b64_image
+
+CONFIG = Path(__file__).resolve().parent.parent / "config" / "config.yaml"
+IMAGE = bytes(range(256)) * 1024  # 256 KiB
+
+
+class FakeImageService:
+    """Images endpoint plus the host its URLs point at."""
+
+    def __init__(self, generate_delay=0.05, download_delay=0.05):
+        self.generate_delay = generate_delay
+        self.download_delay = download_delay
+        self.generated = []
+        self.params = []
+        self.downloads_started = []
+
+    async def generate(self, request):
+        params = await request.json()
+        self.params.append(params)
+        prompt = params["prompt"]
+        await asyncio.sleep(self.generate_delay)
+        self.generated.append(time.monotonic())
+        if params.get("response_format") == "b64_json":
+            # Escape "/" the way some JSON encoders do
+            payload = base64.b64encode(IMAGE).decode().replace("/", "\\/")
+            body = f'{{"created": 1, "data": [{{"b64_json": "{payload}", "revised_prompt": "{prompt}"}}]}}'
+            return web.Response(text=body, content_type="application/json")
+        name = "missing" if prompt == "broken link" else prompt.replace(" ", "-")
+        return web.json_response(
+            {"data": [{"url": str(request.url.with_path(f"/images/{name}.png"))}]}
+        )
+
+    async def image(self, request):
+        self.downloads_started.append(time.monotonic())
+        if request.match_info["name"] == "missing":
+            raise web.HTTPNotFound()
+        response = web.StreamResponse()
+        response.content_length = len(IMAGE)
+        await response.prepare(request)
+        for offset in range(0, len(IMAGE), 64 * 1024):
+            await asyncio.sleep(self.download_delay / 4)
+            await response.write(IMAGE[offset : offset + 64 * 1024])
+        return response
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / "config").mkdir()
+    shutil.copy(CONFIG, tmp_path / "config" / "config.yaml")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest_asyncio.fixture
+async def service():
+    fake = FakeImageService()
+    app = web.Application()
+    app.router.add_post("/v1/images/generations", fake.generate)
+    app.router.add_get("/images/{name}.png", fake.image)
+    server = TestServer(app)
+    await server.start_server()
+    fake.url = str(server.make_url("/v1/images/generations"))
+    yield fake
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_images_to_disk(workdir, service):
+    generator = AsyncImageGenerator("test-key", base_url=service.url)
+    generator.config.update(
+        {"concurrency": 4, "max_concurrency": 4, "latency_tolerance": None}
+    )
+    seen = []
+    stats = await run_batch(
+        generator,
+        [f"prompt {i}" for i in range(12)],
+        "outputs",
+        on_result=lambda result, stats: seen.append(stats.completed),
+    )
+
+    assert stats.saved == 12 and stats.failed == 0
+    assert stats.bytes == 12 * len(IMAGE)
+    assert seen == list(range(1, 13))
+    for i in range(12):
+        assert (workdir / "outputs" / f"output_{i}.png").read_bytes() == IMAGE
+    assert not list((workdir / "outputs").glob("*.part"))
+    # Downloading overlapped with generation instead of waiting for every URL
+    assert service.downloads_started[0] < service.generated[-1]
+
+
+@pytest.mark.asyncio
+async def test_failed_download_is_reported_per_item(workdir, service):
+    generator = AsyncImageGenerator("test-key", base_url=service.url)
+    failures = []
+    stats = await run_batch(
+        generator,
+        ["a castle", "broken link"],
+        "outputs",
+        on_result=lambda result, stats: failures.extend(
+            [result] if not result.ok else []
+        ),
+    )
+
+    assert stats.saved == 1 and stats.failed == 1
+    assert failures[0].prompt == "broken link"
+    assert "404" in failures[0].error
+    assert not (workdir / "outputs" / "output_1.png").exists()
+    assert not (workdir / "outputs" / "output_1.png.part").exists()
+
+
+@pytest.mark.asyncio
+async def test_rerun_skips_done_prompts_and_retries_failures(workdir, service):
+    generator = AsyncImageGenerator("test-key", base_url=service.url)
+    prompts = ["a castle", "broken link", "a lake"]
+    with JobManifest("outputs") as manifest:
+        first = await run_batch(generator, prompts, "outputs", manifest=manifest)
+    assert (first.saved, first.failed) == (2, 1)
+
+    prompts[1] = "a forest"  # the failing prompt was fixed in the input file
+    service.generated.clear()
+    with JobManifest("outputs") as manifest:
+        second = await run_batch(generator, prompts, "outputs", manifest=manifest)
+        assert manifest.counts() == {"done": 3, "failed": 0}
+    assert (second.saved, second.failed, second.skipped) == (1, 0, 2)
+    assert len(service.generated) == 1
+
+
+@pytest.mark.asyncio
+async def test_shards_cover_disjoint_index_ranges(workdir, service):
+    generator = AsyncImageGenerator("test-key", base_url=service.url)
+    prompts = [f"prompt {i}" for i in range(6)]
+    for start, end in ((0, 4), (4, None)):
+        with JobManifest("outputs", start, end) as manifest:
+            await run_batch(
+                generator, prompts, "outputs", manifest=manifest, start=start, end=end
+            )
+
+    assert sorted(p.name for p in (workdir / "outputs").glob("manifest-*")) == [
+        "manifest-0-4.jsonl",
+        "manifest-4-end.jsonl",
+    ]
+    assert len(service.generated) == 6
+    merged = JobManifest("outputs")
+    assert all(merged.is_done(i, prompt) for i, prompt in enumerate(prompts))
+
+
+@pytest.mark.asyncio
+async def test_jsonl_overrides_reach_the_api_and_the_file_name(workdir, service):
+    path = workdir / "prompts.jsonl"
+    path.write_text(
+        "\n".join(
+            [
+                '{"prompt": "a castle"}',
+                '{"prompt": "a lake", "model": "dall-e-2", "size": "512x512", "seed": 7, "output": "lake"}',
+            ]
+        )
+    )
+    generator = AsyncImageGenerator("test-key", base_url=service.url)
+    with JobManifest("outputs") as manifest:
+        stats = await run_batch(
+            generator, read_prompts(path), "outputs", manifest=manifest, group_window=8
+        )
+        assert manifest.is_done(
+            1,
+            "a lake",
+            {"model": "dall-e-2", "size": "512x512", "seed": 7, "output": "lake"},
+        )
+        assert not manifest.is_done(1, "a lake")
+
+    assert stats.saved == 2
+    by_prompt = {params["prompt"]: params for params in service.params}
+    assert by_prompt["a castle"]["model"] == generator.config["model"]
+    assert "seed" not in by_prompt["a castle"]
+    assert (
+        by_prompt["a lake"]["model"],
+        by_prompt["a lake"]["size"],
+        by_prompt["a lake"]["seed"],
+    ) == ("dall-e-2", "512x512", 7)
+    assert (workdir / "outputs" / "output_0.png").exists()
+    assert (workdir / "outputs" / "lake.png").exists()
+
+
+@pytest.mark.asyncio
+async def test_inline_images_skip_the_download(workdir, service):
+    generator = AsyncImageGenerator("test-key", base_url=service.url)
+    generator.config["response_format"] = "b64_json"
+    with JobManifest("outputs") as manifest:
+        stats = await run_batch(
+            generator, ["a castle", "a lake"], "outputs", manifest=manifest
+        )
+
+    assert stats.saved == 2 and stats.bytes == 2 * len(IMAGE)
+    assert service.downloads_started == []
+    assert all(params["response_format"] == "b64_json" for params in service.params)
+    assert (workdir / "outputs" / "output_1.png").read_bytes() == IMAGE
+    entry = manifest.entries[1]
+    assert entry["sha256"] == hashlib.sha256(IMAGE).hexdigest()
+
+
+class ChunkedContent:
+    """Minimal StreamReader stand-in that hands out fixed-size chunks."""
+
+    def __init__(self, body, size):
+        self.chunks = [body[i : i + size] for i in range(0, len(body), size)]
+
+    async def iter_chunked(self, size):
+        while self.chunks:
+            yield self.chunks.pop(0)
+
+    async def read(self):
+        rest, self.chunks = b"".join(self.chunks), []
+        return rest
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk", [1, 3, 7, 4096])
+async def test_stream_decoding_handles_any_chunk_boundary(workdir, chunk):
+    image = bytes(range(256)) * 3 + b"\xff\xfe"
+    payload = base64.b64encode(image).decode().replace("/", "\\/")
+    body = (
+        json.dumps({"created": 1}).encode()[:-1]
+        + b', "data": [{"b64_json": "'
+        + payload.encode()
+        + b'"}]}'
+    )
+    size, sha256 = await stream_b64_image(
+        ChunkedContent(body, chunk), "outputs/streamed.png"
+    )
+    assert (workdir / "outputs" / "streamed.png").read_bytes() == image
+    assert (size, sha256) == (len(image), hashlib.sha256(image).hexdigest())
+
+
+@pytest.mark.asyncio
+async def test_stream_decoding_rejects_a_response_without_an_image(workdir):
+    with pytest.raises(ValueError):
+        await stream_b64_image(
+            ChunkedContent(b'{"data": [{"url": "x"}]}', 5), "outputs/none.png"
+        )
+    assert not list((workdir / "outputs").iterdir())
+
+
+def test_save_b64_image_decodes_in_slices(workdir):
+    size, _ = save_b64_image(
+        base64.b64encode(IMAGE).decode(), "outputs/saved.png", chunk_size=1000
+    )
+    assert size == len(IMAGE)
+    assert (workdir / "outputs" / "saved.png").read_bytes() == IMAGE
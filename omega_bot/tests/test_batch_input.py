@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from src.async_generator import PromptSpec
+from src.batch_input import group_by_params, read_prompts
+from src.exceptions import BatchInputError
+
+
+def test_text_lines_become_numbered_prompts(tmp_path):
+    path = tmp_path / "prompts.txt"
+    path.write_text("a castle\n\n  a lake  \n")
+    assert list(read_prompts(path)) == [
+        PromptSpec(0, "a castle"),
+        PromptSpec(1, "a lake"),
+    ]
+
+
+def test_jsonl_lines_carry_overrides(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text(
+        "\n".join(
+            [
+                json.dumps({"prompt": "a castle"}),
+                json.dumps(
+                    {
+                        "prompt": "a lake",
+                        "model": "dall-e-2",
+                        "size": "512x512",
+                        "seed": 7,
+                        "output": "lake",
+                    }
+                ),
+            ]
+        )
+    )
+    first, second = read_prompts(path)
+    assert first.overrides == {}
+    assert second.overrides == {
+        "model": "dall-e-2",
+        "size": "512x512",
+        "seed": 7,
+        "output": "lake",
+    }
+    assert second.index == 1
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ('{"prompt": "a lake", "steps": 30}', "unknown fields"),
+        ('{"prompt": "a lake", "seed": "7"}', "seed must be an integer"),
+        ('{"model": "dall-e-2"}', "missing prompt"),
+        ('["a lake"]', "expected a JSON object"),
+        ('{"prompt": "a lake"', "invalid JSON"),
+    ],
+)
+def test_bad_jsonl_lines_name_the_line(tmp_path, line, message):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text(f'{{"prompt": "a castle"}}\n{line}\n')
+    specs = read_prompts(path)
+    assert (
+        next(specs).prompt == "a castle"
+    )  # nothing past the first line has been parsed yet
+    with pytest.raises(BatchInputError, match=f"prompts.jsonl:2: {message}"):
+        next(specs)
+
+
+def test_grouping_is_bounded_by_the_window():
+    specs = [PromptSpec(i, f"p{i}", model="a" if i % 2 else "b") for i in range(6)]
+    grouped = list(group_by_params(specs, window=4))
+    assert [s.index for s in grouped] == [0, 2, 1, 3, 5, 4]
+    assert sorted(s.index for s in grouped) == list(range(6))
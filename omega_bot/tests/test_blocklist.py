@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+from omega_bot.security.blocklist import Blocklist
+from omega_bot.security.input_validation import InputValidator, PromptValidationRules
+from omega_bot.utils.error_handler import SecurityError
+
+
+def test_overlapping_terms_follow_failure_links():
+    blocklist = Blocklist(["he", "she", "his", "hers"])
+    matches = blocklist.find_all("ushers")
+    assert sorted(matches) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_find_returns_the_original_term():
+    blocklist = Blocklist(["Exploit", "nsfw"])
+    assert blocklist.find("an EXPLOIT kit") == "Exploit"
+    assert blocklist.find("a quiet lake") is None
+
+
+def test_matching_is_unicode_normalized():
+    blocklist = Blocklist(["hack", "straße"])
+    assert blocklist.find("ｈａｃｋ the planet") == "hack"
+    assert blocklist.find("STRASSE at night") == "straße"
+
+
+def test_word_boundaries():
+    loose = Blocklist(["hack"])
+    strict = Blocklist(["hack"], word_boundaries=True)
+    assert loose.find("a shackle") == "hack"
+    assert strict.find("a shackle") is None
+    assert strict.find("hack, then rest") == "hack"
+    assert strict.find("life_hack") is None
+
+
+def test_validator_rejects_blocked_prompt():
+    validator = InputValidator()
+    with pytest.raises(SecurityError, match="forbidden word: hack"):
+        validator.validate_prompt("how to HACK a castle")
+    assert validator.validate_prompt(" a castle at dawn ") == "a castle at dawn"
+
+
+def test_validator_reloads_changed_file(tmp_path):
+    path = tmp_path / "blocklist.txt"
+    path.write_text("# terms\ndragon\n", encoding="utf-8")
+    validator = InputValidator(
+        PromptValidationRules(
+            forbidden_words=frozenset(), blocklist_path=str(path), reload_interval=0
+        )
+    )
+    with pytest.raises(SecurityError):
+        validator.validate_prompt("a red dragon")
+    assert validator.validate_prompt("a red castle") == "a red castle"
+
+    path.write_text("castle\n", encoding="utf-8")
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+    validator.validate_prompt(
+        "a red lake"
+    )  # notices the change and rebuilds in the background
+    deadline = time.monotonic() + 5
+    while validator.blocklist.find("castle") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert validator.validate_prompt("a red dragon") == "a red dragon"
+    with pytest.raises(SecurityError):
+        validator.validate_prompt("a red castle")
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+pytest.importorskip("telegram")
+pytest.importorskip("diffusers")
+
+from omega_bot.core.bot import OmegaBot  # noqa: E402
+from omega_bot.core.image_cache import TieredCacheConfig, TieredImageCache  # noqa: E402
+from omega_bot.utils.monitoring import MetricsCollector  # noqa: E402
+
+
+class FakeRateLimiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self.seen = {}
+
+    def can_process(self, user_id):
+        self.seen[user_id] = self.seen.get(user_id, 0) + 1
+        return self.seen[user_id] <= self.limit
+
+
+class FakeBackend:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.calls = 0
+
+    async def generate(self, prompt, **params):
+        self.calls += 1
+        path = self.output_dir / f"generated_{self.calls}.png"
+        path.write_bytes(b"png-bytes")
+        return str(path)
+
+
+@pytest.fixture
+def bot(tmp_path):
+    # Only what the /generate handler touches, without the Telegram token,
+    # the model store or a real pipeline
+    bot = OmegaBot.__new__(OmegaBot)
+    bot.generator = SimpleNamespace(default_model="sd")
+    bot.backend = FakeBackend(tmp_path)
+    bot.rate_limiter = FakeRateLimiter(limit=5)
+    bot.image_cache = TieredImageCache(
+        TieredCacheConfig(cache_dir=str(tmp_path / "cache"))
+    )
+    bot.prompt_index = None
+    bot.metrics = MetricsCollector(
+        metrics_dir=str(tmp_path / "metrics"), enable_prometheus=False
+    )
+    yield bot
+    bot.image_cache.close()
+
+
+def _update(user_id):
+    message = SimpleNamespace(
+        reply_text=AsyncMock(return_value=SimpleNamespace(delete=AsyncMock())),
+        reply_photo=AsyncMock(),
+    )
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), message=message)
+
+
+@pytest.mark.asyncio
+async def test_generate_feeds_heavy_hitters_and_generation_stats(bot):
+    for user_id, prompt in [
+        (1, "red car"),
+        (1, "red car"),
+        (2, "red car"),
+        (2, "blue boat"),
+    ]:
+        await bot.generate_image(_update(user_id), SimpleNamespace(args=prompt.split()))
+    for _ in range(7):
+        await bot.generate_image(_update(3), SimpleNamespace(args=["green", "tree"]))
+
+    hitters = bot.metrics.get_heavy_hitters()
+    assert hitters["users"][0]["key"] == "3"
+    assert hitters["prompts"][0]["key"] == "green tree"
+    # Cached repeats count towards the top prompts too
+    assert {"key": "red car", "count": 3, "error": 0} in hitters["prompts"]
+    assert hitters["rate_limited_users"][0]["key"] == "3"
+    assert hitters["failing_users"][0]["key"] == "3"
+
+    stats = bot.metrics.metrics
+    assert stats["cache"] == {"hits": 2 + 4, "misses": 3}
+    assert stats["model_usage"]["sd"]["success"] == bot.backend.calls == 3
+    assert "sd" in bot.metrics.get_latency_quantiles()["generation"]
@@ -0,0 +1,106 @@
+import pytest
+
+from omega_bot.core.cache import CacheConfig, LRUCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(**kwargs):
+    clock = _Clock()
+    return LRUCache(CacheConfig(**kwargs), clock=clock), clock
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache, _ = _cache(max_bytes=30)
+    cache.set_nowait("a", b"x" * 10)
+    cache.set_nowait("b", b"x" * 10)
+    cache.set_nowait("c", b"x" * 10)
+    cache.get_nowait("a")
+    cache.set_nowait("d", b"x" * 10)
+    assert "b" not in cache
+    assert all(k in cache for k in ("a", "c", "d"))
+    assert cache.size_bytes == 30
+
+
+def test_oversized_value_is_rejected():
+    cache, _ = _cache(max_bytes=10)
+    assert cache.set_nowait("a", b"x" * 11) is False
+    assert len(cache) == 0
+
+
+def test_overwrite_updates_size():
+    cache, _ = _cache(max_bytes=100)
+    cache.set_nowait("a", b"x" * 40)
+    cache.set_nowait("a", b"x" * 10)
+    assert cache.size_bytes == 10
+    assert len(cache) == 1
+
+
+def test_entries_expire_via_heap():
+    cache, clock = _cache(ttl=10)
+    cache.set_nowait("a", b"1")
+    cache.set_nowait("b", b"2", ttl=100)
+    clock.now = 11
+    assert cache.cleanup_nowait() == 1
+    assert cache.get_nowait("a") is None
+    assert cache.get_nowait("b") == b"2"
+    assert cache.stats["expirations"] == 1
+
+
+def test_on_expire_reports_expired_keys():
+    expired = []
+    cache = LRUCache(CacheConfig(ttl=10), clock=_Clock(), on_expire=expired.append)
+    cache.set_nowait("a", b"1")
+    cache.set_nowait("b", b"2", ttl=100)
+    cache._clock.now = 11
+    cache.cleanup_nowait()
+    cache._clock.now = 101
+    assert cache.get_nowait("b") is None
+    assert expired == ["a", "b"]
+
+
+def test_lfu_keeps_frequently_used_keys():
+    cache, _ = _cache(max_bytes=20, policy="lfu")
+    cache.set_nowait("hot", b"x" * 10)
+    for _ in range(3):
+        cache.get_nowait("hot")
+    cache.set_nowait("cold", b"x" * 10)
+    cache.set_nowait("new", b"x" * 10)
+    assert "hot" in cache
+    assert "cold" not in cache
+
+
+def test_slru_scan_does_not_flush_protected_keys():
+    cache, _ = _cache(max_bytes=50, policy="slru")
+    cache.set_nowait("popular", b"x" * 10)
+    cache.get_nowait("popular")
+    for i in range(20):
+        cache.set_nowait(f"scan-{i}", b"x" * 10)
+    assert "popular" in cache
+
+
+def test_max_entries():
+    cache, _ = _cache(max_entries=2)
+    for key in "abc":
+        cache.set_nowait(key, 1)
+    assert len(cache) == 2
+    assert "a" not in cache
+
+
+@pytest.mark.asyncio
+async def test_async_api_does_not_deadlock_on_expiry():
+    cache, clock = _cache(ttl=1)
+    await cache.set("a", b"1")
+    clock.now = 2
+    assert await cache.get("a") is None
+    await cache.set("b", b"2")
+    await cache.cleanup()
+    await cache.remove("b")
+    assert len(cache) == 0
+    cache.close()
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("matplotlib", "openai", "aiohttp", "requests", "yaml")
+# Seconds allowed for importing the CLI and rendering --help; override on slow CI machines
+BUDGET = float(os.environ.get("CLI_IMPORT_BUDGET", "0.5"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from src.main import cli
+try:
+    cli(["--help"], standalone_mode=False)
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+
+def probe():
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def test_cli_startup_skips_heavy_imports():
+    assert probe()["loaded"] == []
+
+
+def test_cli_startup_within_budget():
+    # Best of three, so one slow scheduler tick does not fail the build
+    elapsed = min(probe()["elapsed"] for _ in range(3))
+    assert elapsed < BUDGET, f"CLI startup took {elapsed:.3f}s (budget {BUDGET}s)"
+
+
+def test_config_is_parsed_once(tmp_path, monkeypatch):
+    from src import config_loader
+
+    path = tmp_path / "config.yaml"
+    path.write_text("defaults:\n  model: dall-e-3\n")
+    parses = []
+    original = config_loader.ConfigLoader._parse
+    monkeypatch.setattr(
+        config_loader.ConfigLoader,
+        "_parse",
+        lambda self: parses.append(1) or original(self),
+    )
+
+    first = config_loader.ConfigLoader(str(path)).config
+    first["model"] = "changed by a caller"
+    assert config_loader.ConfigLoader(str(path)).config == {"model": "dall-e-3"}
+    assert len(parses) == 1
+
+    path.write_text("defaults:\n  model: dall-e-2\n")
+    os.utime(path, ns=(0, 10**9))
+    assert config_loader.ConfigLoader(str(path)).config == {"model": "dall-e-2"}
+    assert len(parses) == 2
@@ -0,0 +1,86 @@
+import json
+import socket
+import threading
+import urllib.request
+
+import pytest
+
+from omega_bot.utils.heap import HeapDiagnostics, tensor_memory_by_owner
+from omega_bot.utils.monitoring import MetricsCollector
+
+
+class LeakyThing:
+    def __init__(self):
+        self.payload = bytearray(10_000)
+
+
+@pytest.fixture
+def heap():
+    diagnostics = HeapDiagnostics(frames=5, key_classes=["LeakyThing"])
+    yield diagnostics
+    diagnostics.stop()
+
+
+def test_growth_points_at_the_leaking_line(heap):
+    first = heap.snapshot()
+    assert first["tracing_started"] is True
+    assert "growth_since_previous" not in first
+
+    leaked = [LeakyThing() for _ in range(200)]
+    report = heap.snapshot(limit=5)
+    top = report["growth_since_previous"][0]
+    assert top["site"].endswith("test_heap.py:14")
+    assert top["size_diff"] >= 200 * 10_000
+    assert heap.object_counts() == {"LeakyThing": 200}
+
+    later = heap.snapshot()
+    assert "growth_since_baseline" in later
+    del leaked
+
+
+def test_stop_turns_tracing_off(heap):
+    heap.snapshot()
+    heap.stop()
+    assert not heap.tracing
+    assert heap.snapshot()["tracing_started"] is True
+
+
+def test_tensor_memory_grouped_by_owner():
+    torch = pytest.importorskip("torch")
+    model = torch.nn.Sequential(torch.nn.Linear(64, 64), torch.nn.Linear(64, 64))
+    loose = torch.zeros(1000)
+    owners = tensor_memory_by_owner()
+    assert owners["Sequential"]["cpu"] >= 2 * (64 * 64 + 64) * 4
+    assert owners["unowned"]["cpu"] >= loose.numel() * 4
+    del model
+
+
+def test_heap_endpoint_on_metrics_server(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    collector = MetricsCollector(
+        metrics_dir=str(tmp_path), prometheus_port=port, debug_endpoints=True
+    )
+    url = f"http://127.0.0.1:{port}/debug/heap?limit=3"
+    try:
+        for _ in range(2):
+            with urllib.request.urlopen(url, timeout=30) as response:
+                report = json.loads(response.read())
+        assert report["heap"]["traced_bytes"] > 0
+        assert "growth_since_previous" in report["heap"]
+        assert len(report["heap"]["top_sites"]) == 3
+        assert report["objects"]["MetricsCollector"] >= 1
+    finally:
+        collector.heap.stop()
+
+
+@pytest.mark.asyncio
+async def test_report_async_runs_off_the_event_loop(heap, monkeypatch):
+    threads = []
+    monkeypatch.setattr(
+        heap, "object_counts", lambda: threads.append(threading.get_ident()) or {}
+    )
+    report = await heap.report_async(limit=3)
+    assert threads and threads[0] != threading.get_ident()
+    assert report["heap"]["tracing_started"] is True
@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+
+from omega_bot.core.image_cache import (
+    SegmentStore,
+    TieredCacheConfig,
+    TieredImageCache,
+    cache_key,
+)
+
+
+def _config(tmp_path, **kwargs):
+    return TieredCacheConfig(cache_dir=str(tmp_path / "cache"), **kwargs)
+
+
+def test_disk_hit_is_zero_copy_view(tmp_path):
+    store = SegmentStore(_config(tmp_path))
+    store.put("a", b"png-bytes")
+    view = store.get("a")
+    assert isinstance(view, memoryview)
+    assert view == b"png-bytes"
+
+
+def test_survives_restart_with_and_without_index(tmp_path):
+    config = _config(tmp_path)
+    store = SegmentStore(config)
+    store.put("a", b"first")
+    store.close()
+
+    store = SegmentStore(config)
+    store.put("b", b"second")
+    store.delete("a")
+    # No close: the index is stale and the tail must be replayed
+    reopened = SegmentStore(config)
+    assert reopened.get("a") is None
+    assert reopened.get("b") == b"second"
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    config = _config(tmp_path)
+    store = SegmentStore(config)
+    store.put("a", b"complete")
+    store.put("b", b"x" * 100)
+    store.close()
+    segment = next((tmp_path / "cache").glob("segment-*.dat"))
+    segment.write_bytes(segment.read_bytes()[:-10])
+    (tmp_path / "cache" / "index.bin").unlink()
+
+    reopened = SegmentStore(config)
+    assert reopened.get("a") == b"complete"
+    assert reopened.get("b") is None
+
+
+def test_compaction_reclaims_garbage(tmp_path):
+    store = SegmentStore(_config(tmp_path, segment_bytes=1024, compact_ratio=0.5))
+    for i in range(8):
+        store.put(f"k{i}", bytes([i]) * 100)
+    for i in range(6):
+        store.delete(f"k{i}")
+    before = store.size_bytes
+    while store.compact():
+        pass
+    assert store.size_bytes < before
+    assert store.get("k6") == bytes([6]) * 100
+    assert store.get("k7") == bytes([7]) * 100
+
+
+def test_disk_budget_drops_oldest_segment(tmp_path):
+    store = SegmentStore(_config(tmp_path, segment_bytes=512, disk_bytes=1024))
+    for i in range(10):
+        store.put(f"k{i}", b"x" * 200)
+    assert store.size_bytes <= 1024
+    assert store.get("k0") is None
+    assert store.get("k9") is not None
+
+
+def test_demotion_and_promotion(tmp_path):
+    cache = TieredImageCache(
+        _config(tmp_path, memory_bytes=100, write_through=False, promote_after=2)
+    )
+    cache.set_nowait("a", b"a" * 60)
+    cache.set_nowait("b", b"b" * 60)
+    assert "a" not in cache.memory
+    assert cache.stats["demotions"] == 1
+
+    assert cache.get_nowait("a") == b"a" * 60
+    assert "a" not in cache.memory
+    cache.get_nowait("a")
+    assert "a" in cache.memory
+    assert cache.stats["promotions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_disk_access_runs_on_the_cache_thread(tmp_path):
+    removed = []
+    cache = TieredImageCache(
+        _config(tmp_path, memory_bytes=100, write_through=False, promote_after=2),
+        on_remove=removed.append,
+    )
+    disk_threads = []
+    put, get = cache.disk.put, cache.disk.get
+    cache.disk.put = lambda *args: disk_threads.append(
+        threading.current_thread()
+    ) or put(*args)
+    cache.disk.get = lambda key: disk_threads.append(threading.current_thread()) or get(
+        key
+    )
+
+    await cache.set("a", b"a" * 60)
+    await cache.set("b", b"b" * 60)  # demotes "a" on the cache thread
+    assert "a" in cache.disk
+
+    hit = await cache.get("a")
+    assert type(hit) is bytes and hit == b"a" * 60
+    await cache.get("a")
+    assert "a" in cache.memory
+    assert "b" in cache.disk  # demoted again by the promotion
+    assert await cache.get("missing") is None
+
+    assert disk_threads
+    assert threading.current_thread() not in disk_threads
+    assert all(t.name.startswith("image-cache") for t in disk_threads)
+    assert removed == []
+    cache.close()
+
+
+def test_on_remove_fires_once_neither_tier_holds_the_key(tmp_path):
+    removed = []
+    cache = TieredImageCache(
+        _config(tmp_path, memory_bytes=100, segment_bytes=128, disk_bytes=256),
+        on_remove=removed.append,
+    )
+    cache.set_nowait("a", b"a" * 60)
+    cache.set_nowait("b", b"b" * 60)  # demotes "a" to disk
+    assert removed == []
+    for i in range(4):
+        cache.set_nowait(f"k{i}", b"x" * 60)  # drops the oldest disk segments
+    assert "a" in removed
+    assert "k3" not in removed
+
+    cache.remove_nowait("k3")
+    assert removed[-1] == "k3"
+
+    assert cache_key("cat", "sd") == cache_key("cat", "sd", {})
+    assert cache_key("cat", "sd") != cache_key("cat", "flux")
+    assert cache_key("cat", "sd", {"steps": 20}) != cache_key(
+        "cat", "sd", {"steps": 30}
+    )
@@ -0,0 +1,60 @@
+import json
+
+from src.async_generator import BatchResult
+from src.manifest import JobManifest
+
+
+def done(index, prompt, directory):
+    path = directory / f"output_{index}.png"
+    path.write_bytes(b"png")
+    return BatchResult(
+        index,
+        prompt,
+        url="http://images.test/x.png",
+        path=str(path),
+        size=3,
+        sha256="ab",
+    )
+
+
+def test_records_survive_a_torn_last_line(tmp_path):
+    manifest = JobManifest(tmp_path)
+    manifest.record(done(0, "a castle", tmp_path))
+    manifest.record(BatchResult(1, "a lake", error="500 Internal Server Error"))
+    manifest._file.close()  # crash: no compaction
+    with open(manifest.path, "a") as f:
+        f.write('{"index": 2, "prom')
+
+    reopened = JobManifest(tmp_path)
+    assert reopened.is_done(0, "a castle")
+    assert not reopened.is_done(1, "a lake")
+    assert reopened.counts() == {"done": 1, "failed": 1}
+    reopened.record(done(1, "a lake", tmp_path))
+    reopened.close()
+
+    lines = [json.loads(line) for line in manifest.path.read_text().splitlines()]
+    assert [(e["index"], e["status"], e["path"]) for e in lines] == [
+        (0, "done", "output_0.png"),
+        (1, "done", "output_1.png"),
+    ]
+
+
+def test_changed_prompt_or_missing_output_is_not_done(tmp_path):
+    with JobManifest(tmp_path) as manifest:
+        manifest.record(done(0, "a castle", tmp_path))
+        manifest.record(done(1, "a lake", tmp_path))
+    (tmp_path / "output_1.png").unlink()
+
+    manifest = JobManifest(tmp_path)
+    assert not manifest.is_done(0, "a red castle")
+    assert not manifest.is_done(1, "a lake")
+
+
+def test_success_in_any_shard_wins(tmp_path):
+    with JobManifest(tmp_path, 0, 10) as first:
+        first.record(BatchResult(3, "a lake", error="timeout"))
+    with JobManifest(tmp_path, 0, 5) as second:
+        second.record(done(3, "a lake", tmp_path))
+
+    for start, end in ((0, 10), (5, None)):
+        assert JobManifest(tmp_path, start, end).is_done(3, "a lake")
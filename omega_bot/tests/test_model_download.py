@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from omega_bot.core import models
+from omega_bot.core.config import ModelInfo
+from omega_bot.core.models import ModelDownloader, _FileLock
+from omega_bot.utils.error_handler import ModelError
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 123)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with optional Range support and a one-shot truncation."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        if self.server.honour_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.requests.append(self.headers.get("Range"))
+        start, end = 0, len(PAYLOAD) - 1
+        range_header = self.headers.get("Range")
+        if range_header and self.server.honour_ranges:
+            first, _, last = range_header.split("=", 1)[1].partition("-")
+            start, end = int(first), int(last) if last else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        body = PAYLOAD[start : end + 1]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.server.truncate_at is not None:
+            body, self.server.truncate_at = body[: self.server.truncate_at], None
+            self.wfile.write(body)
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    httpd.honour_ranges = True
+    httpd.truncate_at = None
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def local_model(server, monkeypatch):
+    url = f"http://127.0.0.1:{server.server_address[1]}/model.safetensors"
+    info = ModelInfo(
+        "Local",
+        "local",
+        "served from a test server",
+        url,
+        sha256=hashlib.sha256(PAYLOAD).hexdigest(),
+    )
+    monkeypatch.setitem(models.AVAILABLE_MODELS, "local", info)
+    return info
+
+
+@pytest.mark.asyncio
+async def test_streaming_download_verifies_and_renames(tmp_path, local_model):
+    downloader = ModelDownloader(str(tmp_path), connections=1)
+    path = await downloader.download_model("local")
+    assert path.read_bytes() == PAYLOAD
+    assert not path.with_name("model.safetensors.part").exists()
+
+
+@pytest.mark.asyncio
+async def test_resumes_partial_file_with_range(tmp_path, server, local_model):
+    part = tmp_path / "local" / "model.safetensors.part"
+    part.parent.mkdir(parents=True)
+    part.write_bytes(PAYLOAD[:1000])
+
+    downloader = ModelDownloader(str(tmp_path), connections=1)
+    path = await downloader.download_model("local")
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == ["bytes=1000-"]
+
+
+@pytest.mark.asyncio
+async def test_restarts_when_server_ignores_range(tmp_path, server, local_model):
+    server.honour_ranges = False
+    part = tmp_path / "local" / "model.safetensors.part"
+    part.parent.mkdir(parents=True)
+    part.write_bytes(b"x" * 1000)
+
+    downloader = ModelDownloader(str(tmp_path), connections=1)
+    path = await downloader.download_model("local")
+    assert path.read_bytes() == PAYLOAD
+
+
+@pytest.mark.asyncio
+async def test_interrupted_download_is_resumed_on_retry(tmp_path, server, local_model):
+    server.truncate_at = 1024 * 1024
+    downloader = ModelDownloader(str(tmp_path), connections=1, retries=2)
+    path = await downloader.download_model("local")
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests[-1] == f"bytes={1024 * 1024}-"
+
+
+@pytest.mark.asyncio
+async def test_parallel_ranges(tmp_path, server, local_model):
+    downloader = ModelDownloader(str(tmp_path), connections=3, chunk_size=64 * 1024)
+    path = await downloader.download_model("local")
+    assert path.read_bytes() == PAYLOAD
+    assert len(server.requests) == 3
+    assert not path.with_name("model.safetensors.part.json").exists()
+
+
+def _interrupted_parallel_part(tmp_path, url):
+    """Leave the files of a parallel download cut off after its first 1000 bytes."""
+    part = tmp_path / "local" / "model.safetensors.part"
+    part.parent.mkdir(parents=True)
+    part.write_bytes(
+        PAYLOAD[:1000] + bytes(len(PAYLOAD) - 1000)
+    )  # preallocated, mostly zeros
+    third = len(PAYLOAD) // 3
+    ranges = [
+        {"start": 0, "end": third - 1, "done": 1000},
+        {"start": third, "end": 2 * third - 1, "done": 0},
+        {"start": 2 * third, "end": len(PAYLOAD) - 1, "done": 0},
+    ]
+    state = part.with_name(part.name + ".json")
+    state.write_text(json.dumps({"url": url, "size": len(PAYLOAD), "ranges": ranges}))
+    return part, state
+
+
+@pytest.mark.asyncio
+async def test_single_stream_resumes_from_recorded_ranges(
+    tmp_path, server, local_model, monkeypatch
+):
+    monkeypatch.setattr(
+        local_model, "sha256", None
+    )  # nothing else would catch a zero-filled file
+    _, state = _interrupted_parallel_part(tmp_path, local_model.civitai_url)
+    downloader = ModelDownloader(str(tmp_path), connections=1)
+    path = await downloader.download_model("local")
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == ["bytes=1000-"]
+    assert not state.exists()
+
+
+@pytest.mark.asyncio
+async def test_single_stream_discards_part_with_unusable_ranges(
+    tmp_path, server, local_model, monkeypatch
+):
+    monkeypatch.setattr(local_model, "sha256", None)
+    _, state = _interrupted_parallel_part(tmp_path, local_model.civitai_url)
+    state.write_text("{not json")
+    downloader = ModelDownloader(str(tmp_path), connections=1)
+    path = await downloader.download_model("local")
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == [None]
+
+
+@pytest.mark.asyncio
+async def test_checksum_mismatch_keeps_no_model(tmp_path, local_model):
+    local_model.sha256 = "0" * 64
+    downloader = ModelDownloader(str(tmp_path), connections=1)
+    with pytest.raises(ModelError):
+        await downloader.download_model("local")
+    assert not (tmp_path / "local" / "model.safetensors").exists()
+    assert not (tmp_path / "local" / "model.safetensors.part").exists()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_download(tmp_path, server, local_model):
+    downloader = ModelDownloader(str(tmp_path), connections=1)
+    paths = await asyncio.gather(
+        *(downloader.download_model("local") for _ in range(5))
+    )
+    assert len(set(paths)) == 1
+    assert len(server.requests) == 1
+    stats = downloader.get_download_stats()
+    assert stats["downloads"] == 1
+    assert stats["shared_waits"] == 4
+    assert stats["bytes_saved"] == 4 * len(PAYLOAD)
+
+
+@pytest.mark.asyncio
+async def test_waits_for_other_process_and_reuses_result(tmp_path, server, local_model):
+    downloader = ModelDownloader(str(tmp_path), connections=1)
+    model_path = tmp_path / "local" / "model.safetensors"
+
+    # Stand in for another process holding the lock while it downloads
+    other = _FileLock(model_path.with_name(".download.lock"))
+    await other.acquire()
+    task = asyncio.ensure_future(downloader.download_model("local"))
+    await asyncio.sleep(0.3)
+    assert not task.done()
+    model_path.write_bytes(PAYLOAD)
+    other.release()
+
+    assert await task == model_path
+    assert server.requests == []
+    stats = downloader.get_download_stats()
+    assert stats["cross_process_reuses"] == 1
+    assert stats["wait_seconds"] >= 0.3
@@ -0,0 +1,113 @@
+import pytest
+
+from omega_bot.data.model_store import ModelStore, StoreConfig
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Downloader:
+    """Writes a fixed-size checkpoint instead of fetching one."""
+
+    def __init__(self, models_dir, size=100):
+        self.models_dir = models_dir
+        self.size = size
+        self.fetched = []
+
+    def is_downloading(self, model_id):
+        return False
+
+    async def download_model(self, model_id):
+        path = self.models_dir / model_id / "model.safetensors"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * self.size)
+        self.fetched.append(model_id)
+        return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    clock = _Clock()
+    store = ModelStore(_Downloader(tmp_path), StoreConfig(quota_bytes=250), clock=clock)
+    store._pinned.clear()
+    store.clock = clock
+    return store
+
+
+@pytest.mark.asyncio
+async def test_evicts_coldest_model_over_quota(store):
+    for _ in range(5):
+        await store.ensure_available("hot")
+    await store.ensure_available("cold")
+    store.clock.now += 3600
+    await store.ensure_available("new")
+
+    assert set(store.local_models()) == {"hot", "new"}
+    assert store.disk_usage() <= 250
+
+
+@pytest.mark.asyncio
+async def test_pinned_model_is_never_evicted(store):
+    await store.ensure_available("pinned")
+    store.pin("pinned")
+    for _ in range(3):
+        await store.ensure_available("a")
+        await store.ensure_available("b")
+    assert "pinned" in store.local_models()
+
+
+@pytest.mark.asyncio
+async def test_prefetches_rising_models(store):
+    # Steady low baseline for "steady", a sudden burst for "trending"
+    for _ in range(4):
+        store.record_use("steady")
+        store.clock.now += 6 * 3600
+    for _ in range(5):
+        store.record_use("trending")
+        store.clock.now += 60
+
+    assert store.is_rising("trending")
+    assert not store.is_rising("steady")
+    await store.maintain()
+    await store.stop()
+    assert store.downloader.fetched == ["trending"]
+
+
+@pytest.mark.asyncio
+async def test_prefetch_only_evicts_strictly_colder_models(store):
+    for model_id in ("a", "b"):
+        await store.downloader.download_model(model_id)
+    for _ in range(5):
+        for model_id in ("a", "b", "trending"):
+            store.record_use(model_id)
+    store.clock.now += 60
+    assert store.is_rising("trending")
+
+    # As popular as what it would replace: not worth evicting for
+    await store.maintain()
+    await store.stop()
+    assert "trending" not in store.downloader.fetched
+    assert set(store.local_models()) == {"a", "b"}
+
+    store.record_use("trending")
+    await store.maintain()
+    await store.stop()
+    assert store.downloader.fetched[-1] == "trending"
+    assert len(store.local_models()) == 2 and "trending" in store.local_models()
+
+
+def test_usage_survives_restart(store, tmp_path):
+    store.record_use("flux")
+    store.save_usage()
+    reloaded = ModelStore(store.downloader, store.config, clock=store.clock)
+    assert reloaded.usage["flux"].total == 1
+
+
+def test_manages_only_downloadable_models(store):
+    assert store.manages("flux")
+    assert not store.manages("stable-diffusion-v1.5")
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+
+import pytest
+
+from omega_bot.utils.metrics_log import MetricsLog
+from omega_bot.utils.monitoring import MetricsCollector
+from omega_bot.utils.sketches import HeavyHitters, QuantileSketch, SpaceSaving
+from omega_bot.utils.timeseries import RingBuffer, TimeSeries
+
+
+@pytest.fixture
+def collector(tmp_path):
+    return MetricsCollector(metrics_dir=str(tmp_path), enable_prometheus=False)
+
+
+def test_ring_buffer_overwrites_oldest_and_tracks_sum():
+    ring = RingBuffer(3)
+    for i in range(5):
+        ring.append(float(i), float(i))
+    assert list(ring) == [(2.0, 2.0), (3.0, 3.0), (4.0, 4.0)]
+    assert ring.mean == 3.0
+
+
+def test_time_series_rolls_up_minutes_and_hours():
+    series = TimeSeries(raw_capacity=10)
+    for second in range(0, 2 * 3600 + 60, 10):
+        series.add(1.0, timestamp=float(second))
+    assert len(series.raw) == 10
+    assert len(series.minutes) == 120
+    assert len(series.hours) == 1
+    assert list(series.hours)[0][1] == 360
+    assert series.count == 726
+
+
+def test_memory_is_flat_over_simulated_30_days():
+    series = TimeSeries(raw_capacity=256)
+    day = 86400
+
+    def run_days(start_day, days):
+        for t in range(start_day * day, (start_day + days) * day, 20):
+            series.add(1.5, timestamp=float(t))
+
+    run_days(0, 2)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    run_days(2, 28)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    growth = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    assert growth < 64 * 1024
+    assert series.count == 30 * day // 20
+
+
+@pytest.mark.asyncio
+async def test_statistics_and_snapshot(collector):
+    await collector.record_request("generate", 1)
+    await collector.record_generation(1, "cat", 2.0, True, model_id="sd")
+    await collector.record_generation(1, "dog", 4.0, True, model_id="sd")
+    await collector.record_error("boom", "ValueError")
+
+    stats = await collector.get_statistics()
+    assert stats["avg_generation_time"] == 3.0
+    snapshot = json.loads(json.dumps(collector._snapshot()))
+    assert snapshot["generation_times"]["count"] == 2
+    assert snapshot["recent_errors"][0][1:] == ["ValueError", "boom"]
+
+
+def test_quantile_sketch_relative_accuracy():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(1.0, 1.2) for _ in range(50000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    values.sort()
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact <= 0.011
+
+
+def test_merged_sketches_match_single_sketch():
+    rng = random.Random(1)
+    values = [rng.expovariate(0.2) for _ in range(10000)]
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+    merged = QuantileSketch.from_dict(json.loads(json.dumps(left.to_dict()))).merge(
+        right
+    )
+    assert merged.quantiles() == whole.quantiles()
+    assert merged.count == whole.count
+
+
+@pytest.mark.asyncio
+async def test_latency_quantiles_per_stage_and_model(collector, tmp_path):
+    for seconds in range(1, 101):
+        await collector.record_generation(1, "p", float(seconds), True, model_id="sd")
+    collector.record_latency("queue", 0.5)
+
+    other = MetricsCollector(
+        metrics_dir=str(tmp_path / "other"), enable_prometheus=False
+    )
+    other.record_latency("generation", 1000.0, "flux")
+    collector.merge_latency(other.export_latency())
+
+    latency = (await collector.get_statistics())["latency"]
+    assert abs(latency["generation"]["sd"]["p50"] - 50) <= 1
+    assert latency["generation"]["flux"]["count"] == 1
+    assert latency["generation"]["all"]["count"] == 101
+    assert latency["queue"]["default"]["p99"] == pytest.approx(0.5, rel=0.01)
+
+
+@pytest.mark.asyncio
+async def test_flush_appends_only_deltas(collector):
+    await collector.record_request("generate", 1)
+    await collector.record_generation(1, "cat", 2.0, True, model_id="sd")
+    first = collector.flush_metrics()
+    assert first["counters"]["requests.total"] == 1
+    assert first["series"]["generation_times"][0][1] == 2.0
+    assert collector.flush_metrics() is None
+
+    await collector.record_request("generate", 1)
+    await collector.record_error("boom", "ValueError")
+    second = collector.flush_metrics()
+    assert second["counters"] == {
+        "requests.total": 1,
+        "requests.success": 1,
+        "requests.by_command.generate.total": 1,
+        "requests.by_command.generate.success": 1,
+    }
+    assert "generation_times" not in second["series"]
+    assert second["errors"][0][1:] == ["ValueError", "boom"]
+
+    history = collector.load_history()
+    assert history["counters"]["requests.total"] == 2
+    assert len(history["series"]["errors.ValueError"]) == 1
+
+
+def test_metrics_log_rotates_reads_ranges_and_expires_segments(tmp_path):
+    log = MetricsLog(str(tmp_path), max_segment_bytes=200)
+    for t in range(100):
+        log.append({"ts": float(t), "counters": {"requests.total": 1}})
+    segments = log.segments()
+    assert len(segments) > 5
+    assert all(path.stat().st_size <= 200 for _, path in segments)
+
+    window = log.reconstruct(start=10.0, end=20.0)
+    assert window["counters"]["requests.total"] == 10
+
+    removed = log.cleanup(before=50.0)
+    assert removed > 0
+    remaining = [r["ts"] for r in MetricsLog(str(tmp_path)).read()]
+    assert remaining[0] <= 50.0
+    assert remaining[-1] == 99.0
+    assert log.reconstruct(start=50.0)["counters"]["requests.total"] == 50
+
+
+def test_metrics_log_skips_torn_tail(tmp_path):
+    log = MetricsLog(str(tmp_path))
+    log.append({"ts": 1.0, "counters": {"cache.hits": 3}})
+    with open(log.segments()[-1][1], "ab") as f:
+        f.write(b'{"ts": 2.0, "coun')
+    assert log.reconstruct()["counters"] == {"cache.hits": 3}
+
+    reopened = MetricsLog(str(tmp_path))
+    reopened.append({"ts": 3.0, "counters": {"cache.hits": 1}})
+    assert reopened.reconstruct()["counters"] == {"cache.hits": 4}
+
+
+def test_space_saving_finds_heavy_hitters_within_error_bound():
+    rng = random.Random(2)
+    summary = SpaceSaving(capacity=50)
+    exact = {}
+    for _ in range(20000):
+        key = (
+            f"heavy{rng.randrange(5)}"
+            if rng.random() < 0.5
+            else f"user{rng.randrange(100000)}"
+        )
+        summary.add(key)
+        exact[key] = exact.get(key, 0) + 1
+    assert len(summary) == 50
+    top = summary.top(5)
+    assert {key for key, _, _ in top} == {f"heavy{i}" for i in range(5)}
+    for key, count, error in top:
+        assert exact[key] <= count <= exact[key] + summary.error_bound
+        assert count - error <= exact[key]
+
+
+def test_heavy_hitters_recent_window_forgets_old_bursts():
+    now = [0.0]
+    hitters = HeavyHitters(k=2, error=0.01, window=60, clock=lambda: now[0])
+    for _ in range(100):
+        hitters.add("spammer")
+    hitters.add("regular")
+    now[0] = 90.0
+    hitters.add("regular")
+    assert hitters.top()[0][0] == "spammer"
+    now[0] = 200.0
+    hitters.add("regular")
+    assert [key for key, _, _ in hitters.top()] == ["regular"]
+    assert hitters.top(recent=False)[0] == ("spammer", 100, 0)
+
+
+@pytest.mark.asyncio
+async def test_per_user_stats_use_bounded_memory(tmp_path):
+    collector = MetricsCollector(
+        metrics_dir=str(tmp_path),
+        enable_prometheus=False,
+        heavy_hitters_k=3,
+        heavy_hitters_error=0.01,
+    )
+    for user_id in range(5000):
+        await collector.record_request("generate", user_id)
+    for _ in range(200):
+        await collector.record_request("generate", 42, success=False)
+        await collector.record_rate_limit(42)
+
+    assert len(collector.metrics["requests"]["by_user"].lifetime) == 100
+    hitters = (await collector.get_statistics())["heavy_hitters"]
+    assert hitters["users"][0]["key"] == "42"
+    assert hitters["failing_users"][0] == {"key": "42", "count": 200, "error": 0}
+    assert hitters["rate_limited_users"][0]["count"] == 200
+    assert len(hitters["users"]) == 3
+    json.dumps(collector._snapshot())
+
+
+def test_resource_sample_includes_process_stats(collector):
+    sample = collector.resource_sampler.sample()
+    assert sample["process_rss"] > 0
+    assert sample["open_fds"] > 0
+    assert 0 <= sample["cpu"] <= 100
+
+
+@pytest.mark.asyncio
+async def test_resource_sampling_never_blocks_the_loop(tmp_path):
+    collector = MetricsCollector(
+        metrics_dir=str(tmp_path), enable_prometheus=False, resource_interval=0.05
+    )
+    task = asyncio.ensure_future(collector._collect_system_metrics())
+
+    ticks = []
+    start = time.monotonic()
+    while time.monotonic() - start < 0.3:
+        ticks.append(time.monotonic())
+        await asyncio.sleep(0.01)
+    time.sleep(0.2)  # a blocking handler; the next sample reports the lag
+    await asyncio.sleep(0.15)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+    usage = collector.metrics["resource_usage"]
+    assert usage["cpu"].count >= 3
+    assert usage["process_rss"].latest > 0
+    assert usage["loop_lag"].max >= 0.1
+    assert collector.resource_sampler._thread is None
@@ -0,0 +1,105 @@
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from omega_bot.utils.error_handler import BotError
+from omega_bot.utils.monitoring import MetricsCollector
+from omega_bot.utils.profiler import SamplingProfiler
+
+
+def hot_loop(stop):
+    total = 0
+    while not stop.is_set():
+        total += sum(range(1000))
+    return total
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=hot_loop, args=(stop,), name="busy")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_profile_finds_hot_function(busy_thread):
+    result = SamplingProfiler(interval=0.002).profile(0.3)
+    assert result.samples > 20
+    busy = sum(
+        count for stack, count in result.stacks.items() if stack.startswith("busy;")
+    )
+    hot = sum(
+        count
+        for stack, count in result.stacks.items()
+        if "hot_loop (test_profiler.py" in stack
+    )
+    assert hot == busy > 0
+    line = result.collapsed().splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_overhead_stays_bounded(busy_thread):
+    result = SamplingProfiler(interval=0.0001, max_overhead=0.05).profile(0.3)
+    assert result.interval > 0.0001
+    assert result.overhead < 0.1
+
+
+def test_only_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    runner = threading.Thread(target=profiler.profile, args=(0.3,))
+    runner.start()
+    try:
+        threading.Event().wait(0.05)
+        with pytest.raises(BotError):
+            profiler.profile(0.1)
+    finally:
+        runner.join()
+
+
+def test_profile_endpoint_on_metrics_server(tmp_path, busy_thread):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    MetricsCollector(
+        metrics_dir=str(tmp_path), prometheus_port=port, debug_endpoints=True
+    )
+
+    base = f"http://127.0.0.1:{port}"
+    with urllib.request.urlopen(
+        f"{base}/debug/profile?seconds=0.2", timeout=10
+    ) as response:
+        body = response.read().decode()
+    assert "hot_loop" in body
+    with urllib.request.urlopen(f"{base}/metrics", timeout=10) as response:
+        assert b"bot_requests_total" in response.read()
+
+
+@pytest.mark.parametrize("seconds", [float("nan"), float("inf"), float("-inf")])
+def test_non_finite_duration_is_rejected(seconds):
+    profiler = SamplingProfiler()
+    with pytest.raises(BotError):
+        profiler.profile(seconds)
+    # The lock was released, so a normal profile still runs
+    assert profiler.profile(0.01).duration < 1
+
+
+def test_profile_endpoint_rejects_non_finite_seconds(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    MetricsCollector(
+        metrics_dir=str(tmp_path), prometheus_port=port, debug_endpoints=True
+    )
+
+    for seconds in ("nan", "inf", "ten"):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(
+                f"http://127.0.0.1:{port}/debug/profile?seconds={seconds}", timeout=10
+            )
+        assert error.value.code == 400
@@ -0,0 +1,91 @@
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from prometheus_client import generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+
+from omega_bot.utils.prometheus import exporter_registry, start_exporter
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKER = textwrap.dedent("""
+    import sys
+    from omega_bot.utils.monitoring import MetricsCollector
+    from omega_bot.utils.prometheus import write_latency_file
+
+    async def main(collector, worker):
+        for _ in range(worker + 1):
+            await collector.record_request("generate", worker)
+            await collector.record_generation(worker, "cat", 2.0 * (worker + 1), True, model_id="sd")
+        collector._record_resources({**collector.resource_sampler.sample(), "loop_lag": 0.01})
+        write_latency_file(collector.export_latency())
+
+    import asyncio
+    collector = MetricsCollector(metrics_dir=sys.argv[1], prometheus_port=int(sys.argv[2]))
+    asyncio.run(main(collector, int(sys.argv[3])))
+""")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def scrape():
+    samples = {}
+    for family in text_string_to_metric_families(
+        generate_latest(exporter_registry()).decode()
+    ):
+        for sample in family.samples:
+            samples.setdefault(sample.name, []).append(sample)
+    return samples
+
+
+def test_workers_aggregate_through_multiprocess_dir(tmp_path, monkeypatch):
+    shared = tmp_path / "prom"
+    shared.mkdir()
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(shared)}
+    port = free_port()
+    for worker in range(3):
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                WORKER,
+                str(tmp_path / f"metrics{worker}"),
+                str(port),
+                str(worker),
+            ],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            timeout=60,
+        )
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(shared))
+    samples = scrape()
+    requests = sum(s.value for s in samples["bot_requests_total"])
+    assert requests == 1 + 2 + 3
+    count = [s for s in samples["bot_generation_time_seconds_count"]]
+    assert count[0].value == 6
+    # Exited workers were marked dead, so their live gauges are gone
+    assert "bot_process_resident_memory_bytes" not in samples
+    quantiles = {
+        s.labels["quantile"]: s.value
+        for s in samples["bot_latency_quantile_seconds"]
+        if s.labels["stage"] == "generation"
+    }
+    assert abs(quantiles["0.99"] - 6.0) / 6.0 < 0.02
+
+
+def test_only_one_exporter_binds_the_port():
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        assert start_exporter(port, addr="127.0.0.1") is False
@@ -0,0 +1,60 @@
+from omega_bot.core.prompt_index import PromptIndex, PromptIndexConfig, canonicalize
+
+
+def test_canonicalize_ignores_case_punctuation_and_order():
+    assert canonicalize("sunset over mountains, beautiful") == canonicalize(
+        "Beautiful   SUNSET over the mountains!"
+    )
+
+
+def test_lookup_finds_reordered_prompt():
+    index = PromptIndex()
+    index.add("sunset over mountains, beautiful", "sd", None, "key-1")
+    assert index.lookup("beautiful sunset over mountains", "sd") == ("key-1", 1.0)
+
+
+def test_lookup_respects_threshold():
+    index = PromptIndex(PromptIndexConfig(threshold=0.8))
+    index.add("a red car parked near old brick house at night", "sd", None, "key-1")
+    match = index.lookup("red car parked near old brick house at night rain", "sd")
+    assert match is not None and match[0] == "key-1"
+    assert index.lookup("blue boat floating on calm lake at dawn", "sd") is None
+
+
+def test_lookup_is_scoped_by_model_and_parameters():
+    index = PromptIndex()
+    index.add("a cat in space", "sd", {"steps": 30}, "key-1")
+    assert index.lookup("a cat in space", "flux", {"steps": 30}) is None
+    assert index.lookup("a cat in space", "sd", {"steps": 20}) is None
+    assert index.lookup("the cat in space", "sd", {"steps": 30})[0] == "key-1"
+
+
+def test_prepositions_bind_the_words_around_them():
+    assert canonicalize("a cat on a dog") != canonicalize("a dog on a cat")
+    index = PromptIndex()
+    index.add("a cat on a dog", "sd", None, "key-1")
+    assert index.lookup("a dog on a cat", "sd") is None
+    assert index.lookup("cat on the dog", "sd") == ("key-1", 1.0)
+
+
+def test_capacity_drops_least_recently_used():
+    index = PromptIndex(PromptIndexConfig(capacity=2))
+    index.add("red car", "sd", None, "car")
+    index.add("blue boat", "sd", None, "boat")
+    assert index.lookup("car red", "sd")[0] == "car"
+    index.add("green tree", "sd", None, "tree")
+    assert len(index) == 2
+    assert "boat" not in index
+    assert index.lookup("blue boat", "sd") is None
+    assert index.lookup("red car", "sd")[0] == "car"
+
+
+def test_remove_forgets_the_key():
+    index = PromptIndex()
+    index.add("sunset over mountains", "sd", None, "key-1")
+    index.add("sunset over the mountains", "sd", None, "key-2")
+    assert index.remove("key-2")
+    assert not index.remove("key-2")
+    assert index.lookup("sunset over mountains", "sd") == ("key-1", 1.0)
+    assert index.remove("key-1")
+    assert len(index) == 0 and not index._buckets
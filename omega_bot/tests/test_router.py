@@ -0,0 +1,165 @@
+import asyncio
+import random
+
+import pytest
+
+from omega_bot.utils.router import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    Backend,
+    RequestRejected,
+    Router,
+    RouterError,
+)
+
+
+class FakeBackend(Backend):
+    """Answers after ``delay`` seconds, or raises while ``failing``."""
+
+    def __init__(self, name, delay=0.0, failing=False, error=RuntimeError):
+        self.name = name
+        self.delay = delay
+        self.failing = failing
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt, **params):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.failing:
+            raise self.error(f"{self.name} is down")
+        return f"{self.name}:{prompt}"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_router(backends, **kwargs):
+    kwargs.setdefault("rng", random.Random(0))
+    return Router(backends, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_traffic_shifts_to_the_faster_backend():
+    fast, slow = FakeBackend("fast", 0.005), FakeBackend("slow", 0.05)
+    router = make_router([fast, slow], hedge_after=10)
+    for i in range(60):
+        await router.generate(f"p{i}")
+    assert fast.calls > 3 * slow.calls
+    stats = {s["name"]: s for s in router.snapshot()}
+    assert stats["fast"]["latency"] < stats["slow"]["latency"]
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_to_another_backend():
+    stuck, healthy = FakeBackend("stuck", 1.0), FakeBackend("healthy", 0.01)
+    router = make_router(
+        [stuck, healthy], hedge_after=0.05, hedge_budget=1.0, rng=random.Random(1)
+    )
+    router.states[1].error_rate = 0.99  # make sure the stuck backend is picked first
+    started = asyncio.get_running_loop().time()
+    assert await router.generate("cat") == "healthy:cat"
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert router.hedges == 1
+    await asyncio.sleep(0)
+    assert stuck.cancelled == 1
+    assert router.states[0].failures == 0  # the losing hedge is not held against it
+
+
+@pytest.mark.asyncio
+async def test_hedges_are_limited_by_the_budget():
+    slow, other = FakeBackend("slow", 0.03), FakeBackend("other", 0.03)
+    router = make_router([slow, other], hedge_after=0.001, hedge_budget=0.1)
+    for i in range(20):
+        await router.generate(f"p{i}")
+    assert router.hedges <= 3
+
+
+@pytest.mark.asyncio
+async def test_failed_call_fails_over_and_raises_the_error_rate():
+    broken, healthy = FakeBackend("broken", failing=True), FakeBackend("healthy")
+    router = make_router([broken, healthy], max_attempts=2)
+    for i in range(10):
+        assert await router.generate(f"p{i}") == f"healthy:p{i}"
+    assert router.states[0].error_rate > 0
+    assert router.states[1].error_rate == 0
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_then_recovers_through_a_probe():
+    clock = FakeClock()
+    flaky, healthy = FakeBackend("flaky", failing=True), FakeBackend("healthy")
+    router = make_router(
+        [flaky, healthy], failure_threshold=3, open_seconds=10, clock=clock
+    )
+    state = router.states[0]
+    while state.circuit == CLOSED:
+        await router.generate("p")
+    assert state.failures == 3
+    calls = flaky.calls
+    for _ in range(20):
+        await router.generate("p")
+    assert flaky.calls == calls  # out of rotation while open
+
+    clock.now = 11
+    flaky.failing = False
+    while flaky.calls == calls:
+        await router.generate("p")
+    assert state.circuit == CLOSED
+    assert state.open_seconds == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_for_longer():
+    clock = FakeClock()
+    flaky = FakeBackend("flaky", failing=True)
+    router = make_router(
+        [flaky, FakeBackend("healthy")],
+        failure_threshold=1,
+        open_seconds=10,
+        clock=clock,
+    )
+    state = router.states[0]
+    while state.circuit == CLOSED:
+        await router.generate("p")
+    clock.now = 11
+    assert router._available(state) and state.circuit == HALF_OPEN
+    calls = flaky.calls
+    while flaky.calls == calls:
+        await router.generate("p")
+    assert state.circuit == OPEN
+    assert state.open_until == 11 + 20
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_is_not_retried_or_counted():
+    picky = FakeBackend("picky", failing=True, error=RequestRejected)
+    other = FakeBackend("other", failing=True, error=RequestRejected)
+    router = make_router([picky, other], max_attempts=2)
+    with pytest.raises(RequestRejected):
+        await router.generate("bad")
+    assert picky.calls + other.calls == 1
+    assert all(s["failures"] == 0 for s in router.snapshot())
+
+
+@pytest.mark.asyncio
+async def test_error_when_every_backend_is_down():
+    router = make_router(
+        [FakeBackend("a", failing=True), FakeBackend("b", failing=True)],
+        failure_threshold=1,
+    )
+    with pytest.raises(RouterError, match="All backends failed"):
+        await router.generate("p")
+    with pytest.raises(RouterError, match="No backend available"):
+        await router.generate("p")